@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class HealthConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'health'
+
+    def ready(self):
+        from . import signals, metrics
+        signals.connect()
+        metrics.install()
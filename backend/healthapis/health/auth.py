@@ -0,0 +1,99 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from oauth2_provider.contrib.rest_framework import OAuth2Authentication
+
+
+def get_cache():
+    return caches[getattr(settings, 'TOKEN_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'TOKEN_CACHE_TIMEOUT', 5 * 60)
+
+
+def _token_key(token):
+    # Key theo hash (như cột token_checksum của oauth2_provider), không đưa token gốc vào key
+    return f"auth:token:{hashlib.sha256(token.encode('utf-8')).hexdigest()}"
+
+
+def _user_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def bearer_token(request):
+    # Cùng cách đọc header với oauthlib; token gửi qua query/body thì để oauthlib xử lý
+    parts = request.META.get('HTTP_AUTHORIZATION', '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+
+def bump(user_id):
+    """
+    Đổi version stamp của user: mọi token của user trong cache hết hiệu lực. Gọi
+    ngay và lần nữa sau commit, để request đọc DB trước commit (thấy dữ liệu cũ)
+    không giữ được bản cache đó.
+    """
+    key = _user_key(user_id)
+    get_cache().set(key, time.time_ns(), None)
+    transaction.on_commit(lambda: get_cache().set(key, time.time_ns(), None))
+
+
+def lookup(token):
+    """AccessToken (kèm user, application) còn hạn trong cache; None nếu chưa có hoặc đã bị đổi."""
+    cache = get_cache()
+    entry = cache.get(_token_key(token))
+    if entry is None:
+        return None
+    version, access_token = entry
+    if cache.get(_user_key(access_token.user_id)) != version or access_token.is_expired():
+        return None
+    return access_token
+
+
+def remember(token, access_token, started):
+    """
+    Lưu token vừa xác thực, hết hạn cùng lúc với token. started là thời điểm
+    (time_ns) bắt đầu đọc DB: user bị đổi sau mốc này thì không lưu, vì dữ liệu
+    vừa đọc có thể đã cũ.
+    """
+    ttl = min(timeout(), int((access_token.expires - timezone.now()).total_seconds()))
+    if ttl <= 0:
+        return False
+    cache = get_cache()
+    key = _user_key(access_token.user_id)
+    # add: chưa có stamp (cache rỗng/bị xóa) thì lấy mốc started
+    if not cache.add(key, started, None):
+        version = cache.get(key)
+        if version is None or version > started:
+            return False
+        started = version
+    cache.set(_token_key(token), (started, access_token), ttl)
+    return True
+
+
+class CachedOAuth2Authentication(OAuth2Authentication):
+    """
+    OAuth2Authentication giữ token đã xác thực (kèm user) trong cache tối đa
+    TOKEN_CACHE_TIMEOUT giây: request sau của cùng token không truy vấn DB. Token
+    hết hạn bị loại khi đọc; xóa/sửa token hoặc user (signals) đổi version stamp
+    của user. Đổi bằng queryset.update() không qua signals, chờ hết TTL.
+    """
+
+    def authenticate(self, request):
+        token = bearer_token(request)
+        if token is None or timeout() <= 0:
+            return super().authenticate(request)
+        access_token = lookup(token)
+        if access_token is not None:
+            return access_token.user, access_token
+        started = time.time_ns()
+        result = super().authenticate(request)
+        if result is not None:
+            remember(token, result[1], started)
+        return result
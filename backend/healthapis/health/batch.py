@@ -0,0 +1,94 @@
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import DailyTracking
+
+MAX_ITEMS = 500
+BATCH_SIZE = 500
+
+
+def get_items(request):
+    """Danh sách phần tử của request batch: {"items": [...]} hoặc list trực tiếp."""
+    items = request.data.get('items') if isinstance(request.data, dict) else request.data
+    if not isinstance(items, list) or not items:
+        raise ValidationError({"detail": "items phải là danh sách không rỗng"})
+    if len(items) > MAX_ITEMS:
+        raise ValidationError({"detail": f"Tối đa {MAX_ITEMS} phần tử mỗi lần"})
+    return items
+
+
+def validate_items(items, serializer_class, ref_field=None, ref_queryset=None, **context):
+    """
+    Validate từng phần tử; khóa ngoại ref_field được kiểm tra bằng một truy vấn
+    cho cả lô. Trả về (validated_data, errors), phần tử lỗi có validated_data None.
+    """
+    validated, errors = [], []
+    for item in items:
+        serializer = serializer_class(data=item, context=context)
+        if serializer.is_valid():
+            validated.append(serializer.validated_data)
+            errors.append(None)
+        else:
+            validated.append(None)
+            errors.append(serializer.errors)
+
+    if ref_field:
+        found = ref_queryset.filter(id__in={v[ref_field] for v in validated if v}).values_list('id', flat=True)
+        found = set(found)
+        for i, data in enumerate(validated):
+            if data and data[ref_field] not in found:
+                validated[i] = None
+                errors[i] = {ref_field: ["Không tồn tại"]}
+    return validated, errors
+
+
+def error_results(errors):
+    return [{"index": i, "errors": e} for i, e in enumerate(errors) if e]
+
+
+def bulk_insert(model, objs, scope):
+    """
+    bulk_create trong transaction hiện tại. MySQL không trả id cho INSERT nhiều
+    dòng: đọc lại len(objs) id mới nhất trong scope (caller đã khóa plan).
+    """
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    if objs and objs[0].pk is None:
+        ids = model.objects.filter(**scope).order_by('-id').values_list('id', flat=True)[:len(objs)]
+        for obj, pk in zip(objs, reversed(list(ids))):
+            obj.pk = pk
+    return objs
+
+
+def upsert_tracking(user, validated):
+    """
+    Ghi các ngày theo dõi (unique theo user, date) trong một lượt: ngày đã có thì
+    bulk_update các field được gửi, ngày mới thì bulk_create. Cùng một ngày xuất
+    hiện nhiều lần thì áp dụng theo thứ tự, phần tử sau thắng.
+    Trả về {date: 'created' | 'updated'}.
+    """
+    rows = [data for data in validated if data]
+    existing = {t.date: t for t in DailyTracking.objects.filter(user=user, date__in={d['date'] for d in rows})}
+    created = {}
+    fields = set()
+
+    for data in rows:
+        tracking = existing.get(data['date']) or created.get(data['date'])
+        if tracking is None:
+            tracking = created[data['date']] = DailyTracking(user=user, date=data['date'])
+        for field, value in data.items():
+            setattr(tracking, field, value)
+        fields.update(data)
+
+    if existing:
+        # bulk_update bỏ qua auto_now, tự cập nhật updated_date
+        now = timezone.now()
+        for tracking in existing.values():
+            tracking.updated_date = now
+        fields.discard('date')
+        DailyTracking.objects.bulk_update(list(existing.values()), sorted(fields | {'updated_date'}),
+                                          batch_size=BATCH_SIZE)
+    DailyTracking.objects.bulk_create(list(created.values()), batch_size=BATCH_SIZE)
+
+    status = {d: 'updated' for d in existing}
+    status.update({d: 'created' for d in created})
+    return status
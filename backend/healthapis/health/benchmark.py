@@ -0,0 +1,379 @@
+import platform
+import random
+import secrets
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+import django
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+from rest_framework.test import APIClient
+
+from . import sync
+from .models import (User, HealthProfile, DailyTracking, WorkoutPlan, WorkoutSchedule, NutritionPlan,
+                     Exercise, ExerciseCategory, Food, Consultation, Reminder, ChatRoom, Message)
+
+# path và data là format string / hàm theo ngữ cảnh của một khách hàng (xem build_contexts).
+# weight: tần suất tương đối trong lượt chạy hỗn hợp; expected: status hợp lệ.
+Endpoint = namedtuple('Endpoint', 'name role method path data weight expected fmt',
+                      defaults=(None, 1, (200, 201, 204), 'json'))
+
+ENDPOINTS = [
+    Endpoint('users.current', 'user', 'get', '/users/current-user/', weight=5),
+    Endpoint('users.update', 'user', 'patch', '/users/current-user/', {'first_name': 'Bench'}, fmt='multipart'),
+    Endpoint('experts.list', 'user', 'get', '/experts/?role=trainer'),
+    Endpoint('experts.match', 'user', 'get', '/experts/match/', weight=2),
+    Endpoint('profiles.my_profile', 'user', 'get', '/health-profiles/my-profile/', weight=3),
+    Endpoint('profiles.retrieve', 'user', 'get', '/health-profiles/{profile}/'),
+    Endpoint('profiles.update', 'user', 'patch', '/health-profiles/{profile}/', {'weight': 70.5}),
+    Endpoint('profiles.list', 'expert', 'get', '/health-profiles/'),
+    Endpoint('profiles.my_clients', 'expert', 'get', '/health-profiles/my-clients/', weight=2),
+    Endpoint('profiles.dashboard', 'expert', 'get', '/health-profiles/dashboard/?refresh=1', weight=3),
+    Endpoint('tracking.list', 'user', 'get', '/daily-tracking/', weight=2),
+    Endpoint('tracking.range', 'user', 'get', '/daily-tracking/?start_date={week_ago}'),
+    Endpoint('tracking.today', 'user', 'get', '/daily-tracking/today/', weight=8),
+    Endpoint('tracking.create', 'user', 'post', '/daily-tracking/', {'date': '2000-01-01', 'steps': 5000}),
+    Endpoint('tracking.batch', 'user', 'post', '/daily-tracking/batch/',
+             lambda c: {'items': [{'date': str(c['today'] - timedelta(days=i)), 'steps': 6000 + i}
+                                  for i in range(7)]}, weight=2),
+    Endpoint('tracking.weekly_summary', 'user', 'get', '/daily-tracking/weekly-summary/', weight=4),
+    Endpoint('tracking.summary', 'user', 'get', '/daily-tracking/summary/?period=month&count=12'),
+    Endpoint('categories.list', 'user', 'get', '/exercise-categories/'),
+    Endpoint('exercises.list', 'user', 'get', '/exercises/', weight=3),
+    Endpoint('exercises.filter', 'user', 'get', '/exercises/?category_id={category}&difficulty=medium'),
+    Endpoint('exercises.search', 'user', 'get', '/exercises/?search=squat'),
+    Endpoint('exercises.retrieve', 'user', 'get', '/exercises/{exercise}/'),
+    Endpoint('exercises.recommended', 'user', 'get', '/exercises/recommended/', weight=2),
+    Endpoint('workout_plans.list', 'user', 'get', '/workout-plans/', weight=3),
+    Endpoint('workout_plans.expert_list', 'expert', 'get', '/workout-plans/'),
+    Endpoint('workout_plans.templates', 'user', 'get', '/workout-plans/templates/?goal=lose_weight'),
+    Endpoint('workout_plans.retrieve', 'user', 'get', '/workout-plans/{workout_plan}/'),
+    Endpoint('workout_plans.schedules', 'user', 'get', '/workout-plans/{workout_plan}/schedules/', weight=2),
+    Endpoint('workout_plans.clone', 'user', 'post', '/workout-plans/{workout_template}/clone/'),
+    Endpoint('workout_plans.add_exercises', 'user', 'post', '/workout-plans/{workout_plan}/add-exercises/',
+             lambda c: {'items': [{'exercise_id': c['exercise'], 'weekday': d} for d in range(7)]}),
+    Endpoint('workout_plans.add_exercise', 'user', 'post', '/workout-plans/{workout_plan}/add-exercise/',
+             lambda c: {'exercise_id': c['exercise'], 'weekday': 1}),
+    Endpoint('workout_plans.remove_exercise', 'user', 'delete', '/workout-plans/{workout_plan}/remove-exercise/',
+             lambda c: {'schedule_id': c['schedule']}),
+    Endpoint('foods.list', 'user', 'get', '/foods/', weight=3),
+    Endpoint('foods.filter', 'user', 'get', '/foods/?meal_type=lunch&max_calories=600'),
+    Endpoint('foods.search', 'user', 'get', '/foods/?search=com'),
+    Endpoint('foods.retrieve', 'user', 'get', '/foods/{food}/'),
+    Endpoint('foods.recommended', 'user', 'get', '/foods/recommended/', weight=2),
+    Endpoint('nutrition_plans.list', 'user', 'get', '/nutrition-plans/', weight=3),
+    Endpoint('nutrition_plans.expert_list', 'expert', 'get', '/nutrition-plans/'),
+    Endpoint('nutrition_plans.templates', 'user', 'get', '/nutrition-plans/templates/?goal=lose_weight'),
+    Endpoint('nutrition_plans.retrieve', 'user', 'get', '/nutrition-plans/{nutrition_plan}/'),
+    Endpoint('nutrition_plans.meals', 'user', 'get', '/nutrition-plans/{nutrition_plan}/meals/', weight=2),
+    Endpoint('nutrition_plans.clone', 'user', 'post', '/nutrition-plans/{nutrition_template}/clone/'),
+    Endpoint('nutrition_plans.add_meals', 'user', 'post', '/nutrition-plans/{nutrition_plan}/add-meals/',
+             lambda c: {'items': [{'food_id': c['food'], 'weekday': d} for d in range(7)]}),
+    Endpoint('nutrition_plans.add_meal', 'user', 'post', '/nutrition-plans/{nutrition_plan}/add-meal/',
+             lambda c: {'food_id': c['food'], 'weekday': 2}),
+    Endpoint('plans.assign', 'expert', 'post', '/{expert_plan}/assign/', lambda c: {'user_ids': [c['user_id']]}),
+    Endpoint('progress.list', 'user', 'get', '/progress/', weight=2),
+    Endpoint('progress.chart_data', 'user', 'get', '/progress/chart-data/?days=365', weight=2),
+    Endpoint('progress.timeseries', 'user', 'get', '/progress/timeseries/?days=90'),
+    Endpoint('progress.client', 'expert', 'get', '/progress/client/{user_id}/?days=30', weight=2),
+    Endpoint('progress.create', 'user', 'post', '/progress/', {'date': '2000-01-01', 'weight': 70}),
+    Endpoint('consultations.list', 'user', 'get', '/consultations/'),
+    Endpoint('consultations.expert_list', 'expert', 'get', '/consultations/', weight=2),
+    Endpoint('consultations.upcoming', 'user', 'get', '/consultations/upcoming/', weight=2),
+    Endpoint('consultations.free_slots', 'user', 'get', '/consultations/free-slots/?expert_id={expert_id}&days=14'),
+    Endpoint('consultations.create', 'user', 'post', '/consultations/',
+             lambda c: {'expert': c['expert_id'], 'appointment_date': c['appointment']}),
+    Endpoint('consultations.update_status', 'expert', 'patch', '/consultations/{consultation}/update-status/',
+             {'status': 'confirmed'}),
+    Endpoint('reminders.list', 'user', 'get', '/reminders/'),
+    Endpoint('reminders.today', 'user', 'get', '/reminders/today/', weight=4),
+    Endpoint('reminders.create', 'user', 'post', '/reminders/',
+             {'title': 'Uống nước', 'reminder_type': 'water', 'time': '09:00', 'days_of_week': [0, 2, 4]}),
+    Endpoint('reminders.toggle', 'user', 'patch', '/reminders/{reminder}/toggle/'),
+    Endpoint('journals.list', 'user', 'get', '/journals/'),
+    Endpoint('journals.today', 'user', 'get', '/journals/today/', weight=3, expected=(200, 404)),
+    Endpoint('journals.month', 'user', 'get', '/journals/month/{year}/{month}/'),
+    Endpoint('journals.create', 'user', 'post', '/journals/',
+             {'date': '2000-01-01', 'title': 'Bench', 'content': 'Bench', 'mood': 'good'}),
+    Endpoint('chat.list', 'user', 'get', '/chat-rooms/', weight=3),
+    Endpoint('chat.expert_list', 'expert', 'get', '/chat-rooms/', weight=4),
+    Endpoint('chat.messages', 'user', 'get', '/chat-rooms/{room}/messages/', weight=3),
+    Endpoint('chat.messages_since', 'expert', 'get', '/chat-rooms/{room}/messages/?since_id={last_message}',
+             weight=6),
+    Endpoint('chat.send', 'user', 'post', '/chat-rooms/{room}/send/', {'content': 'Chào chuyên gia'}, weight=2),
+    Endpoint('chat.start', 'user', 'post', '/chat-rooms/start/{expert_id}/'),
+    Endpoint('sync.full', 'user', 'get', '/sync/'),
+    Endpoint('sync.delta', 'user', 'get', '/sync/?{sync_cursors}', weight=4),
+]
+# /metrics/ (admin, số liệu nội bộ) không nằm trong benchmark
+
+
+def endpoints(only=None):
+    selected = []
+    for endpoint in ENDPOINTS:
+        if only and not any(name in endpoint.name for name in only):
+            continue
+        selected.append(endpoint)
+    return selected
+
+
+def build_contexts(prefix, count):
+    """
+    Ngữ cảnh (id cần cho path/data) của count khách hàng có chuyên gia, rải đều
+    trên tập dữ liệu sinh bởi generate_data --prefix.
+    """
+    candidates = list(HealthProfile.objects.filter(
+        user__username__startswith=f'{prefix}_user_', expert__isnull=False
+    ).order_by('user_id').values_list('user_id', flat=True))
+    if not candidates:
+        return []
+    step = max(len(candidates) // (count * 2), 1)
+
+    today = date.today()
+    exercise = Exercise.objects.filter(active=True).order_by('id').first()
+    food = Food.objects.filter(active=True).order_by('id').first()
+    category = ExerciseCategory.objects.order_by('id').first()
+    workout_template = WorkoutPlan.objects.filter(created_by__role='trainer', active=True).order_by('id').first()
+    nutrition_template = NutritionPlan.objects.filter(created_by__role='nutritionist',
+                                                      active=True).order_by('id').first()
+    cursor = sync.format_cursor(timezone.now() - timedelta(days=1), 0)
+
+    contexts = []
+    for user_id in candidates[::step]:
+        profile = HealthProfile.objects.select_related('user', 'expert').get(user_id=user_id)
+        expert = profile.expert
+        workout_plan = WorkoutPlan.objects.filter(user_id=user_id, active=True).order_by('id').first()
+        nutrition_plan = NutritionPlan.objects.filter(user_id=user_id, active=True).order_by('id').first()
+        room = ChatRoom.objects.filter(user_id=user_id, expert=expert).first()
+        consultation = Consultation.objects.filter(user_id=user_id, expert=expert).order_by('id').first()
+        reminder = Reminder.objects.filter(user_id=user_id).order_by('id').first()
+        schedule = WorkoutSchedule.objects.filter(workout_plan=workout_plan).order_by('id').first()
+        expert_plan = workout_plan if expert.role == 'trainer' else nutrition_plan
+        if not all([workout_plan, nutrition_plan, room, consultation, reminder, schedule]) \
+                or expert_plan.created_by_id != expert.id:
+            continue
+        contexts.append({
+            'user': profile.user,
+            'expert': expert,
+            'user_id': user_id,
+            'expert_id': expert.id,
+            'profile': profile.id,
+            'workout_plan': workout_plan.id,
+            'nutrition_plan': nutrition_plan.id,
+            'workout_template': workout_template.id,
+            'nutrition_template': nutrition_template.id,
+            'expert_plan': f"{'workout' if expert.role == 'trainer' else 'nutrition'}-plans/{expert_plan.id}",
+            'schedule': schedule.id,
+            'room': room.id,
+            'last_message': Message.objects.filter(chat_room=room).aggregate(m=Max('id'))['m'] or 0,
+            'consultation': consultation.id,
+            'reminder': reminder.id,
+            'exercise': exercise.id,
+            'food': food.id,
+            'category': category.id,
+            'today': today,
+            'week_ago': today - timedelta(days=7),
+            'year': today.year,
+            'month': today.month,
+            'appointment': (timezone.now() + timedelta(days=60)).isoformat(),
+            'sync_cursors': urlencode({key: cursor for key in sync.SYNC_MODELS}),
+        })
+        if len(contexts) == count:
+            break
+    return contexts
+
+
+def percentile(values, q):
+    """Phân vị theo nearest-rank trên danh sách đã sắp xếp."""
+    if not values:
+        return None
+    index = max(int(-(-q * len(values) // 100)) - 1, 0)
+    return values[min(index, len(values) - 1)]
+
+
+def latency_summary(samples):
+    values = sorted(samples)
+    if not values:
+        return None
+    data = {'mean': round(sum(values) / len(values), 3), 'max': round(values[-1], 3)}
+    data.update({f'p{q}': round(percentile(values, q), 3) for q in (50, 95, 99)})
+    return data
+
+
+class Runner:
+    """Gọi API qua toàn bộ stack Django (middleware, OAuth2 bearer token) và đo từng request."""
+
+    def __init__(self, contexts):
+        self.contexts = contexts
+        self.clients = {}
+        self.tokens = []
+        self.queries = 0
+
+    def __enter__(self):
+        expires = timezone.now() + timedelta(hours=2)
+        for ctx in self.contexts:
+            for role in ('user', 'expert'):
+                user = ctx[role]
+                if user.id in self.clients:
+                    continue
+                token = AccessToken.objects.create(user=user, token=secrets.token_urlsafe(32),
+                                                   expires=expires, scope='read write')
+                self.tokens.append(token.id)
+                client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {token.token}')
+                self.clients[user.id] = client
+        return self
+
+    def __exit__(self, *exc):
+        AccessToken.objects.filter(id__in=self.tokens).delete()
+
+    def _count(self, execute, sql, params, many, context):
+        # SAVEPOINT do benchmark tự bọc request ghi, không tính
+        if not sql.startswith(('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')):
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+    def call(self, endpoint, ctx):
+        """(ms, số truy vấn, status) của một request; mọi request đều rollback để dữ liệu không đổi."""
+        client = self.clients[ctx[endpoint.role].id]
+        path = endpoint.path.format(**ctx)
+        data = endpoint.data(ctx) if callable(endpoint.data) else endpoint.data
+        kwargs = {'format': endpoint.fmt} if data is not None else {}
+
+        self.queries = 0
+        with connection.execute_wrapper(self._count):
+            start = time.perf_counter()
+            # GET cũng có thể ghi (daily-tracking/today tạo bản ghi hôm nay)
+            with transaction.atomic():
+                response = getattr(client, endpoint.method)(path, data, **kwargs)
+                transaction.set_rollback(True)
+            elapsed = (time.perf_counter() - start) * 1000
+        return elapsed, self.queries, response.status_code
+
+
+def run(contexts, selected, iterations=50, warmup=2, mix=500, seed=1):
+    """
+    Mỗi endpoint chạy iterations lần (xoay vòng khách hàng, lần lượt qua các endpoint
+    để máy chậm đi nhất thời ảnh hưởng đều mọi endpoint) để lấy độ trễ và số truy vấn;
+    sau đó mix request chọn ngẫu nhiên theo weight để đo thông lượng.
+    """
+    samples = {endpoint.name: [] for endpoint in selected}
+    queries = {endpoint.name: [] for endpoint in selected}
+    statuses = {endpoint.name: {} for endpoint in selected}
+    with Runner(contexts) as runner:
+        for i in range(warmup):
+            for endpoint in selected:
+                runner.call(endpoint, contexts[i % len(contexts)])
+        for i in range(iterations):
+            for endpoint in selected:
+                elapsed, count, status_code = runner.call(endpoint, contexts[i % len(contexts)])
+                samples[endpoint.name].append(elapsed)
+                queries[endpoint.name].append(count)
+                counts = statuses[endpoint.name]
+                counts[status_code] = counts.get(status_code, 0) + 1
+
+        endpoints_report = {}
+        for endpoint in selected:
+            name = endpoint.name
+            latency = latency_summary(samples[name])
+            endpoints_report[name] = {
+                'method': endpoint.method.upper(),
+                'path': endpoint.path,
+                'role': endpoint.role,
+                'requests': iterations,
+                'errors': sum(n for s, n in statuses[name].items() if s not in endpoint.expected),
+                'statuses': {str(s): n for s, n in sorted(statuses[name].items())},
+                'latency_ms': latency,
+                'queries': {'mean': round(sum(queries[name]) / iterations, 2), 'max': max(queries[name])},
+                # một client gọi tuần tự
+                'throughput_rps': round(1000 / latency['mean'], 1),
+            }
+
+        rng = random.Random(seed)
+        picks = rng.choices(selected, weights=[e.weight for e in selected], k=mix)
+        samples, queries, roles, errors = [], 0, {'user': 0, 'expert': 0}, 0
+        started = time.perf_counter()
+        for i, endpoint in enumerate(picks):
+            elapsed, count, status_code = runner.call(endpoint, contexts[rng.randrange(len(contexts))])
+            samples.append(elapsed)
+            queries += count
+            roles[endpoint.role] += 1
+            errors += status_code not in endpoint.expected
+        seconds = time.perf_counter() - started
+
+    return {
+        'endpoints': endpoints_report,
+        'mix': {
+            'requests': mix,
+            'errors': errors,
+            'roles': roles,
+            'seconds': round(seconds, 3),
+            'throughput_rps': round(mix / seconds, 1) if mix else None,
+            'latency_ms': latency_summary(samples),
+            'queries_per_request': round(queries / mix, 2) if mix else None,
+        },
+    }
+
+
+def dataset_meta(prefix):
+    return {
+        'prefix': prefix,
+        'users': User.objects.filter(username__startswith=f'{prefix}_user_').count(),
+        'daily_tracking': DailyTracking.objects.count(),
+        'messages': Message.objects.count(),
+    }
+
+
+def environment_meta():
+    return {
+        'vendor': connection.vendor,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'created': timezone.now().isoformat(),
+    }
+
+
+# Tham số phải giống nhau thì mới so sánh được với baseline
+COMPARABLE = ('vendor', 'dataset', 'clients', 'iterations', 'mix', 'seed', 'only')
+
+
+def mismatched(report, baseline):
+    meta, base = report['meta'], baseline.get('meta', {})
+    return [key for key in COMPARABLE if meta.get(key) != base.get(key)]
+
+
+def compare(report, baseline, threshold=0.2, min_delta_ms=1.0):
+    """
+    Các chỉ số xấu đi so với baseline. Độ trễ so p50 của từng endpoint (p95 trên vài
+    chục mẫu dao động quá mạnh giữa các lần chạy) và p95 của lượt chạy hỗn hợp;
+    số truy vấn trung bình không được tăng, không có lỗi mới.
+    """
+    def slower(name, metric, base, current):
+        if current > base * (1 + threshold) and current - base > min_delta_ms:
+            regressions.append({'endpoint': name, 'metric': metric, 'baseline': base, 'current': current})
+
+    regressions = []
+    for name, current in report['endpoints'].items():
+        base = baseline.get('endpoints', {}).get(name)
+        if not base:
+            continue
+        slower(name, 'latency_p50_ms', base['latency_ms']['p50'], current['latency_ms']['p50'])
+        if current['queries']['mean'] > base['queries']['mean'] + 0.5:
+            regressions.append({'endpoint': name, 'metric': 'queries_mean',
+                                'baseline': base['queries']['mean'], 'current': current['queries']['mean']})
+        if current['errors'] > base['errors']:
+            regressions.append({'endpoint': name, 'metric': 'errors', 'baseline': base['errors'],
+                                'current': current['errors']})
+
+    mix, base_mix = report['mix'], baseline.get('mix') or {}
+    if mix['requests'] and base_mix.get('requests'):
+        slower('mix', 'latency_p95_ms', base_mix['latency_ms']['p95'], mix['latency_ms']['p95'])
+        if mix['throughput_rps'] < base_mix['throughput_rps'] * (1 - threshold):
+            regressions.append({'endpoint': 'mix', 'metric': 'throughput_rps',
+                                'baseline': base_mix['throughput_rps'], 'current': mix['throughput_rps']})
+    return regressions
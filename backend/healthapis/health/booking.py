@@ -0,0 +1,104 @@
+import threading
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from . import reminders
+from .models import User, Consultation
+
+ACTIVE = Consultation.ACTIVE_STATUSES
+MAX_DURATION = Consultation.MAX_DURATION
+MAX_DAYS = 60
+
+# SQLite bỏ qua FOR UPDATE: tuần tự hóa các thread theo chuyên gia bằng số lock cố
+# định (expert_id % LOCK_STRIPES), không tạo một lock cho mỗi chuyên gia
+LOCK_STRIPES = 64
+_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+
+
+class SlotTaken(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chuyên gia đã có lịch trong khung giờ này"
+
+
+def working_hours():
+    # Giờ làm việc [bắt đầu, kết thúc) theo múi giờ của chuyên gia
+    return getattr(settings, 'CONSULTATION_HOURS', (8, 17))
+
+
+def slot_step():
+    return timedelta(minutes=getattr(settings, 'CONSULTATION_SLOT_MINUTES', 30))
+
+
+def busy(expert_id, start, end, exclude=None, lock=False):
+    """
+    Các khoảng [bắt đầu, kết thúc) đang giữ chỗ của chuyên gia giao với [start, end),
+    theo thứ tự bắt đầu. Lịch dài tối đa MAX_DURATION phút nên chỉ cần đọc khoảng
+    (start - MAX_DURATION, end) trên index (expert, appointment_date, status).
+    """
+    rows = Consultation.objects.filter(
+        expert_id=expert_id, status__in=ACTIVE,
+        appointment_date__gt=start - timedelta(minutes=MAX_DURATION), appointment_date__lt=end,
+    )
+    if exclude is not None:
+        rows = rows.exclude(pk=exclude)
+    if lock:
+        rows = rows.select_for_update()
+    intervals = []
+    for begin, duration in rows.order_by('appointment_date').values_list('appointment_date', 'duration'):
+        finish = begin + timedelta(minutes=duration)
+        if finish > start:
+            intervals.append((begin, finish))
+    return intervals
+
+
+@contextmanager
+def reserve(expert_id, start, duration, exclude=None):
+    """
+    Giữ khung giờ [start, start + duration) của chuyên gia: kiểm tra trùng và ghi
+    (thân with) chạy trong cùng transaction, tuần tự theo chuyên gia bằng khóa dòng
+    chuyên gia (SELECT ... FOR UPDATE). Riêng SQLite (bỏ qua FOR UPDATE) dùng thêm
+    lock trong tiến trình. Trùng lịch thì SlotTaken (409).
+    """
+    end = start + timedelta(minutes=duration)
+    local = _locks[expert_id % LOCK_STRIPES] if connection.vendor == 'sqlite' else nullcontext()
+    with local, transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=expert_id).values_list('pk'))
+        if busy(expert_id, start, end, exclude=exclude, lock=True):
+            raise SlotTaken()
+        yield
+
+
+def free_slots(expert, days=7, duration=60, now=None):
+    """
+    Các khung giờ trống dài duration phút trong days ngày tới (tính cả hôm nay), theo
+    giờ làm việc và múi giờ của chuyên gia, cách nhau slot_step(). Một truy vấn.
+    """
+    now = now or timezone.now()
+    tz = reminders.zone(expert.timezone)
+    open_hour, close_hour = working_hours()
+    step, length = slot_step(), timedelta(minutes=duration)
+    first_day = now.astimezone(tz).date()
+    window_end = datetime.combine(first_day + timedelta(days=days), time(0), tzinfo=tz)
+
+    taken = busy(expert.id, now, window_end)
+    slots = []
+    i = 0
+    for k in range(days):
+        day = first_day + timedelta(days=k)
+        start = datetime.combine(day, time(open_hour), tzinfo=tz)
+        close = datetime.combine(day, time(close_hour), tzinfo=tz)
+        while start + length <= close:
+            end = start + length
+            # taken sắp theo giờ bắt đầu: bỏ các lịch đã kết thúc trước start
+            while i < len(taken) and taken[i][1] <= start:
+                i += 1
+            if start > now and not (i < len(taken) and taken[i][0] < end):
+                slots.append({'start': start, 'end': end})
+            start += step
+    return slots
@@ -0,0 +1,104 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Exercise, ExerciseCategory, Food
+
+# Model -> các catalog bị ảnh hưởng khi model thay đổi.
+# Bài tập serialize kèm category nên đổi category cũng làm mới catalog bài tập.
+CATALOGS = {
+    ExerciseCategory: ('category', 'exercise'),
+    Exercise: ('exercise',),
+    Food: ('food',),
+}
+
+
+def get_cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def timeout():
+    return getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60)
+
+
+def _version_key(name):
+    return f'catalog:version:{name}'
+
+
+def get_versions(names):
+    """Version stamp hiện tại của các catalog; tạo mới nếu chưa có (cache rỗng/bị xóa)."""
+    cache = get_cache()
+    keys = [_version_key(n) for n in names]
+    found = cache.get_many(keys)
+    versions = []
+    for key in keys:
+        version = found.get(key)
+        if version is None:
+            version = time.time_ns()
+            # add: nếu tiến trình khác vừa tạo thì dùng stamp của nó
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions.append(version)
+    return versions
+
+
+def bump(name):
+    """
+    Không xóa payload cũ: đổi stamp thì key cũ không còn được đọc và tự hết hạn.
+    Đổi lần nữa sau commit: request đọc dữ liệu cũ trước commit và lưu dưới stamp
+    vừa đổi sẽ không còn được dùng.
+    """
+    key = _version_key(name)
+    get_cache().set(key, time.time_ns(), None)
+    transaction.on_commit(lambda: get_cache().set(key, time.time_ns(), None))
+
+
+def invalidate_instance(instance):
+    for name in CATALOGS.get(type(instance), ()):
+        bump(name)
+
+
+class CatalogCacheMixin:
+    """
+    Cache read-through cho list/retrieve của danh mục. Key gồm host, path,
+    query params đã sắp xếp và version stamp của các catalog phụ thuộc;
+    ETag lấy từ chính key nên If-None-Match trả 304 mà không cần đọc DB.
+    """
+    catalog_names = ()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached_response(request, super().retrieve, *args, **kwargs)
+
+    def _cache_key(self, request):
+        versions = get_versions(self.catalog_names)
+        params = sorted(
+            (k, v) for k in request.query_params for v in request.query_params.getlist(k)
+        )
+        raw = repr((request.get_host(), request.path, params, versions))
+        return 'catalog:' + hashlib.md5(raw.encode()).hexdigest()
+
+    def _cached_response(self, request, handler, *args, **kwargs):
+        key = self._cache_key(request)
+        etag = f'"{key[8:]}"'
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if etag in [t.strip() for t in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        cache = get_cache()
+        data = cache.get(key)
+        if data is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, timeout())
+        return Response(data, headers=headers)
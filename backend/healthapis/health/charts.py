@@ -0,0 +1,122 @@
+from rest_framework.exceptions import ValidationError
+
+DEFAULT_POINTS = 120
+MAX_POINTS = 1000
+MAX_DAYS = 3660
+METHODS = ('avg', 'lttb')
+
+PROGRESS_FIELDS = ('weight', 'body_fat', 'muscle_mass')
+TRACKING_FIELDS = ('weight', 'water_intake', 'steps', 'heart_rate')
+# Chuỗi gộp: weight chung cho cả hai nguồn
+SERIES_FIELDS = PROGRESS_FIELDS + TRACKING_FIELDS[1:]
+
+
+def _int_param(request, name, default, low, high):
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        return min(max(int(value), low), high)
+    except ValueError:
+        raise ValidationError({"detail": f"{name} không hợp lệ"})
+
+
+def get_params(request):
+    """(days, max_points, method) từ query string."""
+    method = request.query_params.get('method', 'avg')
+    if method not in METHODS:
+        raise ValidationError({"detail": "method phải là avg hoặc lttb"})
+    return (_int_param(request, 'days', 30, 1, MAX_DAYS),
+            _int_param(request, 'max_points', DEFAULT_POINTS, 3, MAX_POINTS),
+            method)
+
+
+def bucket_average(points, max_points, fields):
+    """
+    Chia khoảng thời gian thành tối đa max_points ô bằng nhau theo ngày, mỗi ô
+    là trung bình các giá trị có mặt (bỏ None). Ngày của ô là ngày đầu ô.
+    """
+    if len(points) <= max_points:
+        return points
+    first = points[0]['date']
+    span = (points[-1]['date'] - first).days + 1
+    width = -(-span // max_points)
+
+    buckets = {}
+    for point in points:
+        buckets.setdefault((point['date'] - first).days // width, []).append(point)
+
+    result = []
+    for index in sorted(buckets):
+        group = buckets[index]
+        row = {'date': group[0]['date']}
+        for field in fields:
+            values = [p[field] for p in group if p.get(field) is not None]
+            row[field] = round(sum(values) / len(values), 2) if values else None
+        result.append(row)
+    return result
+
+
+def lttb(points, max_points, field):
+    """
+    Largest-Triangle-Three-Buckets theo field: giữ nguyên các dòng gốc có hình
+    dạng nổi bật nhất (đỉnh, đáy). Dòng không có field bị bỏ.
+    """
+    data = [(p['date'].toordinal(), p[field], p) for p in points if p.get(field) is not None]
+    n = len(data)
+    if n <= max_points:
+        return [p for _, _, p in data]
+
+    every = (n - 2) / (max_points - 2)
+    sampled = [data[0][2]]
+    a = 0
+    for i in range(max_points - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        window = data[avg_start:avg_end]
+        avg_x = sum(x for x, _, _ in window) / len(window)
+        avg_y = sum(y for _, y, _ in window) / len(window)
+
+        ax, ay, _ = data[a]
+        best, best_area = None, -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y, _ = data[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(data[best][2])
+        a = best
+    sampled.append(data[-1][2])
+    return sampled
+
+
+def downsample(points, max_points, method, fields):
+    """
+    Từ max_points điểm trở xuống thì trả nguyên. lttb chạy riêng cho từng chuỗi có
+    dữ liệu, mỗi chuỗi max_points // số chuỗi điểm, giữ các dòng gốc được ít nhất
+    một chuỗi chọn; không đủ 3 điểm mỗi chuỗi thì tính trung bình theo ô.
+    """
+    if len(points) <= max_points:
+        return points
+    if method == 'lttb':
+        series = [f for f in fields if any(p.get(f) is not None for p in points)]
+        per_series = max_points // max(len(series), 1)
+        if per_series >= 3:
+            chosen = set()
+            for field in series:
+                chosen.update(id(p) for p in lttb(points, per_series, field))
+            return [p for p in points if id(p) in chosen]
+    return bucket_average(points, max_points, fields)
+
+
+def merge(progress, tracking):
+    """Gộp hai chuỗi theo ngày; cân nặng ưu tiên Progress (đo kỹ hơn) rồi mới tới DailyTracking."""
+    rows = {}
+    for point in tracking:
+        rows[point['date']] = dict(point)
+    for point in progress:
+        row = rows.setdefault(point['date'], {'date': point['date']})
+        for field in PROGRESS_FIELDS:
+            if point[field] is not None or field not in row:
+                row[field] = point[field]
+    return [{'date': d, **{f: rows[d].get(f) for f in SERIES_FIELDS}} for d in sorted(rows)]
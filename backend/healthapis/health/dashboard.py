@@ -0,0 +1,111 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from .media import media_url
+from .models import HealthProfile, Progress, DailyTracking, HealthJournal, ChatRoom
+
+WINDOWS = (7, 30)
+
+
+def timeout():
+    # 0 thì không cache
+    return getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+
+
+def client_info(profile):
+    """Thông tin cơ bản của khách hàng (giống /health-profiles/my-clients/)."""
+    user = profile.user
+    return {
+        'id': user.id,
+        'username': user.username,
+        'name': f"{user.first_name} {user.last_name}".strip() or user.username,
+        'avatar': media_url(user.avatar),
+        'goal': profile.get_goal_display(),
+        'weight': profile.weight,
+        'height': profile.height,
+        'target_weight': profile.target_weight,
+        'bmi': profile.bmi,
+    }
+
+
+def _weight_change(weights, today, days):
+    # Cân nặng mới nhất trừ lần đo sớm nhất trong days ngày gần nhất (tính cả hôm nay,
+    # như adherence); cần ít nhất hai ngày đo
+    window = [(d, w) for d, w in weights if d > today - timedelta(days=days)]
+    if len(window) < 2:
+        return None
+    return round(window[-1][1] - window[0][1], 2)
+
+
+def client_summaries(expert, today=None):
+    """
+    Tổng hợp cho mọi khách hàng của chuyên gia trong ba truy vấn, không phụ thuộc
+    số khách hàng: hồ sơ (kèm mood nhật ký gần nhất và số tin chưa đọc), Progress
+    và DailyTracking của 30 ngày gần nhất. Chưa đo trong 30 ngày thì latest_weight
+    lấy cân nặng hồ sơ, latest_weight_source là 'profile' (có đo thì 'measured').
+    """
+    today = today or date.today()
+    start = today - timedelta(days=max(WINDOWS) - 1)
+
+    journals = HealthJournal.objects.filter(user=OuterRef('user')).order_by('-date')
+    profiles = list(HealthProfile.objects.filter(expert=expert).select_related('user').annotate(
+        last_mood=Subquery(journals.values('mood')[:1]),
+        last_journal_date=Subquery(journals.values('date')[:1]),
+        unread_count=Subquery(ChatRoom.objects.filter(
+            user=OuterRef('user'), expert=expert
+        ).values('expert_unread_count')[:1]),
+    ).order_by('user_id'))
+    user_ids = [p.user_id for p in profiles]
+
+    weights = {user_id: {} for user_id in user_ids}
+    tracked = {user_id: [] for user_id in user_ids}
+    for user_id, day, weight in DailyTracking.objects.filter(
+        user_id__in=user_ids, date__range=(start, today)
+    ).values_list('user_id', 'date', 'weight'):
+        tracked[user_id].append(day)
+        if weight is not None:
+            weights[user_id][day] = weight
+    # Cùng ngày thì ưu tiên Progress, giống charts.merge
+    for user_id, day, weight in Progress.objects.filter(
+        user_id__in=user_ids, date__range=(start, today)
+    ).values_list('user_id', 'date', 'weight'):
+        weights[user_id][day] = weight
+
+    results = []
+    for profile in profiles:
+        series = sorted(weights[profile.user_id].items())
+        days = tracked[profile.user_id]
+        row = client_info(profile)
+        row.update({
+            'latest_weight': series[-1][1] if series else profile.weight,
+            'latest_weight_date': series[-1][0] if series else None,
+            'latest_weight_source': 'measured' if series else 'profile',
+            'last_mood': profile.last_mood,
+            'last_journal_date': profile.last_journal_date,
+            'unread_count': profile.unread_count or 0,
+        })
+        for n in WINDOWS:
+            row[f'weight_change_{n}d'] = _weight_change(series, today, n)
+            # Tỷ lệ ngày có ghi theo dõi trong n ngày gần nhất (tính cả hôm nay)
+            row[f'adherence_{n}d'] = round(100 * sum(d > today - timedelta(days=n) for d in days) / n)
+        results.append(row)
+    return results
+
+
+def get_dashboard(expert, refresh=False):
+    """client_summaries có cache ngắn theo chuyên gia và ngày; refresh bỏ qua cache."""
+    today = date.today()
+    key = f'dashboard:{expert.id}:{today.isoformat()}'
+    seconds = timeout()
+    if seconds and not refresh:
+        data = cache.get(key)
+        if data is not None:
+            return data
+
+    data = {'date': today, 'clients': client_summaries(expert, today)}
+    if seconds:
+        cache.set(key, data, seconds)
+    return data
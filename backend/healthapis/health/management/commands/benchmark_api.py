@@ -0,0 +1,105 @@
+# health/management/commands/benchmark_api.py
+import json
+import logging
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from health import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Benchmark toàn bộ API (qua middleware và OAuth2) trên dữ liệu của generate_data: '
+            'thông lượng, phân vị độ trễ, số truy vấn mỗi request; so sánh với baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='gen', help='Tiền tố dữ liệu đã sinh bằng generate_data')
+        parser.add_argument('--clients', type=int, default=20,
+                            help='Số khách hàng (kèm chuyên gia) dùng để gọi API')
+        parser.add_argument('--iterations', type=int, default=50, help='Số request đo cho mỗi endpoint')
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--mix', type=int, default=500,
+                            help='Số request của lượt chạy hỗn hợp theo weight')
+        parser.add_argument('--only', nargs='*', help='Chỉ chạy endpoint có tên chứa chuỗi này')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output', help='Ghi báo cáo JSON ra file')
+        parser.add_argument('--baseline',
+                            help='File baseline (mặc định benchmarks/baseline-<vendor>.json)')
+        parser.add_argument('--save-baseline', action='store_true', help='Ghi kết quả lần này làm baseline')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Tỷ lệ chậm đi tối đa so với baseline '
+                                 '(p50 từng endpoint, p95 và thông lượng hỗn hợp)')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                            help='Bỏ qua chênh lệch độ trễ nhỏ hơn mức này (nhiễu)')
+
+    def handle(self, *args, **options):
+        contexts = benchmark.build_contexts(options['prefix'], options['clients'])
+        if not contexts:
+            raise CommandError(f'Không có dữ liệu với tiền tố "{options["prefix"]}", '
+                               'chạy generate_data trước')
+        selected = benchmark.endpoints(options['only'])
+
+        # Cảnh báo N+1 và 404 của từng request làm rối báo cáo, số liệu đã có trong bảng
+        loggers = [logging.getLogger(name) for name in ('health.metrics', 'django.request')]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        try:
+            report = benchmark.run(contexts, selected, options['iterations'], options['warmup'],
+                                   options['mix'], options['seed'])
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+        report['meta'] = {
+            **benchmark.environment_meta(),
+            'dataset': benchmark.dataset_meta(options['prefix']),
+            'clients': len(contexts),
+            'experts': len({ctx['expert_id'] for ctx in contexts}),
+            'iterations': options['iterations'],
+            'mix': options['mix'],
+            'seed': options['seed'],
+            'only': options['only'],
+        }
+        self.print_report(report)
+
+        baseline_path = Path(options['baseline'] or
+                             Path(settings.BASE_DIR) / 'benchmarks' / f'baseline-{connection.vendor}.json')
+        regressions = []
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+            self.stdout.write(f"Đã lưu baseline: {baseline_path}")
+        elif baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            different = benchmark.mismatched(report, baseline)
+            if different:
+                raise CommandError(f'Baseline {baseline_path} chạy với tham số khác ({", ".join(different)}), '
+                                   'dùng cùng tham số hoặc --save-baseline')
+            regressions = benchmark.compare(report, baseline, options['threshold'], options['min_delta_ms'])
+            self.stdout.write(f"So sánh với baseline {baseline_path}: {len(regressions)} chỉ số xấu đi")
+            for item in regressions:
+                self.stdout.write(f"  {item['endpoint']} {item['metric']}: {item['baseline']} -> {item['current']}")
+        report['regressions'] = regressions
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2, ensure_ascii=False))
+        if regressions:
+            raise CommandError(f'{len(regressions)} chỉ số chậm hơn baseline quá ngưỡng')
+
+    def print_report(self, report):
+        self.stdout.write(f"{'endpoint':<34}{'req':>5}{'err':>5}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}"
+                          f"{'queries':>9}{'req/s':>9}")
+        for name, row in report['endpoints'].items():
+            latency = row['latency_ms']
+            self.stdout.write(f"{name:<34}{row['requests']:>5}{row['errors']:>5}{latency['mean']:>9.2f}"
+                              f"{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['p99']:>9.2f}"
+                              f"{row['queries']['mean']:>9.1f}{row['throughput_rps']:>9.1f}")
+        mix = report['mix']
+        if mix['requests']:
+            self.stdout.write(
+                f"Hỗn hợp: {mix['requests']} request "
+                f"({mix['roles']['user']} user, {mix['roles']['expert']} chuyên gia), "
+                f"{mix['throughput_rps']} req/s, p50 {mix['latency_ms']['p50']} ms, p95 {mix['latency_ms']['p95']} ms, "
+                f"{mix['queries_per_request']} truy vấn/request, {mix['errors']} lỗi"
+            )
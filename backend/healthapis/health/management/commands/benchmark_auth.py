@@ -0,0 +1,74 @@
+# health/management/commands/benchmark_auth.py
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from health import auth, benchmark
+
+
+class Command(BaseCommand):
+    help = ('So sánh thông lượng request có bearer token khi tắt và bật cache token '
+            '(TOKEN_CACHE_TIMEOUT): cùng endpoint, cùng khách hàng, cùng dữ liệu của generate_data')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='gen', help='Tiền tố dữ liệu đã sinh bằng generate_data')
+        parser.add_argument('--clients', type=int, default=20, help='Số khách hàng (mỗi người một token)')
+        parser.add_argument('--requests', type=int, default=2000, help='Số request mỗi lượt')
+        parser.add_argument('--only', nargs='*', default=['chat.messages_since', 'users.current'],
+                            help='Endpoint gọi xoay vòng (mặc định: poll tin nhắn chat và user hiện tại)')
+        parser.add_argument('--timeout', type=int, default=5 * 60, help='TOKEN_CACHE_TIMEOUT của lượt bật cache')
+
+    def handle(self, *args, **options):
+        contexts = benchmark.build_contexts(options['prefix'], options['clients'])
+        if not contexts:
+            raise CommandError(f'Không có dữ liệu với tiền tố "{options["prefix"]}", '
+                               'chạy generate_data trước')
+        selected = benchmark.endpoints(options['only'])
+        if not selected:
+            raise CommandError('Không có endpoint nào khớp --only')
+
+        loggers = [logging.getLogger(name) for name in ('health.metrics', 'django.request')]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        results = {}
+        try:
+            for mode, ttl in (('tắt cache', 0), ('bật cache', options['timeout'])):
+                auth.get_cache().clear()
+                with override_settings(TOKEN_CACHE_TIMEOUT=ttl), benchmark.Runner(contexts) as runner:
+                    results[mode] = self.measure(runner, selected, contexts, options['requests'])
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+
+        self.stdout.write(f"{len(contexts)} token, {options['requests']} request mỗi lượt, "
+                          f"endpoint: {', '.join(e.name for e in selected)}")
+        self.stdout.write(f"{'':<12}{'req/s':>9}{'p50':>9}{'p95':>9}{'queries':>9}{'err':>6}")
+        for mode, row in results.items():
+            self.stdout.write(f"{mode:<12}{row['throughput_rps']:>9.1f}{row['latency_ms']['p50']:>9.2f}"
+                              f"{row['latency_ms']['p95']:>9.2f}{row['queries_per_request']:>9.2f}"
+                              f"{row['errors']:>6}")
+        if any(row['errors'] for row in results.values()):
+            raise CommandError('Có request lỗi')
+
+    def measure(self, runner, selected, contexts, requests):
+        # Lượt đầu của mỗi token đọc DB (và nạp cache) ở cả hai chế độ, không tính
+        for ctx in contexts:
+            for endpoint in selected:
+                runner.call(endpoint, ctx)
+        samples, queries, errors = [], 0, 0
+        started = time.perf_counter()
+        for i in range(requests):
+            endpoint = selected[i % len(selected)]
+            elapsed, count, status_code = runner.call(endpoint, contexts[i // len(selected) % len(contexts)])
+            samples.append(elapsed)
+            queries += count
+            errors += status_code not in endpoint.expected
+        seconds = time.perf_counter() - started
+        return {
+            'throughput_rps': round(requests / seconds, 1),
+            'latency_ms': benchmark.latency_summary(samples),
+            'queries_per_request': round(queries / requests, 2),
+            'errors': errors,
+        }
@@ -0,0 +1,92 @@
+# health/management/commands/booking_storm.py
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+from health import benchmark, booking
+from health.models import User, Consultation
+
+
+class Command(BaseCommand):
+    help = ('Nhiều luồng cùng đặt lịch một chuyên gia qua POST /consultations/: '
+            'kiểm tra không có lịch trùng và đo thông lượng, độ trễ')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help='Số luồng (mỗi luồng một user, một kết nối DB)')
+        parser.add_argument('--requests', type=int, default=800, help='Tổng số lượt đặt lịch')
+        parser.add_argument('--slots', type=int, default=40,
+                            help='Số giờ bắt đầu khác nhau, cách nhau 30 phút (lịch 60 phút nên hai giờ liền kề trùng nhau)')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        base = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        starts = [base + timedelta(minutes=30 * i) for i in range(options['slots'])]
+        queue = [rng.choice(starts) for _ in range(options['requests'])]
+        lock = threading.Lock()
+        codes, latencies = Counter(), []
+
+        # Dữ liệu tạm phải commit để các luồng (kết nối khác) thấy được, xóa khi xong
+        expert = User.objects.create(username='__storm_expert', role='trainer')
+        users = [User.objects.create(username=f'__storm_user_{i}') for i in range(options['workers'])]
+
+        def work(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                while True:
+                    with lock:
+                        if not queue:
+                            return
+                        at = queue.pop()
+                    started = time.perf_counter()
+                    res = client.post('/consultations/', {'expert': expert.id, 'appointment_date': at.isoformat()})
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        codes[res.status_code] += 1
+                        latencies.append(elapsed)
+            finally:
+                connections.close_all()
+
+        # Mỗi lượt 409 là một cảnh báo của django.request, số liệu đã có trong báo cáo
+        loggers = [logging.getLogger(name) for name in ('health.metrics', 'django.request')]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        try:
+            threads = [threading.Thread(target=work, args=(user,)) for user in users]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall = time.perf_counter() - started
+
+            booked = list(Consultation.objects.filter(expert=expert, status__in=booking.ACTIVE)
+                          .order_by('appointment_date').values_list('appointment_date', 'duration'))
+            overlaps = sum(
+                1 for (begin, duration), (next_begin, _) in zip(booked, booked[1:])
+                if begin + timedelta(minutes=duration) > next_begin
+            )
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+            User.objects.filter(id__in=[expert.id] + [user.id for user in users]).delete()
+
+        latency = benchmark.latency_summary(latencies)
+        total = sum(codes.values())
+        self.stdout.write(f"{total} lượt đặt từ {options['workers']} luồng vào {options['slots']} giờ bắt đầu "
+                          f"trong {wall:.2f}s: {total / wall:.1f} req/s")
+        self.stdout.write(f"Mã trả về: {dict(sorted(codes.items()))}")
+        self.stdout.write(f"Độ trễ (ms): p50 {latency['p50']}, p95 {latency['p95']}, p99 {latency['p99']}, "
+                          f"max {latency['max']}")
+        self.stdout.write(f"Lịch đã giữ chỗ: {len(booked)} (tối đa {(options['slots'] + 1) // 2}), trùng nhau: {overlaps}")
+        if overlaps or set(codes) - {201, 409}:
+            raise CommandError('Có lịch trùng hoặc lỗi ngoài 409')
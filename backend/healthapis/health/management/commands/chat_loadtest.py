@@ -0,0 +1,105 @@
+# health/management/commands/chat_loadtest.py
+import asyncio
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from health.models import User, ChatRoom, Message
+from health.realtime import InProcessBroker, serve, user_channel
+
+
+class Command(BaseCommand):
+    help = 'So sánh chi phí websocket chat (kết nối rảnh) với polling 3 giây'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=3000)
+        parser.add_argument('--idle-seconds', type=float, default=5.0)
+        parser.add_argument('--poll-interval', type=float, default=3.0)
+        parser.add_argument('--auth-queries', type=int, default=2,
+                            help='Số truy vấn OAuth2 mỗi request (AccessToken + User)')
+
+    def handle(self, *args, **options):
+        n = options['connections']
+
+        poll_queries = self.measure_poll_queries() + options['auth_queries']
+        polling_qps = n / options['poll_interval'] * poll_queries
+
+        per_conn, idle_queries, fanout_ms = asyncio.run(
+            self.run_idle(n, options['idle_seconds'])
+        )
+
+        self.stdout.write(f"Kết nối: {n}")
+        self.stdout.write(f"Polling: {poll_queries} truy vấn/lần -> {polling_qps:.0f} truy vấn/giây")
+        self.stdout.write(
+            f"Websocket: {idle_queries} truy vấn trong {options['idle_seconds']}s rảnh "
+            f"({idle_queries / options['idle_seconds']:.1f}/giây)"
+        )
+        self.stdout.write(f"Bộ nhớ mỗi kết nối: {per_conn / 1024:.2f} KiB")
+        self.stdout.write(f"Fan-out 1 sự kiện tới {n} kết nối: {fanout_ms:.1f} ms")
+
+    def measure_poll_queries(self):
+        # Dữ liệu tạm, rollback sau khi đo
+        with transaction.atomic():
+            user = User.objects.create_user(username='__loadtest_user', password='x')
+            expert = User.objects.create_user(username='__loadtest_expert', password='x', role='trainer')
+            room = ChatRoom.objects.create(user=user, expert=expert)
+            Message.objects.bulk_create([
+                Message(chat_room=room, sender=expert, content=f"msg {i}") for i in range(20)
+            ])
+            last_id = room.messages.order_by('-id').first().id
+
+            client = APIClient()
+            client.force_authenticate(user)
+            with CaptureQueriesContext(connection) as ctx:
+                client.get(f'/chat-rooms/{room.id}/messages/', {'since_id': last_id})
+            transaction.set_rollback(True)
+        return len(ctx)
+
+    async def run_idle(self, n, idle_seconds):
+        broker = InProcessBroker()
+        closed = asyncio.Event()
+        delivered = asyncio.Event()
+        received = 0
+
+        async def receive():
+            await closed.wait()
+            return {'type': 'websocket.disconnect'}
+
+        async def send(message):
+            nonlocal received
+            received += 1
+            if received == n:
+                delivered.set()
+
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        tasks = [
+            asyncio.ensure_future(serve(i, receive, send, broker=broker))
+            for i in range(n)
+        ]
+        await asyncio.sleep(0)
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+        allocated = sum(s.size_diff for s in after.compare_to(before, 'filename'))
+
+        idle_queries = []
+
+        def count_queries(execute, sql, params, many, context):
+            idle_queries.append(sql)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_queries):
+            await asyncio.sleep(idle_seconds)
+
+        start = time.perf_counter()
+        for i in range(n):
+            broker.publish(user_channel(i), {'type': 'message'})
+        await delivered.wait()
+        fanout_ms = (time.perf_counter() - start) * 1000
+
+        closed.set()
+        await asyncio.gather(*tasks)
+        return allocated / n, len(idle_queries), fanout_ms
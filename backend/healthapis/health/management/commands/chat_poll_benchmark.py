@@ -0,0 +1,93 @@
+# health/management/commands/chat_poll_benchmark.py
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from health import benchmark
+from health.models import Message
+
+
+class Command(BaseCommand):
+    help = ('Đo độ trễ một lượt poll GET /chat-rooms/{id}/messages/?since_id= (đọc theo index '
+            '(chat_room, id) và UPDATE is_read) khi phòng chat có 100 tới 100.000 tin nhắn: '
+            'độ trễ phải phẳng theo độ dài lịch sử. Dùng phòng chat của dữ liệu generate_data, '
+            'mọi thay đổi được rollback')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='gen', help='Tiền tố dữ liệu đã sinh bằng generate_data')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000],
+                            help='Số tin nhắn trong phòng ở mỗi lượt đo (tăng dần)')
+        parser.add_argument('--polls', type=int, default=200, help='Số lượt poll đo ở mỗi kích thước')
+        parser.add_argument('--new', type=int, default=3, help='Số tin chưa đọc đến trước mỗi lượt poll')
+        parser.add_argument('--warmup', type=int, default=10)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Số dòng mỗi lệnh INSERT khi nạp lịch sử')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        contexts = benchmark.build_contexts(options['prefix'], 1)
+        if not contexts:
+            raise CommandError(f'Không có dữ liệu với tiền tố "{options["prefix"]}", '
+                               'chạy generate_data trước')
+        ctx = dict(contexts[0])
+        # Chuyên gia poll tin khách hàng gửi tới: lượt poll trả về và đánh dấu đã đọc các tin mới
+        endpoint = benchmark.endpoints(['chat.messages_since'])[0]
+
+        loggers = [logging.getLogger(name) for name in ('health.metrics', 'django.request')]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        results = []
+        try:
+            with transaction.atomic():
+                with benchmark.Runner([ctx]) as runner:
+                    for size in sizes:
+                        self.fill(ctx, size, options['chunk_size'])
+                        results.append((size, self.measure(runner, endpoint, ctx, options)))
+                transaction.set_rollback(True)
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+
+        self.stdout.write(f"Phòng {ctx['room']}, {options['polls']} lượt poll mỗi kích thước, "
+                          f"{options['new']} tin mới mỗi lượt")
+        self.stdout.write(f"{'tin nhắn':>10}{'p50':>9}{'p95':>9}{'mean':>9}{'queries':>9}{'err':>6}")
+        for size, row in results:
+            latency = row['latency_ms']
+            self.stdout.write(f"{size:>10}{latency['p50']:>9.2f}{latency['p95']:>9.2f}{latency['mean']:>9.2f}"
+                              f"{row['queries']:>9.2f}{row['errors']:>6}")
+        first, last = results[0][1]['latency_ms']['p50'], results[-1][1]['latency_ms']['p50']
+        self.stdout.write(f"p50 {sizes[-1]} / {sizes[0]} tin: {last / first:.2f}x")
+        if any(row['errors'] for _, row in results):
+            raise CommandError('Có request lỗi')
+
+    def fill(self, ctx, size, chunk_size):
+        # Lịch sử đã đọc, hai bên xen kẽ; chỉ thêm phần còn thiếu so với lượt trước
+        missing = size - Message.objects.filter(chat_room_id=ctx['room']).count()
+        senders = (ctx['user'], ctx['expert'])
+        for start in range(0, max(missing, 0), chunk_size):
+            Message.objects.bulk_create([
+                Message(chat_room_id=ctx['room'], sender=senders[i % 2], content=f'bench {i}', is_read=True)
+                for i in range(start, min(start + chunk_size, missing))
+            ])
+
+    def measure(self, runner, endpoint, ctx, options):
+        samples, queries, errors = [], 0, 0
+        for i in range(options['warmup'] + options['polls']):
+            # Tin mới không tính vào thời gian đo; since_id là tin cuối client đã có
+            ctx['last_message'] = Message.objects.filter(chat_room_id=ctx['room']).aggregate(m=Max('id'))['m']
+            Message.objects.bulk_create([
+                Message(chat_room_id=ctx['room'], sender=ctx['user'], content=f'poll {i}')
+                for _ in range(options['new'])
+            ])
+            elapsed, count, status_code = runner.call(endpoint, ctx)
+            if i < options['warmup']:
+                continue
+            samples.append(elapsed)
+            queries += count
+            errors += status_code not in endpoint.expected
+        return {
+            'latency_ms': benchmark.latency_summary(samples),
+            'queries': queries / options['polls'],
+            'errors': errors,
+        }
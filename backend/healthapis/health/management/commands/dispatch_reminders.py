@@ -0,0 +1,40 @@
+# health/management/commands/dispatch_reminders.py
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from health import reminders
+
+
+class Command(BaseCommand):
+    help = 'Gửi nhắc nhở đến giờ (theo múi giờ của từng user) tới REMINDER_NOTIFIER'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Chỉ xử lý phút hiện tại rồi thoát')
+        parser.add_argument('--refresh-seconds', type=float, default=30,
+                            help='Chu kỳ nạp nhắc nhở đã đổi/xóa')
+        parser.add_argument('--max-lag', type=int, default=5,
+                            help='Số phút trễ tối đa còn gửi khi tiến trình bị chậm')
+
+    def handle(self, *args, **options):
+        dispatcher = reminders.Dispatcher(reminders.get_notifier())
+        started = time.perf_counter()
+        count = dispatcher.load()
+        self.stdout.write(f"Đã nạp {count} nhắc nhở trong {time.perf_counter() - started:.1f}s")
+
+        next_refresh = time.monotonic() + options['refresh_seconds']
+        while True:
+            sent = dispatcher.advance(max_lag=options['max_lag'])
+            if sent:
+                self.stdout.write(f"{timezone.now():%Y-%m-%d %H:%M} đã gửi {sent} nhắc nhở")
+            if options['once']:
+                return
+
+            # Ngủ tới đầu phút kế tiếp hoặc lần refresh, cái nào tới trước
+            now = time.time()
+            time.sleep(max(min(60 - now % 60, next_refresh - time.monotonic()), 0) + 0.01)
+            close_old_connections()
+            if time.monotonic() >= next_refresh:
+                dispatcher.refresh()
+                next_refresh = time.monotonic() + options['refresh_seconds']
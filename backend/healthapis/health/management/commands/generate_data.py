@@ -0,0 +1,309 @@
+# health/management/commands/generate_data.py
+import math
+import multiprocessing
+import random
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from health import matching, plans, reminders, rollups
+from health.models import (User, HealthProfile, DailyTracking, Progress, HealthJournal, ChatRoom, Message,
+                           Consultation, Reminder, TrackingRollup, WorkoutPlan, NutritionPlan)
+
+GOALS = ['lose_weight', 'gain_muscle', 'maintain']
+# Thay đổi cân nặng trung bình mỗi ngày theo mục tiêu (kg)
+DRIFT = {'lose_weight': -0.04, 'gain_muscle': 0.015, 'maintain': 0.0}
+MOODS = ['great', 'good', 'normal', 'tired', 'bad']
+MOOD_WEIGHTS = [2, 4, 5, 2, 1]
+REMINDERS = [
+    ('water', 'Uống nước'),
+    ('exercise', 'Tập luyện'),
+    ('meal', 'Ăn đúng bữa'),
+    ('rest', 'Đi ngủ sớm'),
+    ('medicine', 'Uống vitamin'),
+]
+PHRASES = [
+    'Hôm nay em tập đủ bài rồi ạ',
+    'Tuần này nhớ uống đủ 2 lít nước nhé',
+    'Em bị đau cơ đùi sau buổi squat',
+    'Giảm bớt tinh bột vào bữa tối nhé',
+    'Cân nặng sáng nay giảm 0.5kg',
+    'Mai mình tăng thêm 1 set plank',
+]
+CONSULT_HOURS = 9          # 8h-16h, mỗi khách hàng một khung giờ cố định
+CONSULT_CYCLE = 30         # mỗi khách hàng tối đa một buổi tư vấn mỗi 30 ngày
+TEMPLATES = 10
+
+
+# Command chạy trong tiến trình con (fork), không cần pickle
+_command = None
+
+
+def _run_group(indexes):
+    return _command.run_group(indexes)
+
+
+class Writer:
+    """Gom đối tượng theo model, ghi bằng bulk_create mỗi chunk_size dòng."""
+
+    def __init__(self, chunk_size):
+        self.chunk_size = chunk_size
+        self.pending = {}
+        self.counts = {}
+
+    def add(self, obj):
+        rows = self.pending.setdefault(type(obj), [])
+        rows.append(obj)
+        if len(rows) >= self.chunk_size:
+            self.flush(type(obj))
+
+    def insert(self, model, objs):
+        model.objects.bulk_create(objs, batch_size=self.chunk_size)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(objs)
+
+    def flush(self, model=None):
+        for m in [model] if model else list(self.pending):
+            rows = self.pending.pop(m, [])
+            if rows:
+                self.insert(m, rows)
+
+
+class Command(BaseCommand):
+    help = 'Sinh dữ liệu lớn, tất định (cùng --seed thì cùng dữ liệu) để đo hiệu năng các endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--days', type=int, default=90, help='Số ngày lịch sử tính tới hôm nay')
+        parser.add_argument('--clients-per-expert', type=int, default=100)
+        parser.add_argument('--messages', type=int, default=10, help='Số tin nhắn mỗi phòng chat')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Số dòng mỗi lệnh INSERT')
+        parser.add_argument('--group-size', type=int, default=1000, help='Số user mỗi transaction')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Số tiến trình ghi song song (MySQL); mỗi tiến trình một nhóm user')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='gen', help='Tiền tố username của dữ liệu sinh ra')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.today = date.today()
+        prefix = options['prefix']
+        if options['workers'] > 1 and connection.vendor == 'sqlite':
+            raise CommandError('SQLite không ghi song song được, dùng --workers 1')
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Đã có dữ liệu với tiền tố "{prefix}", dùng --prefix khác')
+
+        started = time.perf_counter()
+        if not WorkoutPlan.objects.filter(created_by__role='trainer').exists():
+            # Danh mục bài tập/món ăn và plan mẫu
+            call_command('populate_data', stdout=self.stdout)
+        self.templates = {}
+        for model, role in [(WorkoutPlan, 'trainer'), (NutritionPlan, 'nutritionist')]:
+            # Plan mẫu là các plan đầu tiên (populate_data), không lấy plan đã sinh ở lần chạy trước
+            templates = list(model.objects.filter(created_by__role=role).select_related('created_by')
+                             .order_by('id')[:TEMPLATES])
+            self.templates[model] = {goal: [t for t in templates if t.goal == goal] or templates
+                                     for goal in GOALS}
+        # Hash một lần: create_user băm mật khẩu cho từng user rất chậm
+        self.password = make_password('password123')
+        self.writer = Writer(options['chunk_size'])
+        counts = self.writer.counts
+
+        n_users = options['users']
+        per_expert = options['clients_per_expert']
+        with transaction.atomic():
+            self.experts = self.create_users([
+                (f'{prefix}_expert_{j:05d}', 'trainer' if j % 2 == 0 else 'nutritionist')
+                for j in range(math.ceil(n_users / per_expert))
+            ])
+
+        groups = [range(start, min(start + options['group_size'], n_users))
+                  for start in range(0, n_users, options['group_size'])]
+        if options['workers'] > 1:
+            global _command
+            _command = self
+            # Tiến trình con tự mở kết nối riêng
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(options['workers']) as pool:
+                results = pool.imap_unordered(_run_group, groups)
+                self.collect(results, counts, n_users, started)
+        else:
+            self.collect(map(self.run_group, groups), counts, n_users, started)
+        # bulk_create không gửi signal: bộ đếm ghép chuyên gia tính một lượt từ dữ liệu đã sinh
+        counts['ExpertStats'] = matching.rebuild([expert.pk for expert in self.experts])
+
+        elapsed = time.perf_counter() - started
+        total = sum(counts.values())
+        for name, count in sorted(counts.items()):
+            self.stdout.write(f'{name}: {count}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Đã tạo {total} dòng trong {elapsed:.1f}s ({total / elapsed:.0f} dòng/giây)'
+        ))
+
+    def collect(self, results, counts, n_users, started):
+        done = 0
+        for users, group_counts in results:
+            for name, count in group_counts.items():
+                counts[name] = counts.get(name, 0) + count
+            done += users
+            self.stdout.write(f'{done}/{n_users} user ({time.perf_counter() - started:.0f}s)')
+
+    def run_group(self, indexes):
+        self.writer = Writer(self.options['chunk_size'])
+        with transaction.atomic():
+            self.create_group(indexes)
+        return len(indexes), self.writer.counts
+
+    def create_users(self, specs):
+        users = [User(username=username, role=role, password=self.password) for username, role in specs]
+        self.writer.insert(User, users)
+        if users and users[0].pk is None:
+            # MySQL không trả id cho INSERT nhiều dòng
+            ids = dict(User.objects.filter(username__in=[u.username for u in users]).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+        return users
+
+    def create_group(self, indexes):
+        prefix = self.options['prefix']
+        users = self.create_users([(f'{prefix}_user_{i:07d}', 'user') for i in indexes])
+
+        profiles, clients = {}, {}
+        for i, user in zip(indexes, users):
+            # Random riêng cho từng user: dữ liệu không phụ thuộc --group-size
+            rng = random.Random(f"{self.options['seed']}:{i}")
+            expert = None
+            if rng.random() < 0.7:
+                expert = self.experts[i // self.options['clients_per_expert']]
+            profile = HealthProfile(user=user, expert=expert, height=rng.randint(150, 190),
+                                    weight=round(rng.uniform(50, 105), 1), age=rng.randint(18, 65),
+                                    goal=rng.choice(GOALS))
+            profile.target_weight = round(profile.weight + DRIFT[profile.goal] * 90, 1)
+            self.writer.add(profile)
+            profiles[user] = (i, profile)
+            self.create_history(user, profile, rng)
+            self.create_reminders(user, rng)
+            if expert:
+                clients[user] = (expert, i % self.options['clients_per_expert'], rng)
+                self.create_consultations(user, expert, clients[user][1], rng)
+        self.writer.flush()
+
+        self.create_chats(clients)
+        self.create_plans(profiles)
+
+    def create_history(self, user, profile, rng):
+        days = self.options['days']
+        adherence = rng.uniform(0.3, 0.95)
+        weight = profile.weight
+        tracked = []
+        for offset in range(days - 1, -1, -1):
+            day = self.today - timedelta(days=offset)
+            weight = round(weight + DRIFT[profile.goal] + rng.gauss(0, 0.3), 1)
+            if rng.random() < adherence:
+                tracking = DailyTracking(
+                    user=user, date=day,
+                    weight=weight if rng.random() < 0.5 else None,
+                    water_intake=rng.randrange(1000, 3250, 250),
+                    steps=int(rng.lognormvariate(8.6, 0.5)),
+                    heart_rate=rng.randint(55, 95) if rng.random() < 0.4 else None,
+                )
+                self.writer.add(tracking)
+                tracked.append((day, tracking.water_intake, tracking.steps, tracking.heart_rate, tracking.weight))
+            if offset % 7 == 0 and rng.random() < adherence:
+                self.writer.add(Progress(user=user, date=day, weight=weight,
+                                         body_fat=round(rng.uniform(12, 35), 1),
+                                         muscle_mass=round(weight * rng.uniform(0.35, 0.45), 1)))
+            if rng.random() < adherence / 3:
+                self.writer.add(HealthJournal(
+                    user=user, date=day, title=f'Nhật ký {day:%d/%m}', content=rng.choice(PHRASES),
+                    mood=rng.choices(MOODS, MOOD_WEIGHTS)[0], workout_completed=rng.random() < 0.5,
+                    energy_level=rng.randint(1, 10), sleep_hours=round(rng.uniform(5, 9), 1),
+                ))
+
+        # Bảng tổng hợp tính luôn từ dữ liệu vừa sinh thay vì rollups.rebuild
+        periods = {}
+        for row in tracked:
+            for period in rollups.PERIODS:
+                periods.setdefault((period, rollups.period_start(period, row[0])), []).append(row)
+        for (period, start), rows in periods.items():
+            self.writer.add(TrackingRollup(user=user, period=period, period_start=start,
+                                           **rollups.summarize(rows)))
+
+    def create_reminders(self, user, rng):
+        for reminder_type, title in rng.sample(REMINDERS, rng.randint(1, 3)):
+            days = list(range(7)) if rng.random() < 0.6 else sorted(rng.sample(range(7), rng.randint(1, 6)))
+            self.writer.add(Reminder(user=user, title=title, reminder_type=reminder_type,
+                                     time=dt_time(rng.randint(6, 21), rng.choice([0, 15, 30, 45])),
+                                     days_of_week=days, weekdays=reminders.weekday_mask(days),
+                                     is_enabled=rng.random() < 0.9))
+
+    def create_consultations(self, user, expert, slot, rng):
+        # Khung giờ cố định theo vị trí khách hàng: lịch của chuyên gia không bị trùng
+        hour = 8 + slot % CONSULT_HOURS
+        day_in_cycle = slot // CONSULT_HOURS
+        for cycle_start in range(-self.options['days'], 14, CONSULT_CYCLE):
+            day = self.today + timedelta(days=cycle_start + day_in_cycle)
+            if rng.random() >= 0.6 or day > self.today + timedelta(days=14):
+                continue
+            if day > self.today:
+                consultation_status = 'pending'
+            else:
+                consultation_status = 'confirmed' if rng.random() < 0.8 else 'cancelled'
+            self.writer.add(Consultation(
+                user=user, expert=expert, status=consultation_status,
+                appointment_date=timezone.make_aware(datetime.combine(day, dt_time(hour))),
+            ))
+
+    def create_chats(self, clients):
+        rooms = [ChatRoom(user=user, expert=expert) for user, (expert, _, _) in clients.items()]
+        now = timezone.now()
+        for room, (user, (expert, _, rng)) in zip(rooms, clients.items()):
+            count = self.options['messages']
+            if not count:
+                continue
+            room.last_message = rng.choice(PHRASES)
+            room.last_message_time = now
+            # Tin cuối chưa đọc với xác suất 1/2
+            if rng.random() < 0.5:
+                setattr(room, 'expert_unread_count' if count % 2 else 'user_unread_count', 1)
+        self.writer.insert(ChatRoom, rooms)
+        if rooms and rooms[0].pk is None:
+            ids = dict(ChatRoom.objects.filter(user__in=[r.user_id for r in rooms]).values_list('user_id', 'id'))
+            for room in rooms:
+                room.pk = ids[room.user_id]
+
+        for room, (user, (expert, _, rng)) in zip(rooms, clients.items()):
+            count = self.options['messages']
+            for k in range(count):
+                last = k == count - 1
+                self.writer.add(Message(
+                    chat_room=room, sender=user if k % 2 == 0 else expert,
+                    content=room.last_message if last else rng.choice(PHRASES),
+                    is_read=not (last and (room.expert_unread_count or room.user_unread_count)),
+                ))
+        self.writer.flush()
+
+    def create_plans(self, profiles):
+        # Clone plan mẫu theo mục tiêu; người tạo là chuyên gia phụ trách nếu đúng chuyên môn
+        for model, role in [(WorkoutPlan, 'trainer'), (NutritionPlan, 'nutritionist')]:
+            related_name = plans.CLONE_FIELDS[model][0]
+            item_model = getattr(model, related_name).rel.related_model
+            groups = {}
+            for user, (i, profile) in profiles.items():
+                templates = self.templates[model][profile.goal]
+                if not templates:
+                    continue
+                # Theo số thứ tự user, không theo pk (phụ thuộc dữ liệu có sẵn và thứ tự các worker)
+                template = templates[i % len(templates)]
+                expert = profile.expert
+                created_by = expert if expert and expert.role == role else template.created_by
+                groups.setdefault((template, created_by), []).append(user)
+            for (template, created_by), group in groups.items():
+                cloned = plans.clone_plan(template, group, created_by)
+                counts = self.writer.counts
+                counts[model.__name__] = counts.get(model.__name__, 0) + len(cloned)
+                counts[item_model.__name__] = counts.get(item_model.__name__, 0) + sum(
+                    len(getattr(plan, related_name).all()) for plan in cloned)
@@ -0,0 +1,97 @@
+# health/management/commands/progress_benchmark.py
+import logging
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min
+from health import benchmark, paginators, serializers
+from health.models import Progress
+
+
+class Command(BaseCommand):
+    help = ('Đo chi phí subquery tương quan previous_weight (serializers.with_previous_weight) khi '
+            'một khách hàng có 10 tới 10.000 bản ghi Progress: một trang GET /progress/ và cả lịch sử. '
+            'Dùng khách hàng của dữ liệu generate_data, mọi thay đổi được rollback')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='gen', help='Tiền tố dữ liệu đã sinh bằng generate_data')
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000],
+                            help='Số bản ghi Progress của khách hàng ở mỗi lượt đo (tăng dần)')
+        parser.add_argument('--requests', type=int, default=100, help='Số request GET /progress/ mỗi kích thước')
+        parser.add_argument('--repeat', type=int, default=5, help='Số lần đọc cả lịch sử mỗi kích thước')
+        parser.add_argument('--warmup', type=int, default=3)
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['sizes'])
+        contexts = benchmark.build_contexts(options['prefix'], 1)
+        if not contexts:
+            raise CommandError(f'Không có dữ liệu với tiền tố "{options["prefix"]}", '
+                               'chạy generate_data trước')
+        ctx = contexts[0]
+        endpoint = benchmark.endpoints(['progress.list'])[0]
+
+        loggers = [logging.getLogger(name) for name in ('health.metrics', 'django.request')]
+        levels = [logger.level for logger in loggers]
+        for logger in loggers:
+            logger.setLevel(logging.ERROR)
+        results = []
+        try:
+            with transaction.atomic():
+                # Kích thước nhỏ nhất có thể ít hơn số bản ghi generate_data đã tạo: bắt đầu từ 0
+                Progress.objects.filter(user_id=ctx['user_id']).delete()
+                with benchmark.Runner([ctx]) as runner:
+                    for size in sizes:
+                        self.fill(ctx['user_id'], size)
+                        results.append((size, self.measure(runner, endpoint, ctx, options)))
+                transaction.set_rollback(True)
+        finally:
+            for logger, level in zip(loggers, levels):
+                logger.setLevel(level)
+
+        self.stdout.write(f"Khách hàng {ctx['user_id']}, {options['requests']} request GET /progress/ "
+                          f"(trang {paginators.DateCursorPagination.page_size} dòng), "
+                          f"{options['repeat']} lần đọc cả lịch sử mỗi kích thước")
+        self.stdout.write(f"{'bản ghi':>9}{'page p50':>10}{'page p95':>10}{'queries':>9}"
+                          f"{'full ms':>10}{'µs/dòng':>9}{'err':>6}")
+        for size, row in results:
+            latency = row['latency_ms']
+            self.stdout.write(f"{size:>9}{latency['p50']:>10.2f}{latency['p95']:>10.2f}{row['queries']:>9.2f}"
+                              f"{row['full_ms']:>10.2f}{row['full_ms'] * 1000 / size:>9.2f}{row['errors']:>6}")
+        if any(row['errors'] for _, row in results):
+            raise CommandError('Có request lỗi')
+
+    def fill(self, user_id, size):
+        # Thêm các ngày liền trước ngày sớm nhất, cân nặng dao động để previous_weight khác nhau
+        current = Progress.objects.filter(user_id=user_id)
+        missing = size - current.count()
+        first = current.aggregate(d=Min('date'))['d'] or date.today() + timedelta(days=1)
+        Progress.objects.bulk_create([
+            Progress(user_id=user_id, date=first - timedelta(days=i + 1), weight=70 + (i % 50) / 10)
+            for i in range(max(missing, 0))
+        ], batch_size=5000)
+
+    def measure(self, runner, endpoint, ctx, options):
+        samples, queries, errors = [], 0, 0
+        for i in range(options['warmup'] + options['requests']):
+            elapsed, count, status_code = runner.call(endpoint, ctx)
+            if i < options['warmup']:
+                continue
+            samples.append(elapsed)
+            queries += count
+            errors += status_code not in endpoint.expected
+
+        # Cả lịch sử: một subquery (user, date) cho mỗi dòng
+        queryset = serializers.with_previous_weight(Progress.objects.filter(user_id=ctx['user_id']))
+        full = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            list(queryset.values_list('id', 'previous_weight'))
+            full.append((time.perf_counter() - started) * 1000)
+        return {
+            'latency_ms': benchmark.latency_summary(samples),
+            'queries': queries / options['requests'],
+            'full_ms': sorted(full)[len(full) // 2],
+            'errors': errors,
+        }
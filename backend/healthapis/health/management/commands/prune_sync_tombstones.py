@@ -0,0 +1,14 @@
+# health/management/commands/prune_sync_tombstones.py
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from health import sync
+from health.models import SyncTombstone
+
+
+class Command(BaseCommand):
+    help = 'Xóa tombstone của /sync/ cũ hơn SYNC_TOMBSTONE_DAYS (client cũ hơn sẽ được đồng bộ lại từ đầu)'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - sync.tombstone_retention()
+        deleted, _ = SyncTombstone.objects.filter(deleted_date__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f'Đã xóa {deleted} tombstone'))
@@ -0,0 +1,16 @@
+# health/management/commands/rebuild_expert_stats.py
+from django.core.management.base import BaseCommand
+from health import matching
+
+
+class Command(BaseCommand):
+    help = ('Dựng lại bộ đếm và điểm ghép chuyên gia từ hồ sơ, lịch tư vấn, tin nhắn '
+            '(sau khi nhập dữ liệu bằng bulk_create hoặc đổi EXPERT_MATCH_WEIGHTS)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--expert', type=int, action='append', dest='expert_ids',
+                            help='Chỉ dựng lại cho chuyên gia id này (lặp lại được)')
+
+    def handle(self, *args, **options):
+        count = matching.rebuild(options['expert_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Đã dựng lại thống kê của {count} chuyên gia!'))
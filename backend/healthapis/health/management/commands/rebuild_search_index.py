@@ -0,0 +1,18 @@
+# health/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+from health import search
+from health.models import Exercise, Food
+
+
+class Command(BaseCommand):
+    help = 'Xây lại chỉ mục tìm kiếm cho bài tập và món ăn (sau khi nhập dữ liệu bằng bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        for model in (Exercise, Food):
+            search.rebuild(model, batch_size=options['batch_size'])
+            self.stdout.write(f"{model.__name__}: {model.objects.count()} đối tượng")
+
+        self.stdout.write(self.style.SUCCESS('Đã xây lại chỉ mục tìm kiếm!'))
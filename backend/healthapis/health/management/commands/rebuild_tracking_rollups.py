@@ -0,0 +1,16 @@
+# health/management/commands/rebuild_tracking_rollups.py
+from django.core.management.base import BaseCommand
+from health import rollups
+from health.models import TrackingRollup
+
+
+class Command(BaseCommand):
+    help = 'Dựng lại bảng tổng hợp tuần/tháng từ DailyTracking (sau khi nhập dữ liệu bằng bulk_create)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Chỉ dựng lại cho user id này (lặp lại được)')
+
+    def handle(self, *args, **options):
+        rollups.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(f'Đã dựng lại {TrackingRollup.objects.count()} dòng tổng hợp!'))
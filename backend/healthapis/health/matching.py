@@ -0,0 +1,179 @@
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import User, HealthProfile, Consultation, ChatRoom, ExpertStats
+
+EXPERT_ROLES = ('nutritionist', 'trainer')
+GOALS = [goal for goal, _ in HealthProfile.GOAL_CHOICES]
+# Thời gian trả lời trung bình từ mức này trở lên bị trừ điểm tối đa
+REPLY_HORIZON = 24 * 3600
+EXPIRE_BATCH = 100
+DEFAULT_WEIGHTS = {'specialization': 1.0, 'caseload': 1.0, 'upcoming': 0.5, 'latency': 0.5}
+
+
+def weights():
+    return {**DEFAULT_WEIGHTS, **getattr(settings, 'EXPERT_MATCH_WEIGHTS', {})}
+
+
+def score_field(goal=None):
+    return f'score_{goal}' if goal else 'score'
+
+
+def avg_reply_seconds(stats):
+    return stats.reply_seconds / stats.reply_count if stats.reply_count else None
+
+
+def set_scores(stats):
+    """
+    Điểm càng cao càng nên ghép: trừ theo số khách hàng và lịch sắp tới (so với
+    EXPERT_CAPACITY) và thời gian trả lời trung bình; điểm theo mục tiêu cộng thêm
+    tỷ lệ khách hàng cùng mục tiêu. Chuyên gia chưa trả lời tin nào không bị trừ.
+    """
+    w = weights()
+    capacity = getattr(settings, 'EXPERT_CAPACITY', 100)
+    latency = min((avg_reply_seconds(stats) or 0) / REPLY_HORIZON, 1.0)
+    stats.score = round(-(w['caseload'] * stats.client_count / capacity
+                          + w['upcoming'] * stats.upcoming_consultations / capacity
+                          + w['latency'] * latency), 6)
+    for goal in GOALS:
+        share = getattr(stats, f'{goal}_clients') / stats.client_count if stats.client_count else 0
+        setattr(stats, score_field(goal), round(stats.score + w['specialization'] * share, 6))
+
+
+def _count(stats, now):
+    goals = dict(HealthProfile.objects.filter(expert_id=stats.expert_id).order_by()
+                 .values_list('goal').annotate(n=Count('id')))
+    for goal in GOALS:
+        setattr(stats, f'{goal}_clients', goals.get(goal, 0))
+    stats.client_count = sum(goals.values())
+    upcoming = Consultation.objects.filter(
+        expert_id=stats.expert_id, status__in=Consultation.ACTIVE_STATUSES, appointment_date__gt=now,
+    ).aggregate(n=Count('id'), first=Min('appointment_date'))
+    stats.upcoming_consultations, stats.next_consultation = upcoming['n'], upcoming['first']
+
+
+def refresh(expert_id, now=None, reply_seconds=None):
+    """
+    Đếm lại khách hàng và lịch sắp tới của một chuyên gia từ dữ liệu nguồn (truy
+    vấn theo index của expert), cộng thêm một lần trả lời nếu có, rồi tính lại điểm.
+    User không còn là chuyên gia (đổi role, bị khóa, đã xóa) thì bỏ dòng thống kê.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        role = User.objects.filter(pk=expert_id, role__in=EXPERT_ROLES, is_active=True).values_list(
+            'role', flat=True).first()
+        if role is None:
+            ExpertStats.objects.filter(expert_id=expert_id).delete()
+            return None
+        stats, _ = ExpertStats.objects.select_for_update().get_or_create(expert_id=expert_id,
+                                                                         defaults={'role': role})
+        stats.role = role
+        _count(stats, now)
+        if reply_seconds is not None:
+            stats.reply_count += 1
+            stats.reply_seconds += max(int(reply_seconds), 0)
+        set_scores(stats)
+        stats.save()
+    return stats
+
+
+def schedule(expert_id, reply_seconds=None):
+    # Sau commit: đếm thấy dữ liệu đã ghi, và không tạo lại dòng cho chuyên gia đang bị xóa (CASCADE)
+    if expert_id is not None:
+        transaction.on_commit(lambda: refresh(expert_id, reply_seconds=reply_seconds))
+
+
+def record_message(chat_room, message):
+    """
+    Ghi nhận tin nhắn vừa gửi (trong transaction của tin nhắn): tin của user mở
+    một lượt chờ nếu chưa có, tin của chuyên gia đóng lượt chờ và tính thời gian
+    trả lời. UPDATE có điều kiện nên hai tin gửi đồng thời chỉ đóng lượt chờ một lần.
+    """
+    rooms = ChatRoom.objects.filter(id=chat_room.id)
+    if message.sender_id != chat_room.expert_id:
+        rooms.filter(awaiting_reply_since__isnull=True).update(awaiting_reply_since=message.created_date)
+        return
+    since = chat_room.awaiting_reply_since
+    if since and rooms.filter(awaiting_reply_since=since).update(awaiting_reply_since=None):
+        chat_room.awaiting_reply_since = None
+        schedule(chat_room.expert_id, (message.created_date - since).total_seconds())
+
+
+def expire(now=None, limit=EXPIRE_BATCH):
+    """
+    Tính lại chuyên gia có lịch sắp tới đã qua giờ (index next_consultation),
+    tối đa limit người mỗi lần; thường chỉ là một truy vấn không trả về dòng nào.
+    """
+    now = now or timezone.now()
+    ids = list(ExpertStats.objects.filter(next_consultation__lte=now)
+               .order_by('next_consultation').values_list('expert_id', flat=True)[:limit])
+    for expert_id in ids:
+        refresh(expert_id, now)
+    return len(ids)
+
+
+def ranked(goal=None, role=None, limit=10):
+    """
+    Chuyên gia theo điểm giảm dần. Mỗi role một truy vấn đọc index (role, điểm) và
+    dừng sau limit dòng, rồi trộn lại: không phụ thuộc số chuyên gia.
+    """
+    field = score_field(goal)
+    rows = []
+    for expert_role in [role] if role else EXPERT_ROLES:
+        rows += ExpertStats.objects.filter(role=expert_role).select_related('expert').order_by(
+            f'-{field}', '-expert_id')[:limit]
+    rows.sort(key=lambda stats: (getattr(stats, field), stats.expert_id), reverse=True)
+    return rows[:limit]
+
+
+def rebuild(expert_ids=None, now=None, get_model=None):
+    """
+    Dựng lại toàn bộ (sau khi nhập dữ liệu bằng bulk_create, đổi EXPERT_MATCH_WEIGHTS
+    hoặc khi tạo bảng): mỗi bảng nguồn một truy vấn gom nhóm, thời gian trả lời
+    tính lại từ lịch sử tin nhắn theo index (chat_room, id).
+    """
+    now = now or timezone.now()
+    get_model = get_model or (lambda name: django_apps.get_model('health', name))
+    stats_model, room_model = get_model('ExpertStats'), get_model('ChatRoom')
+    experts = get_model('User').objects.filter(role__in=EXPERT_ROLES, is_active=True)
+    if expert_ids is not None:
+        experts = experts.filter(id__in=expert_ids)
+    stats_model.objects.exclude(expert__role__in=EXPERT_ROLES, expert__is_active=True).delete()
+    stats = {pk: stats_model(expert_id=pk, role=role) for pk, role in experts.values_list('id', 'role')}
+    profiles = get_model('HealthProfile').objects.filter(expert__in=experts).order_by()
+    for expert_id, goal, n in profiles.values_list('expert_id', 'goal').annotate(n=Count('id')):
+        setattr(stats[expert_id], f'{goal}_clients', n)
+        stats[expert_id].client_count += n
+    upcoming = get_model('Consultation').objects.filter(
+        expert__in=experts, status__in=Consultation.ACTIVE_STATUSES, appointment_date__gt=now,
+    ).order_by().values('expert_id').annotate(n=Count('id'), first=Min('appointment_date'))
+    for row in upcoming:
+        stats[row['expert_id']].upcoming_consultations = row['n']
+        stats[row['expert_id']].next_consultation = row['first']
+
+    rooms = room_model.objects.filter(expert__in=experts)
+    room_experts = dict(rooms.values_list('id', 'expert_id'))
+    awaiting = {}
+    messages = get_model('Message').objects.filter(chat_room__in=rooms).order_by('chat_room_id', 'id')
+    for room_id, sender_id, created in messages.values_list('chat_room_id', 'sender_id', 'created_date').iterator(
+            chunk_size=5000):
+        expert_id = room_experts[room_id]
+        if sender_id != expert_id:
+            awaiting.setdefault(room_id, created)
+        elif room_id in awaiting:
+            stats[expert_id].reply_count += 1
+            stats[expert_id].reply_seconds += max(int((created - awaiting.pop(room_id)).total_seconds()), 0)
+    rooms.exclude(awaiting_reply_since=None).update(awaiting_reply_since=None)
+    room_model.objects.bulk_update([room_model(id=room_id, awaiting_reply_since=since)
+                                    for room_id, since in awaiting.items()],
+                                   ['awaiting_reply_since'], batch_size=1000)
+
+    for row in stats.values():
+        set_scores(row)
+    with transaction.atomic():
+        stats_model.objects.filter(expert__in=experts).delete()
+        stats_model.objects.bulk_create(stats.values(), batch_size=1000)
+    return len(stats)
@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+from cloudinary import CloudinaryResource
+from cloudinary.models import CloudinaryField
+from cloudinary.utils import cloudinary_url
+from django.conf import settings
+
+
+class MediaUrlCache:
+    """
+    LRU giới hạn kích thước cho URL Cloudinary. Key gồm public_id và các tham số
+    biến đổi (format, version, type, resource_type, url_options).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._urls = OrderedDict()
+        self._keys_by_public_id = {}
+
+    def get(self, key):
+        with self._lock:
+            url = self._urls.get(key)
+            if url is not None:
+                self._urls.move_to_end(key)
+            return url
+
+    def set(self, key, url):
+        with self._lock:
+            self._urls[key] = url
+            self._urls.move_to_end(key)
+            self._keys_by_public_id.setdefault(key[0], set()).add(key)
+            while len(self._urls) > self.maxsize:
+                old_key, _ = self._urls.popitem(last=False)
+                self._discard_index(old_key)
+
+    def invalidate(self, public_id):
+        with self._lock:
+            for key in self._keys_by_public_id.pop(public_id, ()):
+                self._urls.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._urls.clear()
+            self._keys_by_public_id.clear()
+
+    def __len__(self):
+        return len(self._urls)
+
+    def _discard_index(self, key):
+        keys = self._keys_by_public_id.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_public_id[key[0]]
+
+
+url_cache = MediaUrlCache(getattr(settings, 'MEDIA_URL_CACHE_SIZE', 20000))
+
+
+def _resource_url(resource):
+    key = (
+        resource.public_id,
+        resource.format,
+        resource.version,
+        resource.type,
+        resource.resource_type or 'image',
+        tuple(sorted(resource.url_options.items())),
+    )
+    url = url_cache.get(key)
+    if url is None:
+        url = resource.url
+        url_cache.set(key, url)
+    return url
+
+
+def _public_id_url(public_id):
+    key = (public_id, None, None, 'upload', 'image', ())
+    url = url_cache.get(key)
+    if url is None:
+        url, _ = cloudinary_url(public_id)
+        url_cache.set(key, url)
+    return url
+
+
+def media_url(value, request=None):
+    """
+    URL cho giá trị của CloudinaryField (hoặc public_id, URL, dict từ storage khác).
+    Trả về None nếu không có ảnh/video.
+    """
+    if not value:
+        return None
+    try:
+        if isinstance(value, CloudinaryResource):
+            url = _resource_url(value) if value.public_id else None
+        elif isinstance(value, str):
+            s = value.strip()
+            if not s:
+                return None
+            if s.startswith('http://') or s.startswith('https://'):
+                return s
+            url = _public_id_url(s)
+        elif isinstance(value, dict):
+            if value.get('url'):
+                return value.get('url')
+            public_id = value.get('public_id') or value.get('publicId') or value.get('id')
+            url = _public_id_url(public_id) if public_id else None
+        elif hasattr(value, 'url'):
+            url = value.url
+        elif hasattr(value, 'file') and hasattr(value.file, 'url'):
+            url = value.file.url
+        else:
+            return None
+    except Exception:
+        return None
+
+    if url and request is not None and url.startswith('/'):
+        return request.build_absolute_uri(url)
+    return url
+
+
+def invalidate_instance(instance):
+    """Xóa URL đã cache của mọi CloudinaryField trên instance (gọi khi save/delete)."""
+    for field in instance._meta.concrete_fields:
+        if isinstance(field, CloudinaryField):
+            value = getattr(instance, field.attname, None)
+            public_id = getattr(value, 'public_id', None) or (value if isinstance(value, str) else None)
+            if public_id:
+                url_cache.invalidate(public_id)
@@ -0,0 +1,258 @@
+import bisect
+import contextvars
+import logging
+import os
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+# Số liệu của request đang chạy (middleware đặt, serializer đọc)
+current = contextvars.ContextVar('health_metrics', default=None)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+TO_REPRESENTATION = serializers.Serializer.to_representation.__code__
+
+# Biên trên các ô histogram: cấp số nhân 2^(1/4) từ 0.1, phân vị sai tối đa ~19%.
+# Dùng chung cho ms, số truy vấn và byte (tới ~3.6e8).
+BOUNDS = [0.1 * 2 ** (i / 4) for i in range(128)]
+PERCENTILES = (50, 95, 99)
+
+
+def enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+def headers_enabled():
+    return getattr(settings, 'METRICS_HEADERS', settings.DEBUG)
+
+
+def threshold():
+    return getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 5)
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS) + 1)
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        # Biên trên của ô chứa phân vị, không vượt giá trị lớn nhất đã gặp
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= rank:
+                return round(min(BOUNDS[i] if i < len(BOUNDS) else self.max, self.max), 2)
+        return None
+
+    def summary(self):
+        if not self.count:
+            return None
+        data = {'mean': round(self.total / self.count, 2), 'max': round(self.max, 2)}
+        data.update({f'p{q}': self.percentile(q) for q in PERCENTILES})
+        return data
+
+
+class EndpointStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.duration_ms = Histogram()
+        self.queries = Histogram()
+        self.db_ms = Histogram()
+        self.serializer_ms = Histogram()
+        self.response_bytes = Histogram()
+        # nguồn N+1 -> số request bị phát hiện
+        self.n_plus_one = {}
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'duration_ms': self.duration_ms.summary(),
+            'queries': self.queries.summary(),
+            'db_ms': self.db_ms.summary(),
+            'serializer_ms': self.serializer_ms.summary(),
+            'response_bytes': self.response_bytes.summary(),
+            'n_plus_one': dict(sorted(self.n_plus_one.items(), key=lambda i: -i[1])),
+        }
+
+
+class Registry:
+    """Số liệu gộp theo endpoint trong tiến trình hiện tại (mỗi worker có bản riêng)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, name, metrics, duration_ms, status_code, size, repeated):
+        with self.lock:
+            stats = self.endpoints.get(name)
+            if stats is None:
+                stats = self.endpoints[name] = EndpointStats()
+            stats.count += 1
+            stats.errors += status_code >= 500
+            stats.duration_ms.add(duration_ms)
+            stats.queries.add(metrics.queries)
+            stats.db_ms.add(metrics.db_time * 1000)
+            stats.serializer_ms.add(metrics.serializer_time * 1000)
+            stats.response_bytes.add(size)
+            for item in repeated:
+                source = item['source'] or 'unknown'
+                stats.n_plus_one[source] = stats.n_plus_one.get(source, 0) + 1
+
+    def snapshot(self):
+        with self.lock:
+            items = sorted(self.endpoints.items(), key=lambda i: -i[1].duration_ms.total)
+            return {name: stats.to_dict() for name, stats in items}
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+
+registry = Registry()
+
+
+def query_source():
+    """
+    Field serializer đang được serialize khi truy vấn chạy (Serializer.field), nếu
+    không có thì dòng code gần nhất của app gây ra truy vấn.
+    """
+    frame = sys._getframe(2)
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        if code is TO_REPRESENTATION and 'field' in frame.f_locals:
+            return f"{type(frame.f_locals['self']).__name__}.{frame.f_locals['field'].field_name}"
+        if fallback is None and code.co_filename.startswith(APP_DIR) and code.co_filename != __file__:
+            fallback = f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+        frame = frame.f_back
+    return fallback
+
+
+class RequestMetrics:
+    """execute_wrapper đếm truy vấn, thời gian DB và số lần lặp của từng câu SQL."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        # SQL (chưa gắn tham số) -> [số lần, nguồn]
+        self.shapes = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            shape = self.shapes.get(sql)
+            if shape is None:
+                self.shapes[sql] = [1, None]
+            else:
+                shape[0] += 1
+                if shape[1] is None:
+                    # Chỉ dò stack khi câu lệnh lặp lại
+                    shape[1] = query_source()
+
+    def repeated(self, limit):
+        """Các câu SQL cùng dạng chạy từ limit lần trở lên (N+1)."""
+        found = [{'sql': sql[:300], 'count': n, 'source': source}
+                 for sql, (n, source) in self.shapes.items() if n >= limit]
+        return sorted(found, key=lambda item: -item['count'])
+
+
+def _timed(prop):
+    def data(self):
+        metrics = current.get()
+        # Serializer lồng (gọi .data bên trong serializer khác) đã được tính ở ngoài
+        if metrics is None or metrics.serializing:
+            return prop.fget(self)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return prop.fget(self)
+        finally:
+            metrics.serializing = False
+            metrics.serializer_time += time.perf_counter() - start
+    data.timed = True
+    return property(data)
+
+
+def install():
+    """Đo thời gian serialize qua .data của Serializer/ListSerializer (gọi từ AppConfig.ready)."""
+    if not enabled():
+        return
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, 'timed', False):
+            cls.data = _timed(prop)
+
+
+def endpoint_name(request):
+    match = request.resolver_match
+    return f"{request.method} {match.view_name}" if match else None
+
+
+class MetricsMiddleware:
+    """
+    Ghi số truy vấn, thời gian DB, thời gian serialize và kích thước response của
+    từng request vào registry; khi METRICS_HEADERS bật thì trả kèm qua header.
+    """
+
+    def __init__(self, get_response):
+        if not enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current.reset(token)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        size = 0 if response.streaming else len(response.content)
+        repeated = metrics.repeated(threshold())
+        for item in repeated:
+            logger.warning("N+1: %s x%d tại %s (%s)", item['sql'][:120], item['count'],
+                           item['source'], request.path)
+
+        name = endpoint_name(request)
+        if name:
+            registry.record(name, metrics, duration_ms, response.status_code, size, repeated)
+
+        if headers_enabled():
+            response['X-DB-Queries'] = str(metrics.queries)
+            response['X-Response-Size'] = str(size)
+            response['Server-Timing'] = (f"db;dur={metrics.db_time * 1000:.1f}, "
+                                         f"serializer;dur={metrics.serializer_time * 1000:.1f}, "
+                                         f"total;dur={duration_ms:.1f}")
+            if repeated:
+                response['X-Duplicate-Queries'] = '; '.join(
+                    f"{item['source'] or 'unknown'} x{item['count']}" for item in repeated)
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['chat_room', 'id'], name='health_mess_chat_ro_90b5b8_idx'),
+        ),
+    ]
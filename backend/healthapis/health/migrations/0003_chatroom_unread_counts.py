@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def backfill_unread_counts(apps, schema_editor):
+    ChatRoom = apps.get_model('health', 'ChatRoom')
+    rooms = ChatRoom.objects.annotate(
+        user_unread=Count('messages', filter=Q(messages__is_read=False) & ~Q(messages__sender=F('user'))),
+        expert_unread=Count('messages', filter=Q(messages__is_read=False) & ~Q(messages__sender=F('expert'))),
+    )
+    for room in rooms.iterator():
+        if room.user_unread or room.expert_unread:
+            ChatRoom.objects.filter(id=room.id).update(
+                user_unread_count=room.user_unread,
+                expert_unread_count=room.expert_unread,
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0002_message_chat_room_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='expert_unread_count',
+            field=models.IntegerField(default=0, help_text='Số tin chưa đọc của chuyên gia'),
+        ),
+        migrations.AddField(
+            model_name='chatroom',
+            name='user_unread_count',
+            field=models.IntegerField(default=0, help_text='Số tin chưa đọc của user'),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
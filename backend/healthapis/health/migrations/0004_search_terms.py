@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 19:44
+
+import re
+import unicodedata
+from html import unescape
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+# Bản sao cách tách term của health/search.py lúc tạo migration: migration không
+# phụ thuộc code hiện tại của app
+FIELDS = [('name', 3.0), ('description', 1.0)]
+TOKEN_RE = re.compile(r'\w+')
+BATCH_SIZE = 1000
+
+
+def tokenize(text):
+    text = unescape(strip_tags(text or '')).lower().replace('đ', 'd')
+    text = ''.join(c for c in unicodedata.normalize('NFD', text) if not unicodedata.combining(c))
+    return [t[:64] for t in TOKEN_RE.findall(text) if len(t) >= 2 or t.isdigit()]
+
+
+def build_search_index(apps, schema_editor):
+    for model_name, term_model_name, fk in (('Exercise', 'ExerciseSearchTerm', 'exercise_id'),
+                                            ('Food', 'FoodSearchTerm', 'food_id')):
+        model = apps.get_model('health', model_name)
+        term_model = apps.get_model('health', term_model_name)
+        batch = []
+        for instance in model.objects.all().iterator(chunk_size=BATCH_SIZE):
+            weights = {}
+            for field, weight in FIELDS:
+                for token in tokenize(getattr(instance, field)):
+                    weights[token] = weights.get(token, 0) + weight
+            batch.extend(term_model(term=term, weight=weight, **{fk: instance.pk}) for term, weight in weights.items())
+            if len(batch) >= BATCH_SIZE:
+                term_model.objects.bulk_create(batch)
+                batch = []
+        term_model.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0003_chatroom_unread_counts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='Từ đã bỏ dấu, chữ thường', max_length=64)),
+                ('weight', models.FloatField(default=1.0)),
+                ('exercise', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='health.exercise')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'exercise'], name='health_exer_term_7a4eec_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='FoodSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(help_text='Từ đã bỏ dấu, chữ thường', max_length=64)),
+                ('weight', models.FloatField(default=1.0)),
+                ('food', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='health.food')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'food'], name='health_food_term_bf347d_idx')],
+            },
+        ),
+        migrations.RunPython(build_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0004_search_terms'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted_date', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailytracking',
+            index=models.Index(fields=['user', 'updated_date'], name='health_dail_user_id_e4e57a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthjournal',
+            index=models.Index(fields=['user', 'updated_date'], name='health_heal_user_id_73cc8c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nutritionplan',
+            index=models.Index(fields=['user', 'updated_date'], name='health_nutr_user_id_3b534b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['user', 'updated_date'], name='health_prog_user_id_69b4f6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['user', 'updated_date'], name='health_remi_user_id_6ece62_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['user', 'updated_date'], name='health_work_user_id_4e71f8_idx'),
+        ),
+        migrations.AddField(
+            model_name='synctombstone',
+            name='user',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['user', 'model', 'deleted_date'], name='health_sync_user_id_470515_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['deleted_date'], name='health_sync_deleted_247dcf_idx'),
+        ),
+    ]
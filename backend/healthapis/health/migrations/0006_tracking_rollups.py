@@ -0,0 +1,90 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:09
+
+from datetime import timedelta
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# Bản sao cách tổng hợp của health/rollups.py lúc tạo migration: migration không
+# phụ thuộc code hiện tại của app
+WORKOUT_STEPS = 5000
+BATCH_SIZE = 1000
+
+
+def _period_starts(day):
+    return (('week', day - timedelta(days=day.weekday())), ('month', day.replace(day=1)))
+
+
+def _add(totals, water, steps, heart_rate, weight):
+    # Các ngày đến theo thứ tự tăng dần nên weight_last là cân nặng ngày cuối
+    totals['active_days'] += 1
+    totals['water_total'] += water or 0
+    totals['steps_total'] += steps or 0
+    totals['workout_days'] += (steps or 0) >= WORKOUT_STEPS
+    if heart_rate is not None:
+        totals['heart_rate_total'] += heart_rate
+        totals['heart_rate_days'] += 1
+    if weight is not None:
+        totals['weight_min'] = weight if totals['weight_min'] is None else min(totals['weight_min'], weight)
+        totals['weight_max'] = weight if totals['weight_max'] is None else max(totals['weight_max'], weight)
+        totals['weight_last'] = weight
+
+
+def build_rollups(apps, schema_editor):
+    DailyTracking = apps.get_model('health', 'DailyTracking')
+    TrackingRollup = apps.get_model('health', 'TrackingRollup')
+    # Bảng vừa tạo, chưa có dòng nào: chỉ cần insert. Đọc theo (user, ngày), mỗi
+    # user chỉ giữ các kỳ của chính mình trong bộ nhớ.
+    rows = DailyTracking.objects.order_by('user_id', 'date').values_list(
+        'user_id', 'date', 'water_intake', 'steps', 'heart_rate', 'weight')
+    current, periods, batch = None, {}, []
+    for user_id, day, water, steps, heart_rate, weight in rows.iterator(chunk_size=5000):
+        if user_id != current:
+            batch.extend(TrackingRollup(user_id=current, period=period, period_start=start, **totals)
+                         for (period, start), totals in periods.items())
+            current, periods = user_id, {}
+            if len(batch) >= BATCH_SIZE:
+                TrackingRollup.objects.bulk_create(batch)
+                batch = []
+        for key in _period_starts(day):
+            totals = periods.setdefault(key, dict(
+                active_days=0, workout_days=0, water_total=0, steps_total=0, heart_rate_total=0,
+                heart_rate_days=0, weight_min=None, weight_max=None, weight_last=None))
+            _add(totals, water, steps, heart_rate, weight)
+    batch.extend(TrackingRollup(user_id=current, period=period, period_start=start, **totals)
+                 for (period, start), totals in periods.items())
+    TrackingRollup.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0005_sync_indexes_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrackingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('week', 'Tuần'), ('month', 'Tháng')], max_length=10)),
+                ('period_start', models.DateField(help_text='Thứ 2 của tuần hoặc ngày 1 của tháng')),
+                ('active_days', models.IntegerField(default=0)),
+                ('workout_days', models.IntegerField(default=0, help_text='Số ngày đi từ 5000 bước')),
+                ('water_total', models.IntegerField(default=0)),
+                ('steps_total', models.BigIntegerField(default=0)),
+                ('heart_rate_total', models.IntegerField(default=0)),
+                ('heart_rate_days', models.IntegerField(default=0)),
+                ('weight_min', models.FloatField(blank=True, null=True)),
+                ('weight_max', models.FloatField(blank=True, null=True)),
+                ('weight_last', models.FloatField(blank=True, null=True)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tracking_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'period', 'period_start')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 20:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('health', '0006_tracking_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['expert', 'appointment_date', 'status'], name='health_cons_expert__7b822b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='consultation',
+            index=models.Index(fields=['user', 'appointment_date', 'status'], name='health_cons_user_id_8bb33d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='exercise',
+            index=models.Index(fields=['category', 'difficulty'], name='health_exer_categor_8a708f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='food',
+            index=models.Index(fields=['meal_type', 'calories'], name='health_food_meal_ty_7ce1b4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nutritionplan',
+            index=models.Index(fields=['created_by', 'active'], name='health_nutr_created_2cc05d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nutritionplan',
+            index=models.Index(fields=['goal', 'active', 'created_date'], name='health_nutr_goal_c12613_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='progress',
+            index=models.Index(fields=['user', 'date'], name='health_prog_user_id_b89594_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['role'], name='health_user_role_67e417_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['created_by', 'active'], name='health_work_created_c5693c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['goal', 'active', 'created_date'], name='health_work_goal_8ecc26_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:04
+
+from django.db import migrations, models
+
+CHUNK_SIZE = 5000
+
+
+def weekday_mask(days):
+    # Bản sao health/reminders.weekday_mask lúc tạo migration: [0-6] -> bitmask, bit d là thứ d
+    mask = 0
+    for day in days or ():
+        if isinstance(day, int) and 0 <= day <= 6:
+            mask |= 1 << day
+    return mask
+
+
+def fill_weekdays(apps, schema_editor):
+    Reminder = apps.get_model('health', 'Reminder')
+    last_id = 0
+    while True:
+        rows = list(Reminder.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'days_of_week')[:CHUNK_SIZE])
+        if not rows:
+            return
+        # Mỗi chunk một UPDATE cho mỗi bitmask; cột mới mặc định 0 nên bỏ qua mask rỗng
+        groups = {}
+        for pk, days in rows:
+            mask = weekday_mask(days)
+            if mask:
+                groups.setdefault(mask, []).append(pk)
+        for mask, ids in groups.items():
+            Reminder.objects.filter(id__in=ids).update(weekdays=mask)
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0007_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reminder',
+            name='weekdays',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Bitmask của days_of_week, bit d là thứ d'),
+        ),
+        # Điền trước khi tạo index để UPDATE không phải cập nhật index
+        migrations.RunPython(fill_weekdays, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['time', 'is_enabled', 'weekdays'], name='health_remi_time_28c869_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0008_reminder_weekdays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='timezone',
+            field=models.CharField(default='Asia/Ho_Chi_Minh', help_text='Múi giờ IANA của người dùng', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='reminder',
+            index=models.Index(fields=['updated_date'], name='health_remi_updated_da9caf_idx'),
+        ),
+    ]
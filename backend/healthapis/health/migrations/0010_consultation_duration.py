@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 21:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0009_reminder_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='consultation',
+            name='duration',
+            field=models.PositiveSmallIntegerField(default=60),
+        ),
+    ]
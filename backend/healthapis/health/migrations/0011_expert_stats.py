@@ -0,0 +1,110 @@
+# Generated by Django 5.2.7 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.utils import timezone
+
+
+# Bản sao cách tính của health/matching.py lúc tạo migration: migration không phụ
+# thuộc code hiện tại của app (đổi trọng số sau này thì chạy rebuild_expert_stats)
+EXPERT_ROLES = ('nutritionist', 'trainer')
+GOALS = ('lose_weight', 'gain_muscle', 'maintain')
+ACTIVE_STATUSES = ('pending', 'confirmed')
+REPLY_HORIZON = 24 * 3600
+DEFAULT_WEIGHTS = {'specialization': 1.0, 'caseload': 1.0, 'upcoming': 0.5, 'latency': 0.5}
+
+
+def set_scores(stats, weights, capacity):
+    latency = min((stats.reply_seconds / stats.reply_count if stats.reply_count else 0) / REPLY_HORIZON, 1.0)
+    stats.score = round(-(weights['caseload'] * stats.client_count / capacity
+                          + weights['upcoming'] * stats.upcoming_consultations / capacity
+                          + weights['latency'] * latency), 6)
+    for goal in GOALS:
+        share = getattr(stats, f'{goal}_clients') / stats.client_count if stats.client_count else 0
+        setattr(stats, f'score_{goal}', round(stats.score + weights['specialization'] * share, 6))
+
+
+def build_expert_stats(apps, schema_editor):
+    ExpertStats = apps.get_model('health', 'ExpertStats')
+    ChatRoom = apps.get_model('health', 'ChatRoom')
+    now = timezone.now()
+    experts = apps.get_model('health', 'User').objects.filter(role__in=EXPERT_ROLES, is_active=True)
+    stats = {pk: ExpertStats(expert_id=pk, role=role) for pk, role in experts.values_list('id', 'role')}
+
+    profiles = apps.get_model('health', 'HealthProfile').objects.filter(expert__in=experts).order_by()
+    for expert_id, goal, n in profiles.values_list('expert_id', 'goal').annotate(n=Count('id')):
+        setattr(stats[expert_id], f'{goal}_clients', n)
+        stats[expert_id].client_count += n
+    upcoming = apps.get_model('health', 'Consultation').objects.filter(
+        expert__in=experts, status__in=ACTIVE_STATUSES, appointment_date__gt=now,
+    ).order_by().values('expert_id').annotate(n=Count('id'), first=Min('appointment_date'))
+    for row in upcoming:
+        stats[row['expert_id']].upcoming_consultations = row['n']
+        stats[row['expert_id']].next_consultation = row['first']
+
+    # Thời gian trả lời từ lịch sử tin nhắn: tin đầu tiên của user chưa được trả lời
+    # mở lượt chờ, tin kế tiếp của chuyên gia đóng lượt chờ
+    rooms = ChatRoom.objects.filter(expert__in=experts)
+    room_experts = dict(rooms.values_list('id', 'expert_id'))
+    awaiting = {}
+    messages = apps.get_model('health', 'Message').objects.filter(chat_room__in=rooms).order_by('chat_room_id', 'id')
+    for room_id, sender_id, created in messages.values_list('chat_room_id', 'sender_id', 'created_date').iterator(
+            chunk_size=5000):
+        expert_id = room_experts[room_id]
+        if sender_id != expert_id:
+            awaiting.setdefault(room_id, created)
+        elif room_id in awaiting:
+            stats[expert_id].reply_count += 1
+            stats[expert_id].reply_seconds += max(int((created - awaiting.pop(room_id)).total_seconds()), 0)
+    ChatRoom.objects.bulk_update([ChatRoom(id=room_id, awaiting_reply_since=since)
+                                  for room_id, since in awaiting.items()],
+                                 ['awaiting_reply_since'], batch_size=1000)
+
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'EXPERT_MATCH_WEIGHTS', {})}
+    capacity = getattr(settings, 'EXPERT_CAPACITY', 100)
+    for row in stats.values():
+        set_scores(row, weights, capacity)
+    # Bảng vừa tạo, chưa có dòng nào
+    ExpertStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('health', '0010_consultation_duration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatroom',
+            name='awaiting_reply_since',
+            field=models.DateTimeField(blank=True, help_text='Tin đầu tiên của user chưa được chuyên gia trả lời', null=True),
+        ),
+        migrations.CreateModel(
+            name='ExpertStats',
+            fields=[
+                ('expert', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='expert_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('role', models.CharField(help_text='Sao từ User.role, đứng đầu các index điểm', max_length=20)),
+                ('client_count', models.IntegerField(default=0)),
+                ('lose_weight_clients', models.IntegerField(default=0)),
+                ('gain_muscle_clients', models.IntegerField(default=0)),
+                ('maintain_clients', models.IntegerField(default=0)),
+                ('upcoming_consultations', models.IntegerField(default=0)),
+                ('next_consultation', models.DateTimeField(blank=True, help_text='Lịch sắp tới sớm nhất; qua mốc này thì tính lại', null=True)),
+                ('reply_count', models.IntegerField(default=0)),
+                ('reply_seconds', models.BigIntegerField(default=0)),
+                ('score', models.FloatField(default=0)),
+                ('score_lose_weight', models.FloatField(default=0)),
+                ('score_gain_muscle', models.FloatField(default=0)),
+                ('score_maintain', models.FloatField(default=0)),
+                ('updated_date', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Expert stats',
+                'indexes': [models.Index(fields=['role', 'score'], name='health_expe_role_f4d42c_idx'), models.Index(fields=['role', 'score_lose_weight'], name='health_expe_role_1bb4b8_idx'), models.Index(fields=['role', 'score_gain_muscle'], name='health_expe_role_95388d_idx'), models.Index(fields=['role', 'score_maintain'], name='health_expe_role_d0daf3_idx'), models.Index(fields=['next_consultation'], name='health_expe_next_co_d02bf7_idx')],
+            },
+        ),
+        migrations.RunPython(build_expert_stats, migrations.RunPython.noop),
+    ]
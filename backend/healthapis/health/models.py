@@ -13,6 +13,12 @@ class User(AbstractUser):
     avatar = CloudinaryField(null=True)
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='user')
     phone = models.CharField(max_length=15, null=True, blank=True)
+    timezone = models.CharField(max_length=64, default='Asia/Ho_Chi_Minh', help_text="Múi giờ IANA của người dùng")
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['role']),
+        ]
 
     def __str__(self):
         return f"{self.username} - {self.get_role_display()}"
@@ -64,11 +70,42 @@ class DailyTracking(BaseModel):
     class Meta:
         unique_together = ('user', 'date')
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.date}"
 
 
+class TrackingRollup(models.Model):
+    """Tổng hợp DailyTracking theo tuần ISO / tháng, cập nhật khi tracking thay đổi (health/rollups.py)."""
+    PERIOD_CHOICES = [
+        ('week', 'Tuần'),
+        ('month', 'Tháng'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tracking_rollups')
+    period = models.CharField(max_length=10, choices=PERIOD_CHOICES)
+    period_start = models.DateField(help_text="Thứ 2 của tuần hoặc ngày 1 của tháng")
+    active_days = models.IntegerField(default=0)
+    workout_days = models.IntegerField(default=0, help_text="Số ngày đi từ 5000 bước")
+    water_total = models.IntegerField(default=0)
+    steps_total = models.BigIntegerField(default=0)
+    heart_rate_total = models.IntegerField(default=0)
+    heart_rate_days = models.IntegerField(default=0)
+    weight_min = models.FloatField(null=True, blank=True)
+    weight_max = models.FloatField(null=True, blank=True)
+    weight_last = models.FloatField(null=True, blank=True)
+    updated_date = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('user', 'period', 'period_start')
+
+    def __str__(self):
+        return f"{self.user.username} - {self.period} {self.period_start}"
+
+
 class ExerciseCategory(models.Model):
     name = models.CharField(max_length=100, unique=True)
     description = models.TextField(null=True, blank=True)
@@ -102,6 +139,11 @@ class Exercise(BaseModel):
     )
     instructions = models.TextField(help_text="Hướng dẫn thực hiện")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'difficulty']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -116,6 +158,14 @@ class WorkoutPlan(BaseModel):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                    related_name='created_workout_plans')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+            models.Index(fields=['created_by', 'active']),
+            # Plan mẫu theo mục tiêu, mới nhất trước (get_templates)
+            models.Index(fields=['goal', 'active', 'created_date']),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
@@ -163,6 +213,11 @@ class Food(BaseModel):
     fat = models.FloatField(help_text="Fat (g)")
     recipe = models.TextField(null=True, blank=True, help_text="Công thức nấu")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['meal_type', 'calories']),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -178,6 +233,14 @@ class NutritionPlan(BaseModel):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True,
                                    related_name='created_nutrition_plans')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+            models.Index(fields=['created_by', 'active']),
+            # Plan mẫu theo mục tiêu, mới nhất trước (get_templates)
+            models.Index(fields=['goal', 'active', 'created_date']),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.user.username}"
 
@@ -207,6 +270,10 @@ class Progress(BaseModel):
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+            models.Index(fields=['user', 'date']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.date}"
@@ -218,17 +285,27 @@ class Consultation(BaseModel):
         ('confirmed', 'Đã xác nhận'),
         ('cancelled', 'Đã hủy'),
     ]
+    # Trạng thái còn giữ chỗ trong lịch của chuyên gia; giới hạn thời lượng (phút)
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+    MIN_DURATION = 15
+    MAX_DURATION = 240
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='consultations')
     expert = models.ForeignKey(User, on_delete=models.CASCADE, related_name='expert_consultations',
                                limit_choices_to={'role__in': ['nutritionist', 'trainer']})
     appointment_date = models.DateTimeField()
+    # Thời lượng (phút), lịch chiếm khoảng [appointment_date, appointment_date + duration)
+    duration = models.PositiveSmallIntegerField(default=60)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(null=True, blank=True)
     feedback = models.TextField(null=True, blank=True)
 
     class Meta:
         ordering = ['-appointment_date']
+        indexes = [
+            models.Index(fields=['expert', 'appointment_date', 'status']),
+            models.Index(fields=['user', 'appointment_date', 'status']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.expert.username} ({self.appointment_date})"
@@ -248,11 +325,19 @@ class Reminder(BaseModel):
     reminder_type = models.CharField(max_length=20, choices=REMINDER_TYPE_CHOICES)
     time = models.TimeField(help_text="Giờ nhắc nhở")
     days_of_week = models.JSONField(default=list, help_text="Các ngày trong tuần [0-6]")
+    # Suy ra từ days_of_week khi lưu (health/reminders.py), để lọc theo thứ bằng index
+    weekdays = models.PositiveSmallIntegerField(default=0, help_text="Bitmask của days_of_week, bit d là thứ d")
     is_enabled = models.BooleanField(default=True)
     message = models.TextField(null=True, blank=True)
 
     class Meta:
         ordering = ['time']
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+            models.Index(fields=['time', 'is_enabled', 'weekdays']),
+            # Bộ điều phối nhắc nhở đọc thay đổi của mọi user (health/reminders.py)
+            models.Index(fields=['updated_date']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.title} ({self.time})"
@@ -281,6 +366,9 @@ class HealthJournal(BaseModel):
     class Meta:
         ordering = ['-date']
         unique_together = ('user', 'date')
+        indexes = [
+            models.Index(fields=['user', 'updated_date']),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.date} - {self.title}"
@@ -292,11 +380,18 @@ class ChatRoom(BaseModel):
                                limit_choices_to={'role__in': ['nutritionist', 'trainer']})
     last_message = models.TextField(null=True, blank=True)
     last_message_time = models.DateTimeField(null=True, blank=True)
+    user_unread_count = models.IntegerField(default=0, help_text="Số tin chưa đọc của user")
+    expert_unread_count = models.IntegerField(default=0, help_text="Số tin chưa đọc của chuyên gia")
+    awaiting_reply_since = models.DateTimeField(null=True, blank=True,
+                                                help_text="Tin đầu tiên của user chưa được chuyên gia trả lời")
 
     class Meta:
         unique_together = ('user', 'expert')
         ordering = ['-last_message_time']
 
+    def unread_field(self, user):
+        return 'expert_unread_count' if user.id == self.expert_id else 'user_unread_count'
+
     def __str__(self):
         return f"{self.user.username} - {self.expert.username}"
 
@@ -309,9 +404,94 @@ class Message(BaseModel):
 
     class Meta:
         ordering = ['created_date']
+        indexes = [
+            models.Index(fields=['chat_room', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.sender.username}: {self.content[:50]}"
 
 
+class ExpertStats(models.Model):
+    """
+    Bộ đếm tải, chuyên môn và tốc độ trả lời của chuyên gia đang hoạt động cùng điểm
+    ghép cặp đã tính sẵn (health/matching.py), cập nhật khi hồ sơ, lịch tư vấn, tin
+    nhắn thay đổi.
+    """
+    expert = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='expert_stats')
+    role = models.CharField(max_length=20, help_text="Sao từ User.role, đứng đầu các index điểm")
+    client_count = models.IntegerField(default=0)
+    lose_weight_clients = models.IntegerField(default=0)
+    gain_muscle_clients = models.IntegerField(default=0)
+    maintain_clients = models.IntegerField(default=0)
+    upcoming_consultations = models.IntegerField(default=0)
+    next_consultation = models.DateTimeField(null=True, blank=True,
+                                             help_text="Lịch sắp tới sớm nhất; qua mốc này thì tính lại")
+    reply_count = models.IntegerField(default=0)
+    reply_seconds = models.BigIntegerField(default=0)
+    score = models.FloatField(default=0)
+    score_lose_weight = models.FloatField(default=0)
+    score_gain_muscle = models.FloatField(default=0)
+    score_maintain = models.FloatField(default=0)
+    updated_date = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        verbose_name_plural = "Expert stats"
+        indexes = [
+            models.Index(fields=['role', 'score']),
+            models.Index(fields=['role', 'score_lose_weight']),
+            models.Index(fields=['role', 'score_gain_muscle']),
+            models.Index(fields=['role', 'score_maintain']),
+            models.Index(fields=['next_consultation']),
+        ]
+
+    def __str__(self):
+        return f"{self.expert.username} - {self.client_count} khách hàng"
+
+
+
+class SearchTermBase(models.Model):
+    term = models.CharField(max_length=64, help_text="Từ đã bỏ dấu, chữ thường")
+    weight = models.FloatField(default=1.0)
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.term
+
+
+class ExerciseSearchTerm(SearchTermBase):
+    exercise = models.ForeignKey(Exercise, on_delete=models.CASCADE, related_name='search_terms')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'exercise']),
+        ]
+
+
+class FoodSearchTerm(SearchTermBase):
+    food = models.ForeignKey(Food, on_delete=models.CASCADE, related_name='search_terms')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'food']),
+        ]
+
+
+class SyncTombstone(models.Model):
+    """Dấu xóa cho /sync/: client xóa bản ghi local có (model, object_id)."""
+    # Không ràng buộc FK: tombstone được ghi cả khi xóa dây chuyền theo user
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    deleted_date = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'model', 'deleted_date']),
+            models.Index(fields=['deleted_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.model}#{self.object_id}"
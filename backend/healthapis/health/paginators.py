@@ -0,0 +1,78 @@
+from django.db.models import QuerySet
+from rest_framework import pagination
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+UNIQUE_ORDERING = ('pk', '-pk', 'id', '-id')
+
+
+def stable_ordering(queryset):
+    """
+    Thêm pk vào cuối ordering nếu chưa có: LIMIT/OFFSET trên queryset không sắp
+    xếp (hoặc sắp theo cột có giá trị trùng) có thể trả các trang trùng/sót dòng.
+    """
+    if not isinstance(queryset, QuerySet):
+        return queryset
+    if not queryset.ordered:
+        return queryset.order_by('pk')
+    ordering = list(queryset.query.order_by or queryset.model._meta.ordering)
+    if ordering and ordering[-1] in UNIQUE_ORDERING:
+        return queryset
+    return queryset.order_by(*ordering, 'pk')
+
+
+class StandardPagination(pagination.LimitOffsetPagination):
+    # Danh mục (bài tập, món ăn...) và các danh sách nhỏ
+    default_limit = 50
+    max_limit = 200
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return super().paginate_queryset(stable_ordering(queryset), request, view)
+
+
+class DateCursorPagination(pagination.CursorPagination):
+    # Keyset theo (date, id) cho dữ liệu theo ngày, không dùng OFFSET
+    ordering = ('-date', '-id')
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class AppointmentCursorPagination(DateCursorPagination):
+    ordering = ('-appointment_date', '-id')
+
+
+class MessageKeysetPagination(pagination.BasePagination):
+    """
+    Keyset theo id tin nhắn, giữ response dạng list:
+    ?since_id=N  -> các tin mới hơn N (tăng dần)
+    ?before_id=N -> trang cũ hơn N (tăng dần)
+    mặc định     -> trang mới nhất
+    """
+    page_size = 50
+    max_page_size = 200
+
+    def _int_param(self, request, name, default=None):
+        value = request.query_params.get(name)
+        if not value:
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            raise ValidationError({"detail": f"{name} không hợp lệ"})
+
+    def paginate_queryset(self, queryset, request, view=None):
+        limit = min(max(self._int_param(request, 'limit', self.page_size), 1), self.max_page_size)
+        since_id = self._int_param(request, 'since_id')
+        before_id = self._int_param(request, 'before_id')
+
+        if since_id is not None:
+            return list(queryset.filter(id__gt=since_id).order_by('id')[:limit])
+
+        if before_id is not None:
+            queryset = queryset.filter(id__lt=before_id)
+        return list(queryset.order_by('-id')[:limit])[::-1]
+
+    def get_paginated_response(self, data):
+        return Response(data)
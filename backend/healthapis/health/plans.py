@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+
+from django.db import connection, transaction
+from django.db.models import Prefetch, prefetch_related_objects
+
+from .models import WorkoutPlan, NutritionPlan
+
+BATCH_SIZE = 1000
+MAX_ASSIGN = 1000
+
+# Plan -> (related_name của lịch, FK về plan, select_related của lịch,
+#          field copy từ plan mẫu, field copy từ từng dòng lịch)
+CLONE_FIELDS = {
+    WorkoutPlan: ('schedules', 'workout_plan', 'exercise__category',
+                  ['goal', 'description'],
+                  ['exercise', 'weekday', 'sets', 'reps', 'notes']),
+    NutritionPlan: ('meal_schedules', 'nutrition_plan', 'food',
+                    ['goal', 'description', 'daily_calories'],
+                    ['food', 'weekday', 'portion', 'notes']),
+}
+
+
+def _set_prefetched(instance, related_name, fk_name, objects):
+    # Giống kết quả prefetch_related_objects nhưng từ dữ liệu đã có
+    queryset = getattr(instance, related_name).model.objects.filter(**{fk_name: instance})
+    queryset._result_cache = objects
+    queryset._prefetch_done = True
+    instance._prefetched_objects_cache = {related_name: queryset}
+
+
+def clone_plan(template, users, created_by, name=None):
+    """
+    Clone plan mẫu (kèm lịch) cho từng user trong một transaction, lịch chèn
+    bằng bulk_create. Plan trả về đã gắn sẵn lịch để serialize không cần truy vấn.
+    """
+    model = type(template)
+    related_name, fk_name, item_related, plan_fields, item_fields = CLONE_FIELDS[model]
+    item_model = getattr(template, related_name).model
+    # Không truy vấn lại nếu template lấy từ queryset đã prefetch của viewset
+    prefetch_related_objects([template], Prefetch(
+        related_name, queryset=item_model.objects.select_related(item_related)))
+    items = list(getattr(template, related_name).all())
+
+    today = date.today()
+    plans = [
+        model(
+            user=user,
+            created_by=created_by,
+            name=name or template.name,
+            start_date=today,
+            end_date=today + timedelta(days=28),
+            active=True,
+            **{f: getattr(template, f) for f in plan_fields}
+        )
+        for user in users
+    ]
+
+    # MySQL không trả id từ INSERT nhiều dòng: insert từng plan, lịch vẫn bulk
+    returns_ids = connection.features.can_return_rows_from_bulk_insert
+    with transaction.atomic():
+        if returns_ids:
+            model.objects.bulk_create(plans, batch_size=BATCH_SIZE)
+        else:
+            for plan in plans:
+                plan.save()
+
+        plan_items = [
+            [item_model(**{fk_name: plan}, **{f: getattr(i, f) for f in item_fields}) for i in items]
+            for plan in plans
+        ]
+        item_model.objects.bulk_create([i for group in plan_items for i in group], batch_size=BATCH_SIZE)
+
+    if returns_ids:
+        for plan, group in zip(plans, plan_items):
+            _set_prefetched(plan, related_name, fk_name, group)
+    else:
+        prefetch_related_objects(plans, Prefetch(
+            related_name, queryset=item_model.objects.select_related(item_related)))
+    return plans
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import threading
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+from oauth2_provider.models import get_access_token_model
+from rest_framework.utils.encoders import JSONEncoder
+from .serializers import MessageSerializer
+
+
+WEBSOCKET_PATH = '/ws/chat/'
+
+
+class InProcessBroker:
+    """
+    Fan-out trong tiến trình: mỗi kết nối websocket đăng ký một asyncio.Queue
+    vào kênh của user. publish() có thể gọi từ thread của view đồng bộ.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel, loop, queue):
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add((loop, queue))
+
+    def unsubscribe(self, channel, loop, queue):
+        with self._lock:
+            subs = self._subscribers.get(channel)
+            if subs is None:
+                return
+            subs.discard((loop, queue))
+            if not subs:
+                del self._subscribers[channel]
+
+    def publish(self, channel, event):
+        with self._lock:
+            targets = list(self._subscribers.get(channel, ()))
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                # Event loop đã đóng, kết nối sẽ tự hủy đăng ký
+                pass
+
+    def connection_count(self):
+        with self._lock:
+            return sum(len(subs) for subs in self._subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'CHAT_BROKER', 'health.realtime.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def notify_new_message(message, chat_room):
+    """Đẩy tin nhắn mới và last_message của phòng tới cả hai người tham gia."""
+    payload = MessageSerializer(message).data
+    room = {
+        'id': chat_room.id,
+        'last_message': chat_room.last_message,
+        'last_message_time': payload['created_date'],
+    }
+    broker = get_broker()
+    for user_id in (chat_room.user_id, chat_room.expert_id):
+        broker.publish(user_channel(user_id), {
+            'type': 'message',
+            'room': room,
+            'message': dict(payload, is_mine=message.sender_id == user_id),
+        })
+
+
+def _get_token(scope):
+    query = parse_qs(scope.get('query_string', b'').decode())
+    if query.get('token'):
+        return query['token'][0]
+    for name, value in scope.get('headers', []):
+        if name == b'authorization':
+            parts = value.decode().split()
+            if len(parts) == 2 and parts[0].lower() == 'bearer':
+                return parts[1]
+    return None
+
+
+@sync_to_async
+def _authenticate(token):
+    AccessToken = get_access_token_model()
+    close_old_connections()
+    try:
+        # Tra theo token_checksum (có index) như oauth2_provider, cột token không có index
+        checksum = hashlib.sha256(token.encode('utf-8')).hexdigest()
+        access_token = AccessToken.objects.select_related('user').get(token_checksum=checksum)
+    except AccessToken.DoesNotExist:
+        return None
+    finally:
+        close_old_connections()
+    if not access_token.is_valid() or not access_token.user or not access_token.user.is_active:
+        return None
+    return access_token.user.id
+
+
+async def serve(user_id, receive, send, broker=None):
+    """Giữ kết nối đã xác thực; khi rảnh không truy vấn DB, chỉ chờ queue."""
+    broker = broker or get_broker()
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    channel = user_channel(user_id)
+
+    async def push():
+        while True:
+            event = await queue.get()
+            await send({
+                'type': 'websocket.send',
+                'text': json.dumps(event, cls=JSONEncoder, ensure_ascii=False),
+            })
+
+    broker.subscribe(channel, loop, queue)
+    pusher = asyncio.ensure_future(push())
+    try:
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+    finally:
+        broker.unsubscribe(channel, loop, queue)
+        pusher.cancel()
+
+
+async def websocket_application(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    if scope.get('path') != WEBSOCKET_PATH:
+        await send({'type': 'websocket.close', 'code': 4404})
+        return
+
+    token = _get_token(scope)
+    user_id = await _authenticate(token) if token else None
+    if user_id is None:
+        await send({'type': 'websocket.close', 'code': 4401})
+        return
+
+    await send({'type': 'websocket.accept'})
+    await serve(user_id, receive, send)
+
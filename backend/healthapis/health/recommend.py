@@ -0,0 +1,233 @@
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, insort
+
+from django.core.cache import cache
+from django.db import transaction
+
+from . import catalog
+from .models import Exercise, Food, HealthProfile
+from .search import fold
+
+TOP_K = 200
+MAX_LIMIT = 50
+
+CARDIO = {'cardio', 'hiit'}
+STRENGTH = {'strength', 'weightlifting'}
+DIFFICULTY_LEVEL = {'easy': 0.0, 'medium': 0.5, 'hard': 1.0}
+
+
+def profile_key(profile):
+    """
+    Gom hồ sơ thành nhóm rời rạc (goal, nhóm BMI, nhóm chênh lệch cân nặng mục tiêu):
+    mọi người cùng nhóm có chung bảng xếp hạng.
+    """
+    bmi = profile.bmi
+    bmi_band = 0 if bmi < 18.5 else 1 if bmi < 25 else 2 if bmi < 30 else 3
+    gap = abs(profile.weight - profile.target_weight) if profile.target_weight else 0
+    gap_band = 0 if gap < 2 else 1 if gap < 5 else 2 if gap < 15 else 3
+    return profile.goal, bmi_band, gap_band
+
+
+def exercise_features(calories_burned, duration, difficulty, category_name):
+    kind = fold(category_name or '')
+    return (
+        min(calories_burned / max(duration, 1) / 15, 1.0),  # cường độ (kcal/phút)
+        min(calories_burned / 600, 1.0),
+        duration,
+        DIFFICULTY_LEVEL.get(difficulty, 0.5),
+        kind in CARDIO,
+        kind in STRENGTH,
+    )
+
+
+def score_exercise(f, key):
+    intensity, kcal, duration, difficulty, cardio, strength = f
+    goal, bmi_band, gap_band = key
+    if goal == 'lose_weight':
+        score = 2 * intensity + kcal * (1 + 0.5 * gap_band) + 1.5 * cardio
+    elif goal == 'gain_muscle':
+        score = 2 * strength + difficulty + 0.5 * intensity
+    else:
+        score = 1 - abs(duration - 30) / 60 + 0.5 * (cardio or strength) + 0.5 * intensity
+    if bmi_band == 3:
+        score -= 1.5 * difficulty  # béo phì: tránh bài nặng cho khớp
+    elif bmi_band == 0:
+        score -= kcal  # thiếu cân: không đốt quá nhiều
+    return score
+
+
+def food_features(calories, protein, carbs, fat):
+    kcal = max(calories, 1)
+    return calories, protein, min(protein * 4 / kcal, 1.0), min(fat * 9 / kcal, 1.0)
+
+
+def score_food(f, key):
+    calories, protein, protein_ratio, fat_ratio = f
+    goal, bmi_band, gap_band = key
+    if goal == 'lose_weight':
+        score = 2 * protein_ratio - calories / 800 * (1 + 0.3 * gap_band) - 0.5 * fat_ratio
+    elif goal == 'gain_muscle':
+        score = protein / 40 + 0.5 * min(calories / 700, 1) + protein_ratio
+    else:
+        score = 1 - 2 * abs(protein_ratio - 0.25) - abs(calories - 500) / 1000
+    if bmi_band == 0:
+        score += calories / 800
+    elif bmi_band == 3:
+        score -= calories / 1600
+    return score
+
+
+class Ranking:
+    """Top-K (điểm giảm dần, id tăng dần) của một nhóm hồ sơ."""
+
+    def __init__(self, scores):
+        self.entries = sorted((-s, i) for i, s in scores)[:TOP_K]
+        self.scores = {i: -s for s, i in self.entries}
+        self.stale = False
+
+    def update(self, item_id, score, total):
+        old = self.scores.pop(item_id, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (-old, item_id))]
+        if score is not None:
+            entry = (-score, item_id)
+            if total <= TOP_K or (self.entries and entry < self.entries[-1]):
+                insort(self.entries, entry)
+                self.scores[item_id] = score
+                if len(self.entries) > TOP_K:
+                    _, dropped = self.entries.pop()
+                    del self.scores[dropped]
+        # Phần tử rơi khỏi top mà ngoài top còn phần tử khác: không biết ai thế chỗ
+        if len(self.entries) < min(TOP_K, total):
+            self.stale = True
+
+    def ids(self, limit):
+        return [i for _, i in self.entries[:limit]]
+
+
+class Recommender(ABC):
+    """
+    Bảng đặc trưng của toàn bộ danh mục giữ trong bộ nhớ tiến trình; mỗi nhóm hồ
+    sơ có top-K tính sẵn (lazy) và được cập nhật từng phần qua signal khi danh
+    mục đổi. Version stamp của catalog (health/catalog.py) cho biết tiến trình
+    khác đã sửa danh mục, khi đó dựng lại toàn bộ.
+    """
+    catalog_names = ()
+    score = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.features = None
+        self.rankings = {}
+        self.versions = None
+
+    @abstractmethod
+    def load_rows(self):
+        """(id, đặc trưng) của mọi đối tượng đang active trong danh mục."""
+
+    @abstractmethod
+    def instance_features(self, instance):
+        """Đặc trưng của một đối tượng vừa lưu."""
+
+    def _rebuild(self):
+        self.versions = catalog.get_versions(self.catalog_names)
+        self.features = dict(self.load_rows())
+        self.rankings = {}
+
+    def _ranking(self, key):
+        ranking = self.rankings.get(key)
+        if ranking is None or ranking.stale:
+            ranking = Ranking((i, self.score(f, key)) for i, f in self.features.items())
+            self.rankings[key] = ranking
+        return ranking
+
+    def recommend(self, key, limit=10):
+        with self._lock:
+            if self.features is None or catalog.get_versions(self.catalog_names) != self.versions:
+                self._rebuild()
+            return self._ranking(key).ids(limit)
+
+    def update_instance(self, instance, deleted=False):
+        with self._lock:
+            if self.features is None:
+                return
+            if instance.active and not deleted:
+                f = self.instance_features(instance)
+                self.features[instance.id] = f
+            else:
+                f = None
+                self.features.pop(instance.id, None)
+            for key, ranking in self.rankings.items():
+                ranking.update(instance.id, None if f is None else self.score(f, key), len(self.features))
+            self.versions = catalog.get_versions(self.catalog_names)
+        # catalog.bump đổi stamp lần nữa sau commit (callback đăng ký trước): ghi nhận
+        # stamp đó để thay đổi của chính tiến trình này không làm dựng lại toàn bộ
+        transaction.on_commit(self._record_versions)
+
+    def _record_versions(self):
+        with self._lock:
+            if self.features is not None:
+                self.versions = catalog.get_versions(self.catalog_names)
+
+
+class ExerciseRecommender(Recommender):
+    catalog_names = ('exercise',)
+    score = staticmethod(score_exercise)
+
+    def load_rows(self):
+        rows = Exercise.objects.filter(active=True).values_list(
+            'id', 'calories_burned', 'duration', 'difficulty', 'category__name')
+        return ((r[0], exercise_features(*r[1:])) for r in rows.iterator(chunk_size=5000))
+
+    def instance_features(self, instance):
+        return exercise_features(instance.calories_burned, instance.duration,
+                                 instance.difficulty, instance.category.name)
+
+
+class FoodRecommender(Recommender):
+    catalog_names = ('food',)
+    score = staticmethod(score_food)
+
+    def load_rows(self):
+        rows = Food.objects.filter(active=True).values_list('id', 'calories', 'protein', 'carbs', 'fat')
+        return ((r[0], food_features(*r[1:])) for r in rows.iterator(chunk_size=5000))
+
+    def instance_features(self, instance):
+        return food_features(instance.calories, instance.protein, instance.carbs, instance.fat)
+
+
+exercises = ExerciseRecommender()
+foods = FoodRecommender()
+RECOMMENDERS = {Exercise: exercises, Food: foods}
+
+
+def _profile_cache_key(user_id):
+    return f'recommend:profile:{user_id}'
+
+
+def get_profile_key(user):
+    """Nhóm hồ sơ của user, cache theo user; None nếu chưa có hồ sơ."""
+    cache_key = _profile_cache_key(user.id)
+    key = cache.get(cache_key)
+    if key is None:
+        profile = HealthProfile.objects.filter(user=user).first()
+        if profile is None:
+            return None
+        key = profile_key(profile)
+        cache.set(cache_key, key, 60 * 60 * 24)
+    return tuple(key)
+
+
+def forget_profile(user_id):
+    cache.delete(_profile_cache_key(user_id))
+
+
+def recommended(model, queryset, user, limit=10):
+    """Các đối tượng được gợi ý theo thứ hạng; None nếu user chưa có hồ sơ sức khỏe."""
+    key = get_profile_key(user)
+    if key is None:
+        return None
+    ids = RECOMMENDERS[model].recommend(key, limit)
+    objects = queryset.in_bulk(ids)
+    return [objects[i] for i in ids if i in objects]
@@ -0,0 +1,272 @@
+import logging
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import realtime, sync
+from .models import User, Reminder, SyncTombstone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = User._meta.get_field('timezone').default
+EPOCH = date(1970, 1, 1).toordinal()
+# Bánh xe một ô cho mỗi phút trong tuần: lần nhắc kế tiếp luôn trong vòng 7 ngày
+WEEK = 7 * 24 * 60
+SEND_BATCH = 1000
+
+
+def weekday_mask(days):
+    """days_of_week ([0-6], 0 = thứ 2 như date.weekday()) -> bitmask, bit d là thứ d."""
+    mask = 0
+    for day in days or ():
+        if isinstance(day, int) and 0 <= day <= 6:
+            mask |= 1 << day
+    return mask
+
+
+def on_weekday(queryset, weekday):
+    # Điều kiện trên cột số, không cần đọc JSON của từng dòng
+    bit = 1 << weekday
+    return queryset.alias(weekday_bit=F('weekdays').bitand(bit)).filter(weekday_bit=bit)
+
+
+def due(weekday, start, end, queryset=None):
+    """
+    Nhắc nhở đang bật của mọi user, đến giờ trong [start, end] (TimeField, start <= end)
+    vào thứ weekday. Index (time, is_enabled, weekdays) phục vụ cả khoảng giờ lẫn
+    hai điều kiện còn lại mà không cần đọc dòng.
+    """
+    queryset = Reminder.objects.all() if queryset is None else queryset
+    return on_weekday(queryset.filter(time__range=(start, end), is_enabled=True), weekday)
+
+
+def fill_weekdays(model=Reminder, chunk_size=5000):
+    """Tính lại weekdays từ days_of_week cho mọi dòng; mỗi chunk một UPDATE cho mỗi bitmask."""
+    last_id = 0
+    while True:
+        rows = list(model.objects.filter(id__gt=last_id).order_by('id')
+                    .values_list('id', 'days_of_week', 'weekdays')[:chunk_size])
+        if not rows:
+            return
+        groups = {}
+        for pk, days, current in rows:
+            mask = weekday_mask(days)
+            if mask != current:
+                groups.setdefault(mask, []).append(pk)
+        for mask, ids in groups.items():
+            model.objects.filter(id__in=ids).update(weekdays=mask)
+        last_id = rows[-1][0]
+
+
+@lru_cache(maxsize=1024)
+def zone(name):
+    """ZoneInfo theo tên IANA; tên không hợp lệ thì dùng múi giờ mặc định."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def is_valid_zone(name):
+    try:
+        ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+    return True
+
+
+def epoch_minute(dt):
+    return int(dt.timestamp()) // 60
+
+
+def minute_datetime(minute):
+    return datetime.fromtimestamp(minute * 60, dt_timezone.utc)
+
+
+@lru_cache(maxsize=4096)
+def _day_offset(tz, day):
+    """Độ lệch UTC (phút) của cả ngày theo tz; None nếu trong ngày có chuyển giờ (DST)."""
+    start = datetime(day.year, day.month, day.day, tzinfo=tz).utcoffset()
+    end = datetime(day.year, day.month, day.day, 23, 59, tzinfo=tz).utcoffset()
+    return start // timedelta(minutes=1) if start == end else None
+
+
+@lru_cache(maxsize=4096)
+def _local_date(tz, minute):
+    return minute_datetime(minute).astimezone(tz).date()
+
+
+def next_fire(minute_of_day, mask, tz, after):
+    """Phút (epoch) đầu tiên sau after mà nhắc nhở đến giờ theo giờ địa phương tz; None nếu mask rỗng."""
+    if not mask:
+        return None
+    day = _local_date(tz, after)
+    for k in range(8):
+        if not mask & (1 << day.weekday()):
+            day += timedelta(days=1)
+            continue
+        offset = _day_offset(tz, day)
+        if offset is None:
+            minute = epoch_minute(datetime(day.year, day.month, day.day, minute_of_day // 60,
+                                           minute_of_day % 60, tzinfo=tz))
+        else:
+            minute = (day.toordinal() - EPOCH) * 1440 + minute_of_day - offset
+        if minute > after:
+            return minute
+        day += timedelta(days=1)
+    return None
+
+
+class LogNotifier:
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.info("Nhắc nhở #%s cho user %s: %s", reminder['id'], reminder['user_id'], reminder['title'])
+
+
+class MemoryNotifier:
+    """Giữ lại các nhắc nhở đã gửi, dùng trong test."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminders):
+        self.sent.extend(reminders)
+
+
+class BrokerNotifier:
+    """Đẩy tới kênh realtime của user; cần CHAT_BROKER dùng chung giữa các tiến trình."""
+
+    def send(self, reminders):
+        broker = realtime.get_broker()
+        for reminder in reminders:
+            broker.publish(realtime.user_channel(reminder['user_id']), {'type': 'reminder', 'reminder': reminder})
+
+
+def get_notifier():
+    return import_string(getattr(settings, 'REMINDER_NOTIFIER', 'health.reminders.LogNotifier'))()
+
+
+class Entry:
+    __slots__ = ('minute_of_day', 'mask', 'tz', 'next')
+
+
+class Dispatcher:
+    """
+    Nhắc nhở đang bật nằm trong bánh xe thời gian theo phút: ô (phút epoch % WEEK)
+    giữ id, entry giữ lần nhắc kế tiếp. Mỗi phút chỉ xử lý một ô. Đổi hoặc xóa nhắc
+    nhở chỉ sửa entry, id cũ còn trong bánh xe bị bỏ qua khi tới ô (xóa lười). Thay
+    đổi được nạp theo updated_date và tombstone của /sync/, không quét lại bảng.
+    """
+
+    def __init__(self, notifier, chunk_size=5000):
+        self.notifier = notifier
+        self.chunk_size = chunk_size
+        self.entries = {}
+        self.slots = [[] for _ in range(WEEK)]
+        # Phút (epoch) cuối cùng đã xử lý, mốc updated_date của lần refresh tiếp theo
+        self.minute = None
+        self.since = None
+
+    def _rows(self, queryset):
+        # Bỏ ordering mặc định (time): không cần sắp xếp, và để refresh dùng index updated_date
+        return queryset.order_by().values_list('id', 'time', 'weekdays', 'is_enabled', 'user__timezone').iterator(
+            chunk_size=self.chunk_size)
+
+    def _schedule(self, row):
+        pk, at, mask, enabled, tz_name = row
+        entry = self.entries.get(pk)
+        if not enabled or not mask:
+            if entry is not None:
+                del self.entries[pk]
+            return
+        if entry is None:
+            entry = self.entries[pk] = Entry()
+            entry.next = None
+        previous = entry.next
+        entry.minute_of_day = at.hour * 60 + at.minute
+        entry.mask = mask
+        entry.tz = zone(tz_name)
+        entry.next = next_fire(entry.minute_of_day, mask, entry.tz, self.minute)
+        if entry.next != previous:
+            self.slots[entry.next % WEEK].append(pk)
+
+    def load(self, now=None):
+        """Nạp toàn bộ nhắc nhở đang bật; phút của now chưa xử lý (sẽ gửi ở advance)."""
+        started = timezone.now()
+        self.minute = epoch_minute(now or started) - 1
+        self.entries = {}
+        self.slots = [[] for _ in range(WEEK)]
+        for row in self._rows(Reminder.objects.filter(is_enabled=True)):
+            self._schedule(row)
+        self.since = started - sync.settle_window()
+        return len(self.entries)
+
+    def refresh(self):
+        """Áp dụng nhắc nhở đã đổi/xóa từ lần nạp trước (đọc lại khoảng settle như /sync/)."""
+        started = timezone.now()
+        changed = 0
+        for row in self._rows(Reminder.objects.filter(updated_date__gte=self.since)):
+            self._schedule(row)
+            changed += 1
+        for pk in SyncTombstone.objects.filter(model=sync.MODEL_KEYS[Reminder], deleted_date__gte=self.since
+                                               ).values_list('object_id', flat=True):
+            changed += self.entries.pop(pk, None) is not None
+        self.since = started - sync.settle_window()
+        return changed
+
+    def _tick(self, minute):
+        index = minute % WEEK
+        keys, self.slots[index] = self.slots[index], []
+        due = []
+        # Một id có thể nằm hai lần trong ô nếu đổi lịch rồi đổi lại
+        for pk in dict.fromkeys(keys):
+            entry = self.entries.get(pk)
+            if entry is None or entry.next != minute:
+                # Đúng một tuần sau (nạp sau khi ô đã qua) thì giữ lại cho vòng sau
+                if entry is not None and entry.next > minute and entry.next % WEEK == index:
+                    self.slots[index].append(pk)
+                continue
+            due.append(pk)
+            entry.next = next_fire(entry.minute_of_day, entry.mask, entry.tz, minute)
+            self.slots[entry.next % WEEK].append(pk)
+        return due
+
+    def _send(self, due, minute):
+        fire_at = minute_datetime(minute)
+        sent = 0
+        for i in range(0, len(due), SEND_BATCH):
+            # Đọc lại nội dung lúc gửi, bỏ qua nhắc nhở vừa tắt mà chưa refresh
+            reminders = list(Reminder.objects.filter(id__in=due[i:i + SEND_BATCH], is_enabled=True).values(
+                'id', 'user_id', 'title', 'reminder_type', 'message', 'time'))
+            for reminder in reminders:
+                reminder['fire_at'] = fire_at
+            try:
+                self.notifier.send(reminders)
+            except Exception:
+                logger.exception("Gửi %d nhắc nhở lúc %s thất bại", len(reminders), fire_at)
+                continue
+            sent += len(reminders)
+        return sent
+
+    def advance(self, now=None, max_lag=None):
+        """
+        Xử lý các phút tới phút của now, trả về số nhắc nhở đã gửi. Phút trễ hơn
+        max_lag phút (tiến trình bị treo) thì bỏ qua, không gửi dồn.
+        """
+        target = epoch_minute(now or timezone.now())
+        sent = 0
+        while self.minute < target:
+            self.minute += 1
+            due = self._tick(self.minute)
+            if not due:
+                continue
+            if max_lag is not None and target - self.minute > max_lag:
+                logger.warning("Bỏ qua %d nhắc nhở trễ %d phút", len(due), target - self.minute)
+                continue
+            sent += self._send(due, self.minute)
+        return sent
@@ -0,0 +1,164 @@
+import calendar
+from datetime import date, timedelta
+from functools import reduce
+from operator import or_
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import DailyTracking, TrackingRollup
+
+WORKOUT_STEPS = 5000
+PERIODS = ('week', 'month')
+ROLLUP_FIELDS = ['active_days', 'workout_days', 'water_total', 'steps_total', 'heart_rate_total',
+                 'heart_rate_days', 'weight_min', 'weight_max', 'weight_last', 'updated_date']
+
+
+def period_start(period, day):
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def period_end(period, start):
+    if period == 'week':
+        return start + timedelta(days=6)
+    if period == 'month':
+        return start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    return start.replace(month=12, day=31)
+
+
+def shift(period, start, n):
+    """Đầu kỳ cách start n kỳ (n âm là lùi về trước)."""
+    if period == 'week':
+        return start + timedelta(weeks=n)
+    if period == 'month':
+        months = start.year * 12 + start.month - 1 + n
+        return date(months // 12, months % 12 + 1, 1)
+    return start.replace(year=start.year + n)
+
+
+def summarize(rows):
+    """rows: (date, water_intake, steps, heart_rate, weight) đã sắp theo ngày."""
+    totals = dict(active_days=0, workout_days=0, water_total=0, steps_total=0, heart_rate_total=0,
+                  heart_rate_days=0, weight_min=None, weight_max=None, weight_last=None)
+    for _, water, steps, heart_rate, weight in rows:
+        totals['active_days'] += 1
+        totals['water_total'] += water or 0
+        totals['steps_total'] += steps or 0
+        totals['workout_days'] += (steps or 0) >= WORKOUT_STEPS
+        if heart_rate is not None:
+            totals['heart_rate_total'] += heart_rate
+            totals['heart_rate_days'] += 1
+        if weight is not None:
+            totals['weight_min'] = weight if totals['weight_min'] is None else min(totals['weight_min'], weight)
+            totals['weight_max'] = weight if totals['weight_max'] is None else max(totals['weight_max'], weight)
+            totals['weight_last'] = weight
+    return totals
+
+
+def refresh(user_id, dates, tracking_model=DailyTracking, rollup_model=TrackingRollup):
+    """
+    Tính lại các tuần/tháng chứa dates từ DailyTracking: một truy vấn đọc (tối
+    đa vài chục dòng mỗi kỳ) và một upsert, không phụ thuộc độ dài lịch sử.
+    """
+    periods = {(p, period_start(p, d)) for d in dates if d for p in PERIODS}
+    if not periods:
+        return
+    low = min(start for _, start in periods)
+    high = max(period_end(p, start) for p, start in periods)
+    rows = list(tracking_model.objects.filter(
+        user_id=user_id, date__range=(low, high)
+    ).order_by('date').values_list('date', 'water_intake', 'steps', 'heart_rate', 'weight'))
+
+    rollups, empty = [], []
+    for period, start in periods:
+        end = period_end(period, start)
+        totals = summarize(r for r in rows if start <= r[0] <= end)
+        if totals['active_days']:
+            rollups.append(rollup_model(user_id=user_id, period=period, period_start=start, **totals))
+        else:
+            empty.append(Q(period=period, period_start=start))
+
+    if rollups:
+        # MySQL (ON DUPLICATE KEY UPDATE) không nhận unique_fields
+        target = ({'unique_fields': ['user', 'period', 'period_start']}
+                  if connection.features.supports_update_conflicts_with_target else {})
+        rollup_model.objects.bulk_create(rollups, update_conflicts=True, update_fields=ROLLUP_FIELDS, **target)
+    if empty:
+        # Kỳ không còn ngày nào (xóa hết tracking) thì bỏ dòng rollup
+        rollup_model.objects.filter(reduce(or_, empty), user_id=user_id).delete()
+
+
+def rebuild(user_ids=None, tracking_model=DailyTracking, rollup_model=TrackingRollup):
+    """Dựng lại toàn bộ (sau khi nhập dữ liệu bằng bulk_create hoặc khi tạo bảng)."""
+    queryset = tracking_model.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user_id__in=user_ids)
+        rollup_model.objects.filter(user_id__in=user_ids).delete()
+    else:
+        rollup_model.objects.all().delete()
+
+    dates_by_user = {}
+    for user_id, day in queryset.values_list('user_id', 'date').iterator(chunk_size=5000):
+        dates_by_user.setdefault(user_id, set()).add(day)
+    for user_id, dates in dates_by_user.items():
+        for month in {period_start('month', d) for d in dates}:
+            # Theo từng tháng để mỗi lần đọc nhỏ; tuần vắt qua hai tháng được tính lại, kết quả như nhau
+            refresh(user_id, [d for d in dates if period_start('month', d) == month],
+                    tracking_model, rollup_model)
+
+
+def summary(user, period, count, today=None):
+    """
+    count kỳ gần nhất (mới nhất trước) của tuần/tháng/năm; năm cộng từ 12 dòng
+    tháng. Mỗi kỳ đọc tối đa 12 dòng rollup, không đọc DailyTracking.
+    """
+    today = today or date.today()
+    source = 'month' if period == 'year' else period
+    current = period_start(period, today)
+    first = shift(period, current, -(count - 1))
+    rows = TrackingRollup.objects.filter(
+        user=user, period=source, period_start__range=(first, period_end(period, current))
+    ).order_by('period_start')
+
+    buckets = {shift(period, first, i): [] for i in range(count)}
+    for row in rows:
+        buckets[period_start(period, row.period_start)].append(row)
+
+    return [_combine(period, start, buckets[start]) for start in sorted(buckets, reverse=True)]
+
+
+def rolling(user, days=7, today=None):
+    """
+    Tổng hợp cửa sổ trượt [today - days, today] cho weekly-summary: đọc thẳng
+    DailyTracking theo unique (user, date), tối đa days + 1 dòng, không cần rollup.
+    """
+    today = today or date.today()
+    return summarize(DailyTracking.objects.filter(
+        user=user, date__range=(today - timedelta(days=days), today)
+    ).order_by('date').values_list('date', 'water_intake', 'steps', 'heart_rate', 'weight'))
+
+
+def _combine(period, start, rows):
+    active_days = sum(r.active_days for r in rows)
+    heart_rate_days = sum(r.heart_rate_days for r in rows)
+    weights_min = [r.weight_min for r in rows if r.weight_min is not None]
+    weights_max = [r.weight_max for r in rows if r.weight_max is not None]
+    weights_last = [r.weight_last for r in rows if r.weight_last is not None]
+    return {
+        'period': period,
+        'start': start,
+        'end': period_end(period, start),
+        'active_days': active_days,
+        'workout_days': sum(r.workout_days for r in rows),
+        'water_avg': round(sum(r.water_total for r in rows) / active_days) if active_days else 0,
+        'steps_total': sum(r.steps_total for r in rows),
+        'heart_rate_avg': (round(sum(r.heart_rate_total for r in rows) / heart_rate_days)
+                           if heart_rate_days else None),
+        'weight_min': min(weights_min) if weights_min else None,
+        'weight_max': max(weights_max) if weights_max else None,
+        'weight_last': weights_last[-1] if weights_last else None,
+    }
@@ -0,0 +1,115 @@
+import re
+import unicodedata
+from html import unescape
+
+from django.db import connection
+from django.db.models import Q, Sum, Max, Case, When, Value, IntegerField, OuterRef, Subquery
+from django.utils.html import strip_tags
+from .models import Exercise, Food, ExerciseSearchTerm, FoodSearchTerm
+
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+MAX_QUERY_TOKENS = 6
+MIN_PREFIX_LENGTH = 2
+MAX_TERM_LENGTH = 64
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Model được đánh chỉ mục: (model chứa term, các trường kèm trọng số)
+INDEXES = {
+    Exercise: (ExerciseSearchTerm, [('name', NAME_WEIGHT), ('description', DESCRIPTION_WEIGHT)]),
+    Food: (FoodSearchTerm, [('name', NAME_WEIGHT), ('description', DESCRIPTION_WEIGHT)]),
+}
+
+
+def fold(text):
+    """Bỏ thẻ HTML, bỏ dấu tiếng Việt (kể cả đ), chuyển chữ thường."""
+    text = unescape(strip_tags(text or '')).lower().replace('đ', 'd')
+    text = unicodedata.normalize('NFD', text)
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text, min_length=2):
+    return [
+        t[:MAX_TERM_LENGTH] for t in TOKEN_RE.findall(fold(text))
+        if len(t) >= min_length or t.isdigit()
+    ]
+
+
+def build_terms(instance, term_model=None, fields=None):
+    if term_model is None:
+        term_model, fields = INDEXES[type(instance)]
+    fk = term_model._meta.get_field(type(instance)._meta.model_name).attname
+
+    weights = {}
+    for field, weight in fields:
+        for token in tokenize(getattr(instance, field, '')):
+            weights[token] = weights.get(token, 0) + weight
+    return [term_model(term=term, weight=weight, **{fk: instance.pk}) for term, weight in weights.items()]
+
+
+def index_instance(instance):
+    term_model, _ = INDEXES[type(instance)]
+    term_model.objects.filter(**{type(instance)._meta.model_name: instance.pk}).delete()
+    term_model.objects.bulk_create(build_terms(instance))
+
+
+def rebuild(model, batch_size=1000):
+    term_model, fields = INDEXES[model]
+    term_model.objects.all().delete()
+    batch = []
+    for instance in model.objects.all().iterator(chunk_size=batch_size):
+        batch.extend(build_terms(instance, term_model, fields))
+        if len(batch) >= batch_size:
+            term_model.objects.bulk_create(batch)
+            batch = []
+    term_model.objects.bulk_create(batch)
+
+
+def _prefix(token):
+    if connection.vendor == 'sqlite':
+        # SQLite so sánh nhị phân: khoảng [token, token+1) đi theo index term, LIKE có ESCAPE thì không
+        return Q(term__gte=token, term__lt=token[:-1] + chr(ord(token[-1]) + 1))
+    # Collation của MySQL (utf8mb4 *_ai_ci) xếp '{', ':' trước chữ/số nên không dùng được
+    # khoảng trên. term đã là chữ thường: istartswith ra LIKE 'x%' đi theo index, còn
+    # startswith ra LIKE BINARY thì không
+    return Q(term__istartswith=token)
+
+
+def filter_queryset(queryset, query):
+    """
+    Giữ các đối tượng khớp tiền tố với mọi từ trong query, xếp theo
+    search_rank = tổng trọng số các term khớp (tên nặng hơn mô tả).
+    """
+    tokens = tokenize(query, min_length=1)
+    if not tokens:
+        return queryset
+    # Tiền tố 1 ký tự (người dùng mới gõ) khớp gần hết bảng term rồi gom nhóm cả
+    # bảng: bỏ qua, query chỉ có từ 1 ký tự thì không trả gì
+    tokens = list(dict.fromkeys(t for t in tokens if len(t) >= MIN_PREFIX_LENGTH))[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return queryset.none()
+
+    term_model, _ = INDEXES[queryset.model]
+    fk = queryset.model._meta.model_name
+
+    match = Q()
+    hits = {}
+    for i, token in enumerate(tokens):
+        match |= _prefix(token)
+        hits[f'hit{i}'] = Max(Case(
+            When(_prefix(token), then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField()
+        ))
+
+    # Gom nhóm trên bảng term (chỉ theo id) rồi mới nối với bảng chính
+    ranked = term_model.objects.filter(match).values(fk).annotate(
+        rank=Sum('weight'), **hits
+    ).filter(**{name: 1 for name in hits})
+
+    return queryset.filter(
+        id__in=ranked.values(fk)
+    ).annotate(
+        search_rank=Subquery(ranked.filter(**{fk: OuterRef('pk')}).values('rank')[:1])
+    ).order_by('-search_rank', 'id')
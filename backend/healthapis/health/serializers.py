@@ -1,8 +1,11 @@
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
 from rest_framework import serializers
 from .models import (User, HealthProfile, DailyTracking, Exercise, ExerciseCategory,
                      WorkoutPlan, WorkoutSchedule, Food, NutritionPlan, MealSchedule,
-                     Progress, Consultation, Reminder, HealthJournal, ChatRoom, Message)
-from cloudinary.utils import cloudinary_url
+                     Progress, Consultation, Reminder, HealthJournal, ChatRoom, Message, ExpertStats)
+from .media import media_url
+from . import matching
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,10 +13,10 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'first_name', 'last_name', 'avatar', 'role',]
+        fields = ['id', 'username', 'first_name', 'last_name', 'avatar', 'role', 'timezone']
 
     def get_avatar(self, obj):
-        return obj.avatar.url if obj.avatar else ''
+        return media_url(obj.avatar) or ''
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -97,48 +100,11 @@ class ExerciseSerializer(serializers.ModelSerializer):
         model = Exercise
         fields = '__all__'  # SerializerMethodField sẽ được thêm tự động
 
-    def _build_cloudinary_url(self, public_id):
-        if not public_id:
-            return None
-        try:
-            from cloudinary.utils import cloudinary_url
-            url, _ = cloudinary_url(public_id)
-            return url
-        except Exception:
-            return None
-
-    def _get_field_url(self, obj, field_name):
-        val = getattr(obj, field_name, None)
-        if not val:
-            return None
-        request = self.context.get('request')
-        if hasattr(val, 'url'):
-            try:
-                return request.build_absolute_uri(val.url) if request else val.url
-            except Exception:
-                pass
-        if isinstance(val, str) and val.strip():
-            s = val.strip()
-            if s.startswith('http://') or s.startswith('https://'):
-                return s
-            return self._build_cloudinary_url(s)
-        if isinstance(val, dict):
-            if val.get('url'):
-                return val.get('url')
-            public_id = val.get('public_id') or val.get('publicId') or val.get('id')
-            return self._build_cloudinary_url(public_id)
-        if hasattr(val, 'file') and hasattr(val.file, 'url'):
-            try:
-                return request.build_absolute_uri(val.file.url) if request else val.file.url
-            except Exception:
-                pass
-        return None
-
     def get_image_url(self, obj):
-        return self._get_field_url(obj, 'image')
+        return media_url(obj.image, self.context.get('request'))
 
     def get_video_url(self, obj):
-        return self._get_field_url(obj, 'video')
+        return media_url(obj.video, self.context.get('request'))
 
 class ExerciseDetailSerializer(serializers.ModelSerializer):
     category = ExerciseCategorySerializer(read_only=True)
@@ -161,52 +127,11 @@ class ExerciseDetailSerializer(serializers.ModelSerializer):
             'category'
         ]
 
-    def _build_cloudinary_url(self, public_id):
-        if not public_id:
-            return None
-        try:
-            url, _ = cloudinary_url(public_id)
-            return url
-        except Exception:
-            return None
-
-    def _get_field_url(self, obj, field_name):
-        val = getattr(obj, field_name, None)
-        if not val:
-            return None
-        request = self.context.get('request')
-        # If FieldFile or has .url
-        if hasattr(val, 'url'):
-            try:
-                return request.build_absolute_uri(val.url) if request else val.url
-            except Exception:
-                pass
-        # Plain string (could be full URL or cloudinary public id / path)
-        if isinstance(val, str) and val.strip():
-            s = val.strip()
-            if s.startswith('http://') or s.startswith('https://'):
-                return s
-            # If looks like cloudinary public id or path, build URL
-            return self._build_cloudinary_url(s)
-        # dict-like from some storages
-        if isinstance(val, dict):
-            if val.get('url'):
-                return val.get('url')
-            public_id = val.get('public_id') or val.get('publicId') or val.get('id')
-            return self._build_cloudinary_url(public_id)
-        # nested file object
-        if hasattr(val, 'file') and hasattr(val.file, 'url'):
-            try:
-                return request.build_absolute_uri(val.file.url) if request else val.file.url
-            except Exception:
-                pass
-        return None
-
     def get_image_url(self, obj):
-        return self._get_field_url(obj, 'image')
+        return media_url(obj.image, self.context.get('request'))
 
     def get_video_url(self, obj):
-        return self._get_field_url(obj, 'video')
+        return media_url(obj.video, self.context.get('request'))
 
 class WorkoutScheduleSerializer(serializers.ModelSerializer):
     exercise = ExerciseSerializer(read_only=True)
@@ -218,6 +143,15 @@ class WorkoutScheduleSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class WorkoutScheduleItemSerializer(serializers.Serializer):
+    # Một phần tử của POST /workout-plans/{id}/add-exercises/
+    exercise_id = serializers.IntegerField()
+    weekday = serializers.ChoiceField(choices=WorkoutSchedule.WEEKDAY_CHOICES)
+    sets = serializers.IntegerField(default=3, min_value=1)
+    reps = serializers.IntegerField(default=10, min_value=1)
+    notes = serializers.CharField(default='', allow_blank=True)
+
+
 class WorkoutPlanSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
@@ -251,7 +185,8 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_exercises(self, obj):
-        return obj.schedules.count()
+        # Dùng dữ liệu đã prefetch thay vì COUNT riêng
+        return len(obj.schedules.all())
 
 
 
@@ -277,6 +212,14 @@ class MealScheduleSerializer(serializers.ModelSerializer):
         return int(obj.food.calories * obj.portion)
 
 
+class MealScheduleItemSerializer(serializers.Serializer):
+    # Một phần tử của POST /nutrition-plans/{id}/add-meals/
+    food_id = serializers.IntegerField()
+    weekday = serializers.ChoiceField(choices=WorkoutSchedule.WEEKDAY_CHOICES)
+    portion = serializers.FloatField(default=1.0, min_value=0)
+    notes = serializers.CharField(default='', allow_blank=True)
+
+
 class NutritionPlanSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     created_by = UserSerializer(read_only=True)
@@ -311,7 +254,16 @@ class NutritionPlanSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_meals(self, obj):
-        return obj.meal_schedules.count()
+        return len(obj.meal_schedules.all())
+
+
+def with_previous_weight(queryset):
+    # Cân nặng lần đo trước tính ngay trong cùng truy vấn (không N+1 trong serializer)
+    previous = Progress.objects.filter(
+        user=OuterRef('user'),
+        date__lt=OuterRef('date')
+    ).order_by('-date').values('weight')[:1]
+    return queryset.annotate(previous_weight=Subquery(previous))
 
 
 class ProgressSerializer(serializers.ModelSerializer):
@@ -323,13 +275,17 @@ class ProgressSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
     def get_weight_change(self, obj):
-        previous = Progress.objects.filter(
-            user=obj.user,
-            date__lt=obj.date
-        ).order_by('-date').first()
+        # ProgressViewSet annotate sẵn previous_weight; object đơn lẻ thì truy vấn
+        if hasattr(obj, 'previous_weight'):
+            previous_weight = obj.previous_weight
+        else:
+            previous_weight = Progress.objects.filter(
+                user_id=obj.user_id,
+                date__lt=obj.date
+            ).order_by('-date').values_list('weight', flat=True).first()
 
-        if previous:
-            change = obj.weight - previous.weight
+        if previous_weight is not None:
+            change = obj.weight - previous_weight
             return round(change, 2)
         return None
 
@@ -345,6 +301,44 @@ class ConsultationSerializer(serializers.ModelSerializer):
         model = Consultation
         fields = '__all__'
 
+    def validate_appointment_date(self, value):
+        if value <= timezone.now():
+            raise serializers.ValidationError("Thời gian hẹn phải ở tương lai")
+        return value
+
+    def validate_duration(self, value):
+        if not Consultation.MIN_DURATION <= value <= Consultation.MAX_DURATION:
+            raise serializers.ValidationError(
+                f"Thời lượng phải từ {Consultation.MIN_DURATION} đến {Consultation.MAX_DURATION} phút")
+        return value
+
+
+
+class ExpertMatchSerializer(serializers.ModelSerializer):
+    expert = UserSerializer(read_only=True)
+    avg_reply_minutes = serializers.SerializerMethodField()
+    specialization = serializers.SerializerMethodField()
+    match_score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExpertStats
+        fields = ['expert', 'client_count', 'upcoming_consultations', 'avg_reply_minutes', 'specialization',
+                  'match_score']
+
+    def get_avg_reply_minutes(self, obj):
+        seconds = matching.avg_reply_seconds(obj)
+        return round(seconds / 60, 1) if seconds is not None else None
+
+    def get_specialization(self, obj):
+        # Tỷ lệ khách hàng hiện tại có cùng mục tiêu
+        goal = self.context.get('goal')
+        if not goal or not obj.client_count:
+            return 0
+        return round(getattr(obj, f'{goal}_clients') / obj.client_count, 3)
+
+    def get_match_score(self, obj):
+        return getattr(obj, matching.score_field(self.context.get('goal')))
+
 
 
 # Serializer cho đăng ký
@@ -374,7 +368,12 @@ class ReminderSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Reminder
-        fields = '__all__'
+        exclude = ['weekdays']
+
+    def validate_days_of_week(self, value):
+        if not isinstance(value, list) or any(type(d) is not int or not 0 <= d <= 6 for d in value):
+            raise serializers.ValidationError("Ngày trong tuần phải là danh sách số từ 0 đến 6")
+        return sorted(set(value))
 
 
 class HealthJournalSerializer(serializers.ModelSerializer):
@@ -402,11 +401,11 @@ class MessageSerializer(serializers.ModelSerializer):
         return f"{obj.sender.first_name} {obj.sender.last_name}".strip() or obj.sender.username
 
     def get_sender_avatar(self, obj):
-        return obj.sender.avatar.url if obj.sender.avatar else None
+        return media_url(obj.sender.avatar)
 
     def get_is_mine(self, obj):
         request = self.context.get('request')
-        return obj.sender == request.user if request else False
+        return obj.sender_id == request.user.id if request else False
 
 
 class ChatRoomSerializer(serializers.ModelSerializer):
@@ -419,14 +418,14 @@ class ChatRoomSerializer(serializers.ModelSerializer):
 
     def get_other_user(self, obj):
         request = self.context.get('request')
-        other = obj.expert if obj.user == request.user else obj.user
+        other = obj.expert if obj.user_id == request.user.id else obj.user
         return {
             'id': other.id,
             'name': f"{other.first_name} {other.last_name}".strip() or other.username,
-            'avatar': other.avatar.url if other.avatar else None,
+            'avatar': media_url(other.avatar),
             'role': other.get_role_display()
         }
 
     def get_unread_count(self, obj):
         request = self.context.get('request')
-        return obj.messages.filter(is_read=False).exclude(sender=request.user).count()
\ No newline at end of file
+        return getattr(obj, obj.unread_field(request.user))
\ No newline at end of file
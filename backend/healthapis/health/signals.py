@@ -0,0 +1,147 @@
+from cloudinary.models import CloudinaryField
+from django.apps import apps
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from oauth2_provider.models import get_access_token_model
+from . import auth, catalog, matching, media, recommend, reminders, rollups, search, sync
+from .models import (User, HealthProfile, DailyTracking, WorkoutPlan, WorkoutSchedule, NutritionPlan, MealSchedule,
+                     Reminder, Consultation)
+
+
+def invalidate_media_urls(sender, instance, **kwargs):
+    media.invalidate_instance(instance)
+
+
+def update_search_index(sender, instance, **kwargs):
+    search.index_instance(instance)
+
+
+def invalidate_catalog(sender, instance, **kwargs):
+    catalog.invalidate_instance(instance)
+
+
+def update_recommendations(sender, instance, **kwargs):
+    recommend.RECOMMENDERS[sender].update_instance(instance)
+
+
+def remove_recommendation(sender, instance, **kwargs):
+    recommend.RECOMMENDERS[sender].update_instance(instance, deleted=True)
+
+
+def forget_recommendation_profile(sender, instance, **kwargs):
+    recommend.forget_profile(instance.user_id)
+
+
+def record_sync_deletion(sender, instance, **kwargs):
+    sync.record_deletion(instance)
+
+
+def touch_workout_plan(sender, instance, **kwargs):
+    sync.touch(WorkoutPlan, instance.workout_plan_id)
+
+
+def touch_nutrition_plan(sender, instance, **kwargs):
+    sync.touch(NutritionPlan, instance.nutrition_plan_id)
+
+
+def remember_tracking_date(sender, instance, **kwargs):
+    # Ngày lúc nạp, để khi đổi ngày thì tính lại cả kỳ cũ (không chạm field bị defer)
+    instance._rollup_date = instance.__dict__.get('date')
+
+
+def refresh_tracking_rollups(sender, instance, **kwargs):
+    rollups.refresh(instance.user_id, {getattr(instance, '_rollup_date', None), instance.date})
+    instance._rollup_date = instance.date
+
+
+def set_reminder_weekdays(sender, instance, **kwargs):
+    instance.weekdays = reminders.weekday_mask(instance.days_of_week)
+
+
+# Field ảnh hưởng tới bộ đếm của chuyên gia (health/matching.py)
+MATCHING_FIELDS = {
+    User: ('role', 'is_active'),
+    HealthProfile: ('expert_id', 'goal'),
+    Consultation: ('expert_id', 'status', 'appointment_date'),
+}
+
+
+def remember_matching_fields(sender, instance, **kwargs):
+    instance._matching = tuple(instance.__dict__.get(f) for f in MATCHING_FIELDS[sender])
+
+
+def refresh_expert_stats(sender, instance, created, **kwargs):
+    current = tuple(instance.__dict__.get(f) for f in MATCHING_FIELDS[sender])
+    previous = getattr(instance, '_matching', None) or (None,) * len(current)
+    instance._matching = current
+    if not created and current == previous:
+        return
+    if sender is User:
+        if current[0] in matching.EXPERT_ROLES or previous[0] in matching.EXPERT_ROLES:
+            matching.schedule(instance.pk)
+        return
+    # Đổi chuyên gia thì tính lại cả chuyên gia cũ
+    for expert_id in {current[0], previous[0]}:
+        matching.schedule(expert_id)
+
+
+def forget_expert_stats(sender, instance, **kwargs):
+    matching.schedule(instance.expert_id)
+
+
+def invalidate_user_tokens(sender, instance, **kwargs):
+    auth.bump(instance.pk if sender is User else instance.user_id)
+
+
+def connect():
+    for model in apps.get_app_config('health').get_models():
+        if any(isinstance(f, CloudinaryField) for f in model._meta.concrete_fields):
+            post_save.connect(invalidate_media_urls, sender=model,
+                              dispatch_uid=f'media_urls_save_{model.__name__}')
+            post_delete.connect(invalidate_media_urls, sender=model,
+                                dispatch_uid=f'media_urls_delete_{model.__name__}')
+
+    # Term bị xóa theo CASCADE khi xóa đối tượng
+    for model in search.INDEXES:
+        post_save.connect(update_search_index, sender=model,
+                          dispatch_uid=f'search_save_{model.__name__}')
+
+    for model in catalog.CATALOGS:
+        post_save.connect(invalidate_catalog, sender=model,
+                          dispatch_uid=f'catalog_save_{model.__name__}')
+        post_delete.connect(invalidate_catalog, sender=model,
+                            dispatch_uid=f'catalog_delete_{model.__name__}')
+
+    # Nối sau catalog để engine ghi nhận version stamp mới của chính thay đổi này
+    for model in recommend.RECOMMENDERS:
+        post_save.connect(update_recommendations, sender=model,
+                          dispatch_uid=f'recommend_save_{model.__name__}')
+        post_delete.connect(remove_recommendation, sender=model,
+                            dispatch_uid=f'recommend_delete_{model.__name__}')
+    post_save.connect(forget_recommendation_profile, sender=HealthProfile,
+                      dispatch_uid='recommend_profile_save')
+    post_delete.connect(forget_recommendation_profile, sender=HealthProfile,
+                        dispatch_uid='recommend_profile_delete')
+
+    for model in sync.MODEL_KEYS:
+        post_delete.connect(record_sync_deletion, sender=model,
+                            dispatch_uid=f'sync_delete_{model.__name__}')
+    for model, handler in ((WorkoutSchedule, touch_workout_plan), (MealSchedule, touch_nutrition_plan)):
+        post_save.connect(handler, sender=model, dispatch_uid=f'sync_touch_save_{model.__name__}')
+        post_delete.connect(handler, sender=model, dispatch_uid=f'sync_touch_delete_{model.__name__}')
+
+    post_init.connect(remember_tracking_date, sender=DailyTracking, dispatch_uid='rollup_init')
+    post_save.connect(refresh_tracking_rollups, sender=DailyTracking, dispatch_uid='rollup_save')
+    post_delete.connect(refresh_tracking_rollups, sender=DailyTracking, dispatch_uid='rollup_delete')
+
+    pre_save.connect(set_reminder_weekdays, sender=Reminder, dispatch_uid='reminder_weekdays')
+
+    for model in MATCHING_FIELDS:
+        post_init.connect(remember_matching_fields, sender=model, dispatch_uid=f'matching_init_{model.__name__}')
+        post_save.connect(refresh_expert_stats, sender=model, dispatch_uid=f'matching_save_{model.__name__}')
+    for model in (HealthProfile, Consultation):
+        post_delete.connect(forget_expert_stats, sender=model, dispatch_uid=f'matching_delete_{model.__name__}')
+
+    # Xóa token (thu hồi, đăng xuất) hay xóa/khóa/đổi user: bỏ các token đã cache của user
+    for model in (User, get_access_token_model()):
+        post_save.connect(invalidate_user_tokens, sender=model, dispatch_uid=f'auth_save_{model.__name__}')
+        post_delete.connect(invalidate_user_tokens, sender=model, dispatch_uid=f'auth_delete_{model.__name__}')
@@ -0,0 +1,165 @@
+from datetime import timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q, Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import serializers
+from .models import (DailyTracking, HealthJournal, Reminder, Progress, WorkoutPlan, WorkoutSchedule,
+                     NutritionPlan, MealSchedule, SyncTombstone)
+
+
+def _with_user(queryset):
+    return queryset.select_related('user')
+
+
+def _progress(queryset):
+    return serializers.with_previous_weight(queryset.select_related('user'))
+
+
+def _workout_plans(queryset):
+    return queryset.select_related('user', 'created_by').prefetch_related(
+        Prefetch('schedules', queryset=WorkoutSchedule.objects.select_related('exercise__category'))
+    )
+
+
+def _nutrition_plans(queryset):
+    return queryset.select_related('user', 'created_by').prefetch_related(
+        Prefetch('meal_schedules', queryset=MealSchedule.objects.select_related('food'))
+    )
+
+
+# key trong /sync/ -> (model, serializer, chuẩn bị queryset cho serializer)
+SYNC_MODELS = {
+    'daily_tracking': (DailyTracking, serializers.DailyTrackingSerializer, _with_user),
+    'journals': (HealthJournal, serializers.HealthJournalSerializer, None),
+    'reminders': (Reminder, serializers.ReminderSerializer, _with_user),
+    'progress': (Progress, serializers.ProgressSerializer, _progress),
+    'workout_plans': (WorkoutPlan, serializers.WorkoutPlanSerializer, _workout_plans),
+    'nutrition_plans': (NutritionPlan, serializers.NutritionPlanSerializer, _nutrition_plans),
+}
+MODEL_KEYS = {model: key for key, (model, _, _) in SYNC_MODELS.items()}
+
+
+def page_size():
+    return getattr(settings, 'SYNC_PAGE_SIZE', 500)
+
+
+def settle_window():
+    return timedelta(seconds=getattr(settings, 'SYNC_SETTLE_SECONDS', 2))
+
+
+def tombstone_retention():
+    return timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 30))
+
+
+def parse_cursor(value):
+    """Cursor dạng "<updated_date ISO>,<id>"; chỉ có thời điểm thì id = 0."""
+    raw, _, pk = value.partition(',')
+    # '+' của múi giờ bị giải mã thành khoảng trắng nếu client không encode
+    ts = parse_datetime(raw.strip().replace(' ', '+'))
+    if ts is None:
+        raise ValidationError({"detail": "Cursor không hợp lệ"})
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts, dt_timezone.utc)
+    try:
+        return ts, int(pk or 0)
+    except ValueError:
+        raise ValidationError({"detail": "Cursor không hợp lệ"})
+
+
+def format_cursor(ts, pk):
+    return f"{ts.isoformat()},{pk}"
+
+
+def _position(cursor, now):
+    """(vị trí, reset): vị trí None nếu không có cursor hoặc cursor quá hạn tombstone."""
+    position = parse_cursor(cursor) if cursor else None
+    reset = position is not None and position[0] < now - tombstone_retention()
+    return (None if reset else position), reset
+
+
+def deletions(user, positions):
+    """
+    Id đã xóa sau vị trí của từng model ({key: (ts, id)}), một truy vấn cho mọi
+    model theo index (user, model, deleted_date).
+    """
+    if not positions:
+        return {}
+    deleted = {key: set() for key in positions}
+    rows = SyncTombstone.objects.filter(
+        user=user, model__in=list(positions), deleted_date__gt=min(ts for ts, _ in positions.values())
+    ).values_list('model', 'object_id', 'deleted_date')
+    for key, object_id, deleted_date in rows:
+        if deleted_date > positions[key][0]:
+            deleted[key].add(object_id)
+    return {key: sorted(ids) for key, ids in deleted.items()}
+
+
+def changes(user, key, cursor=None, now=None, context=None, deleted=None):
+    """
+    Các bản ghi của user đổi sau cursor (theo updated_date, id) và id đã xóa.
+    Không có cursor (lần đầu) hoặc cursor cũ hơn thời gian giữ tombstone thì
+    trả toàn bộ bản ghi đang active, kèm reset=True trong trường hợp thứ hai.
+    deleted: id đã xóa đã đọc sẵn (xem sync_all), None thì tự truy vấn.
+    """
+    model, serializer_class, prepare = SYNC_MODELS[key]
+    now = now or timezone.now()
+    queryset = model.objects.filter(user=user)
+    position, reset = _position(cursor, now)
+
+    if position:
+        ts, pk = position
+        queryset = queryset.filter(Q(updated_date__gt=ts) | Q(updated_date=ts, id__gt=pk))
+        if deleted is None:
+            deleted = deletions(user, {key: position})[key]
+    else:
+        deleted = []
+        queryset = queryset.filter(active=True)
+
+    queryset = queryset.order_by('updated_date', 'id')
+    if prepare:
+        queryset = prepare(queryset)
+    rows = list(queryset[:page_size() + 1])
+    has_more = len(rows) > page_size()
+    rows = rows[:page_size()]
+
+    last = (rows[-1].updated_date, rows[-1].id) if rows else position
+    if not has_more:
+        # Giao dịch commit muộn có thể mang updated_date cũ hơn: không cho cursor vượt
+        # quá now - settle, lần sau gửi lại phần nhỏ trong khoảng đó (client upsert theo id)
+        settled = (now - settle_window(), 0)
+        last = min(last, settled) if last else settled
+
+    return {
+        'updated': serializer_class(rows, many=True, context=context or {}).data,
+        'deleted': deleted,
+        'cursor': format_cursor(*last),
+        'has_more': has_more,
+        'reset': reset,
+    }
+
+
+def sync_all(user, cursors, now=None, context=None):
+    """changes() cho từng model ({key: cursor hoặc None}), tombstone của mọi model đọc một lần."""
+    now = now or timezone.now()
+    positions = {}
+    for key, cursor in cursors.items():
+        position, _ = _position(cursor, now)
+        if position:
+            positions[key] = position
+    deleted = deletions(user, positions)
+    return {key: changes(user, key, cursor, now, context, deleted.get(key, []))
+            for key, cursor in cursors.items()}
+
+
+def record_deletion(instance):
+    SyncTombstone.objects.create(user_id=instance.user_id, model=MODEL_KEYS[type(instance)],
+                                 object_id=instance.pk)
+
+
+def touch(model, pk):
+    # Đổi lịch của plan thì plan cũng phải được đồng bộ lại
+    model.objects.filter(pk=pk).update(updated_date=timezone.now())
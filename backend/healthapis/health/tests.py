@@ -1,3 +1,1620 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time as time_module
+from io import StringIO
+from unittest import mock
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from asgiref.testing import ApplicationCommunicator
+from cloudinary import CloudinaryResource
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from oauth2_provider.models import AccessToken
+from rest_framework.test import APIClient
+from .models import (User, HealthProfile, ChatRoom, Message, DailyTracking, Exercise, ExerciseCategory, Progress,
+                     WorkoutPlan, WorkoutSchedule, Food, NutritionPlan, MealSchedule, Reminder,
+                     TrackingRollup, HealthJournal, Consultation, ExpertStats)
+from . import (realtime, media, search, catalog, recommend, sync, rollups, charts, dashboard, metrics, serializers,
+               benchmark, reminders, booking, matching, auth, paginators)
+
+
+class ChatMessagesSyncTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.room = ChatRoom.objects.create(user=self.user, expert=self.expert)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _send(self, sender, n):
+        Message.objects.bulk_create([
+            Message(chat_room=self.room, sender=sender, content=f"msg {i}") for i in range(n)
+        ])
+        return self.room.messages.order_by('-id').first().id
+
+    def _url(self):
+        return f'/chat-rooms/{self.room.id}/messages/'
+
+    def test_since_id_returns_only_new_messages(self):
+        last_id = self._send(self.expert, 5)
+        self._send(self.expert, 3)
+
+        res = self.client.get(self._url(), {'since_id': last_id})
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data), 3)
+        self.assertTrue(all(m['id'] > last_id for m in res.data))
+        self.assertTrue(all(m['is_read'] for m in res.data))
+        # Tin nhắn cũ không bị đánh dấu lại
+        self.assertEqual(self.room.messages.filter(id__lte=last_id, is_read=False).count(), 5)
+
+    def test_since_id_invalid(self):
+        res = self.client.get(self._url(), {'since_id': 'abc'})
+        self.assertEqual(res.status_code, 400)
+
+    def test_poll_cost_independent_of_history(self):
+        def poll_queries(history):
+            last_id = self._send(self.expert, history)
+            self._send(self.expert, 2)
+            with CaptureQueriesContext(connection) as ctx:
+                res = self.client.get(self._url(), {'since_id': last_id})
+            self.assertEqual(len(res.data), 2)
+            return len(ctx)
+
+        self.assertEqual(poll_queries(10), poll_queries(500))
+
+
+class ChatRealtimeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.room = ChatRoom.objects.create(user=self.user, expert=self.expert)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_send_message_pushes_to_both_participants(self):
+        broker = realtime.get_broker()
+        loop = asyncio.new_event_loop()
+        queues = {uid: asyncio.Queue() for uid in (self.user.id, self.expert.id)}
+        for uid, queue in queues.items():
+            broker.subscribe(realtime.user_channel(uid), loop, queue)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                res = self.client.post(f'/chat-rooms/{self.room.id}/send/', {'content': 'xin chào'})
+            self.assertEqual(res.status_code, 201)
+            loop.run_until_complete(asyncio.sleep(0))
+
+            mine = queues[self.user.id].get_nowait()
+            theirs = queues[self.expert.id].get_nowait()
+        finally:
+            for uid, queue in queues.items():
+                broker.unsubscribe(realtime.user_channel(uid), loop, queue)
+            loop.close()
+
+        self.assertEqual(mine['message']['content'], 'xin chào')
+        self.assertTrue(mine['message']['is_mine'])
+        self.assertFalse(theirs['message']['is_mine'])
+        self.assertEqual(theirs['room']['last_message'], 'xin chào')
+
+    def test_websocket_rejects_missing_token(self):
+        async def connect():
+            comm = ApplicationCommunicator(realtime.websocket_application, {
+                'type': 'websocket', 'path': realtime.WEBSOCKET_PATH, 'query_string': b'',
+            })
+            await comm.send_input({'type': 'websocket.connect'})
+            return await comm.receive_output()
+
+        self.assertEqual(asyncio.run(connect()), {'type': 'websocket.close', 'code': 4401})
+
+    def test_authenticate_by_token(self):
+        AccessToken.objects.create(user=self.user, token='ws-token', expires=timezone.now() + timedelta(hours=1))
+        # Gọi hàm đồng bộ bên trong (cùng kết nối của test); close_old_connections
+        # sẽ đóng kết nối đang trong transaction của test
+        authenticate = realtime._authenticate.func
+        with mock.patch('health.realtime.close_old_connections'):
+            self.assertEqual(authenticate('ws-token'), self.user.id)
+            self.assertIsNone(authenticate('other-token'))
+
+
+class ChatRoomUnreadCountTest(TestCase):
+    def setUp(self):
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.client = APIClient()
+
+    def test_counters_follow_send_and_read(self):
+        user = User.objects.create_user(username='client', password='x', role='user')
+        room = ChatRoom.objects.create(user=user, expert=self.expert)
+
+        self.client.force_authenticate(self.expert)
+        for i in range(3):
+            self.client.post(f'/chat-rooms/{room.id}/send/', {'content': f'tin {i}'})
+        room.refresh_from_db()
+        self.assertEqual((room.user_unread_count, room.expert_unread_count), (3, 0))
+
+        self.client.force_authenticate(user)
+        res = self.client.get('/chat-rooms/')
+        self.assertEqual(res.data['results'][0]['unread_count'], 3)
+
+        self.client.get(f'/chat-rooms/{room.id}/messages/')
+        room.refresh_from_db()
+        self.assertEqual(room.user_unread_count, 0)
+
+    def test_list_query_count_constant(self):
+        users = User.objects.bulk_create([
+            User(username=f'client{i}', role='user') for i in range(500)
+        ])
+        ChatRoom.objects.bulk_create([
+            ChatRoom(user=u, expert=self.expert, expert_unread_count=1) for u in users
+        ])
+        self.client.force_authenticate(self.expert)
+
+        with self.assertNumQueries(2):
+            res = self.client.get('/chat-rooms/', {'limit': 200})
+        self.assertEqual(res.data['count'], 500)
+        self.assertEqual(len(res.data['results']), 200)
+        self.assertTrue(all(r['unread_count'] == 1 for r in res.data['results']))
+
+
+class PaginationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_daily_tracking_keyset_pages(self):
+        start = date(2024, 1, 1)
+        DailyTracking.objects.bulk_create([
+            DailyTracking(user=self.user, date=start + timedelta(days=i)) for i in range(75)
+        ])
+
+        seen = []
+        url = '/daily-tracking/'
+        while url:
+            res = self.client.get(url)
+            self.assertLessEqual(len(res.data['results']), 30)
+            seen += [r['date'] for r in res.data['results']]
+            url = res.data['next']
+
+        self.assertEqual(len(seen), 75)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_catalog_limit_is_bounded(self):
+        category = ExerciseCategory.objects.create(name='Cardio')
+        Exercise.objects.bulk_create([
+            Exercise(name=f'ex {i}', description='', category=category, duration=10,
+                     calories_burned=50, instructions='') for i in range(250)
+        ])
+
+        res = self.client.get('/exercises/', {'limit': 1000})
+        self.assertEqual(res.data['count'], 250)
+        self.assertEqual(len(res.data['results']), 200)
+
+        # Các trang LIMIT/OFFSET nối lại đủ mọi dòng, không trùng
+        ids = []
+        for offset in range(0, 250, 50):
+            ids += [e['id'] for e in self.client.get('/exercises/', {'offset': offset}).data['results']]
+        self.assertEqual(sorted(ids), sorted(Exercise.objects.values_list('id', flat=True)))
+
+    def test_stable_ordering_ends_with_pk(self):
+        self.assertEqual(paginators.stable_ordering(Exercise.objects.all()).query.order_by, ('pk',))
+        self.assertEqual(paginators.stable_ordering(Exercise.objects.order_by('-name')).query.order_by,
+                         ('-name', 'pk'))
+        queryset = Exercise.objects.order_by('name', '-id')
+        self.assertIs(paginators.stable_ordering(queryset), queryset)
+
+    def test_messages_before_id(self):
+        expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        room = ChatRoom.objects.create(user=self.user, expert=expert)
+        Message.objects.bulk_create([
+            Message(chat_room=room, sender=expert, content=f"msg {i}") for i in range(120)
+        ])
+        url = f'/chat-rooms/{room.id}/messages/'
+
+        newest = self.client.get(url).data
+        older = self.client.get(url, {'before_id': newest[0]['id']}).data
+
+        self.assertEqual(len(newest), 50)
+        self.assertEqual(len(older), 50)
+        self.assertLess(older[-1]['id'], newest[0]['id'])
+
+
+class ProgressWeightChangeTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create(self, n):
+        start = date(2024, 1, 1)
+        Progress.objects.bulk_create([
+            Progress(user=self.user, date=start + timedelta(days=i), weight=80 - i * 0.5)
+            for i in range(n)
+        ])
+
+    def test_weight_change_across_page_boundary(self):
+        self._create(40)
+
+        first = self.client.get('/progress/')
+        second = self.client.get(first.data['next'])
+        rows = first.data['results'] + second.data['results']
+
+        self.assertEqual([r['weight_change'] for r in rows[:-1]], [-0.5] * 39)
+        self.assertIsNone(rows[-1]['weight_change'])
+
+    def test_list_query_count_constant(self):
+        self._create(200)
+        with self.assertNumQueries(1):
+            res = self.client.get('/progress/', {'page_size': 200})
+        self.assertEqual(len(res.data['results']), 200)
+
+
+class PlanPrefetchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = ExerciseCategory.objects.create(name='Cardio')
+        self.exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'ex {i}', description='', category=category, duration=10,
+                     calories_burned=50, instructions='') for i in range(5)
+        ])
+        self.foods = Food.objects.bulk_create([
+            Food(name=f'food {i}', meal_type='lunch', calories=300, protein=20, carbs=30, fat=10)
+            for i in range(5)
+        ])
+
+    def test_trainer_workout_plans_query_count(self):
+        trainer = User.objects.create_user(username='coach', password='x', role='trainer')
+        plans = WorkoutPlan.objects.bulk_create([
+            WorkoutPlan(user=trainer, created_by=trainer, name=f'plan {i}', goal='maintain',
+                        start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+            for i in range(200)
+        ])
+        WorkoutSchedule.objects.bulk_create([
+            WorkoutSchedule(workout_plan=p, exercise=e, weekday=i)
+            for p in plans for i, e in enumerate(self.exercises)
+        ])
+        self.client.force_authenticate(trainer)
+
+        # count + trang kế hoạch + prefetch schedules
+        with self.assertNumQueries(3):
+            res = self.client.get('/workout-plans/', {'limit': 200})
+        self.assertEqual(len(res.data['results']), 200)
+        self.assertTrue(all(p['total_exercises'] == 5 for p in res.data['results']))
+        self.assertEqual(res.data['results'][0]['schedules'][0]['exercise']['category']['name'], 'Cardio')
+
+    def test_nutritionist_plans_query_count(self):
+        expert = User.objects.create_user(username='dr', password='x', role='nutritionist')
+        plans = NutritionPlan.objects.bulk_create([
+            NutritionPlan(user=expert, created_by=expert, name=f'plan {i}', goal='maintain',
+                          daily_calories=2000, start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+            for i in range(200)
+        ])
+        MealSchedule.objects.bulk_create([
+            MealSchedule(nutrition_plan=p, food=f, weekday=i)
+            for p in plans for i, f in enumerate(self.foods)
+        ])
+        self.client.force_authenticate(expert)
+
+        with self.assertNumQueries(3):
+            res = self.client.get('/nutrition-plans/', {'limit': 200})
+        self.assertEqual(len(res.data['results']), 200)
+        self.assertTrue(all(p['total_meals'] == 5 for p in res.data['results']))
+
+
+class MediaUrlCacheTest(TestCase):
+    def setUp(self):
+        media.url_cache.clear()
+
+    def test_urls_are_cached_and_bounded(self):
+        cache = media.MediaUrlCache(maxsize=2)
+        for i in range(3):
+            cache.set((f'img{i}', None, None, 'upload', 'image', ()), f'url{i}')
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(('img0', None, None, 'upload', 'image', ())))
+
+    def test_save_invalidates_cached_url(self):
+        user = User.objects.create_user(username='client', password='x')
+        user.avatar = CloudinaryResource(public_id='avatars/a', format='jpg', version='1')
+        url = media.media_url(user.avatar)
+        self.assertIn('avatars/a', url)
+        self.assertEqual(len(media.url_cache), 1)
+
+        user.save()
+        self.assertEqual(len(media.url_cache), 0)
+
+
+class CatalogSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username='client', password='x'))
+        self.pho = Food.objects.create(name='Phở bò', description='<p>Nước dùng <b>đậm đà</b></p>',
+                                       meal_type='breakfast', calories=450, protein=25, carbs=60, fat=10)
+        self.salad = Food.objects.create(name='Salad gà', description='<p>Ít calo, nhiều đạm bò</p>',
+                                         meal_type='lunch', calories=250, protein=30, carbs=10, fat=8)
+        Food.objects.create(name='Cơm tấm', description='<p>Sườn nướng</p>',
+                            meal_type='lunch', calories=600, protein=30, carbs=80, fat=20)
+
+    def _search(self, q):
+        return [f['name'] for f in self.client.get('/foods/', {'search': q}).data['results']]
+
+    def test_fold_strips_html_and_accents(self):
+        self.assertEqual(search.tokenize('<p>Đậm đà &amp; Phở</p>'), ['dam', 'da', 'pho'])
+
+    def test_accent_insensitive_prefix_and_rank(self):
+        self.assertEqual(self._search('pho'), ['Phở bò'])
+        # Khớp ở tên xếp trên khớp ở mô tả
+        self.assertEqual(self._search('bo'), ['Phở bò', 'Salad gà'])
+        self.assertEqual(self._search('dam'), ['Phở bò', 'Salad gà'])
+        self.assertEqual(self._search('sal ga'), ['Salad gà'])
+        # Từ 1 ký tự không được tìm theo tiền tố
+        self.assertEqual(self._search('p'), [])
+        self.assertEqual(self._search('p sal'), ['Salad gà'])
+
+    def test_prefix_ending_in_z_or_9(self):
+        Food.objects.create(name='Pizza 990', meal_type='lunch', calories=800, protein=30, carbs=90, fat=30)
+        # Nhánh LIKE của MySQL/PostgreSQL chạy được trên SQLite, cho cùng kết quả
+        for vendor in (connection.vendor, 'mysql'):
+            catalog.get_cache().clear()
+            with mock.patch.object(connection, 'vendor', vendor):
+                self.assertEqual(self._search('pizz'), ['Pizza 990'])
+                self.assertEqual(self._search('99'), ['Pizza 990'])
+                self.assertEqual(self._search('9'), [])
+
+    def test_html_markup_not_indexed(self):
+        terms = set(self.pho.search_terms.values_list('term', flat=True))
+        self.assertEqual(terms, {'pho', 'bo', 'nuoc', 'dung', 'dam', 'da'})
+
+    def test_index_follows_save_and_delete(self):
+        self.pho.name = 'Bún chả'
+        self.pho.save()
+        self.assertEqual(self._search('bun'), ['Bún chả'])
+        self.assertEqual(self._search('pho'), [])
+
+        self.pho.delete()
+        self.assertEqual(self._search('bun'), [])
+
+
+class CatalogCacheTest(TestCase):
+    def setUp(self):
+        catalog.get_cache().clear()
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.category = ExerciseCategory.objects.create(name='Cardio')
+        self.exercise = Exercise.objects.create(name='Chạy bộ', description='Chạy', instructions='-',
+                                                category=self.category, duration=30,
+                                                calories_burned=300, difficulty='easy')
+
+    def test_second_request_served_from_cache(self):
+        first = self.client.get('/exercises/', {'category_id': self.category.id})
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get('/exercises/', {'category_id': self.category.id})
+
+        self.assertEqual(len(ctx), 0)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_version_bumped_again_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.exercise.name = 'Đi bộ'
+            self.exercise.save()
+            # Request khác đọc lúc này vẫn thấy dữ liệu cũ và lưu dưới stamp này
+            before_commit = catalog.get_versions(['exercise'])
+        self.assertNotEqual(catalog.get_versions(['exercise']), before_commit)
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get(f'/exercises/{self.exercise.id}/')['ETag']
+
+        res = self.client.get(f'/exercises/{self.exercise.id}/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 304)
+        self.assertFalse(res.content)
+
+    def test_category_change_invalidates_exercises(self):
+        etag = self.client.get('/exercises/')['ETag']
+        self.category.name = 'HIIT'
+        self.category.save()
+
+        res = self.client.get('/exercises/', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['results'][0]['category']['name'], 'HIIT')
+
+    def test_missing_object_not_cached(self):
+        self.assertEqual(self.client.get('/foods/999/').status_code, 404)
+        food = Food.objects.create(id=999, name='Phở', description='-', meal_type='lunch',
+                                   calories=400, protein=20, carbs=50, fat=10)
+        self.assertEqual(self.client.get(f'/foods/{food.id}/').data['name'], 'Phở')
+
+
+class RecommendationTest(TestCase):
+    def setUp(self):
+        catalog.get_cache().clear()
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        self.profile = HealthProfile.objects.create(user=self.user, height=170, weight=85, age=30,
+                                                    goal='lose_weight', target_weight=70)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        cardio = ExerciseCategory.objects.create(name='Cardio')
+        strength = ExerciseCategory.objects.create(name='Strength')
+
+        def exercise(name, category, calories, difficulty='medium'):
+            return Exercise.objects.create(name=name, description='-', instructions='-', category=category,
+                                           duration=30, calories_burned=calories, difficulty=difficulty)
+        self.run = exercise('Chạy bộ', cardio, 350)
+        self.walk = exercise('Đi bộ', cardio, 120, 'easy')
+        self.squat = exercise('Squat', strength, 150, 'hard')
+
+    def _names(self, url, **params):
+        return [e['name'] for e in self.client.get(url, params).data]
+
+    def test_ranks_by_goal(self):
+        self.assertEqual(self._names('/exercises/recommended/'), ['Chạy bộ', 'Đi bộ', 'Squat'])
+
+        self.profile.goal = 'gain_muscle'
+        self.profile.save()
+        self.assertEqual(self._names('/exercises/recommended/')[0], 'Squat')
+
+    def test_catalog_changes_update_ranking(self):
+        self.assertEqual(self._names('/exercises/recommended/', limit=1), ['Chạy bộ'])
+
+        self.walk.calories_burned = 500
+        self.walk.save()
+        self.assertEqual(self._names('/exercises/recommended/', limit=1), ['Đi bộ'])
+
+        self.walk.active = False
+        self.walk.save()
+        self.run.delete()
+        self.assertEqual(self._names('/exercises/recommended/'), ['Squat'])
+
+    def test_own_change_not_rebuilt_after_commit(self):
+        self._names('/exercises/recommended/')
+        recommender = recommend.RECOMMENDERS[Exercise]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.walk.calories_burned = 500
+            self.walk.save()
+        with mock.patch.object(recommender, '_rebuild', wraps=recommender._rebuild) as rebuild:
+            self.assertEqual(self._names('/exercises/recommended/', limit=1), ['Đi bộ'])
+        rebuild.assert_not_called()
+
+    def test_foods_for_weight_loss(self):
+        Food.objects.create(name='Ức gà', meal_type='lunch', calories=200, protein=40, carbs=0, fat=3)
+        Food.objects.create(name='Bánh mì bơ', meal_type='breakfast', calories=650, protein=10, carbs=70, fat=35)
+
+        self.assertEqual(self._names('/foods/recommended/'), ['Ức gà', 'Bánh mì bơ'])
+
+    def test_requires_profile(self):
+        self.profile.delete()
+        self.assertEqual(self.client.get('/foods/recommended/').status_code, 404)
+
+    def test_incremental_top_k_matches_full_rebuild(self):
+        scores = {i: (i * 37) % 1009 for i in range(1000)}
+        ranking = recommend.Ranking(scores.items())
+        for i in range(0, 1000, 7):
+            scores[i] = 1000 + i % 13
+            ranking.update(i, scores[i], len(scores))
+
+        self.assertFalse(ranking.stale)
+        self.assertEqual(ranking.ids(200), recommend.Ranking(scores.items()).ids(200))
+
+        # Phần tử trong top tụt xuống dưới đuôi: phải tính lại
+        top = ranking.ids(1)[0]
+        ranking.update(top, -1, len(scores))
+        self.assertTrue(ranking.stale)
+
+
+class PlanCloneTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.trainer = User.objects.create_user(username='coach', password='x', role='trainer')
+        category = ExerciseCategory.objects.create(name='Cardio')
+        exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'ex {i}', description='', category=category, duration=10,
+                     calories_burned=50, instructions='') for i in range(10)
+        ])
+        self.template = WorkoutPlan.objects.create(user=self.trainer, created_by=self.trainer, name='Mẫu',
+                                                   goal='lose_weight', start_date=date(2024, 1, 1),
+                                                   end_date=date(2024, 2, 1))
+        WorkoutSchedule.objects.bulk_create([
+            WorkoutSchedule(workout_plan=self.template, exercise=e, weekday=i % 7, sets=4)
+            for i, e in enumerate(exercises)
+        ])
+        self.clients = [User.objects.create_user(username=f'client{i}', password='x') for i in range(3)]
+        for c in self.clients:
+            HealthProfile.objects.create(user=c, height=170, weight=70, age=30, expert=self.trainer)
+
+    def test_clone_is_bulk_and_returns_plan(self):
+        self.client.force_authenticate(self.clients[0])
+
+        # template + prefetch lịch + savepoint + insert plan + insert lịch + release
+        with self.assertNumQueries(6):
+            res = self.client.post(f'/workout-plans/{self.template.id}/clone/')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['name'], 'Mẫu (Bản sao)')
+        self.assertEqual(res.data['total_exercises'], 10)
+        self.assertTrue(all(s['id'] and s['sets'] == 4 for s in res.data['schedules']))
+        self.assertEqual(WorkoutSchedule.objects.filter(workout_plan_id=res.data['id']).count(), 10)
+
+    def test_user_can_clone_nutritionist_template(self):
+        expert = User.objects.create_user(username='dr', password='x', role='nutritionist')
+        food = Food.objects.create(name='Cơm', meal_type='lunch', calories=300, protein=5, carbs=60, fat=1)
+        template = NutritionPlan.objects.create(user=expert, created_by=expert, name='Eat clean', goal='maintain',
+                                                daily_calories=1800, start_date=date(2024, 1, 1),
+                                                end_date=date(2024, 2, 1))
+        MealSchedule.objects.create(nutrition_plan=template, food=food, weekday=0, portion=2)
+        self.client.force_authenticate(self.clients[0])
+
+        res = self.client.post(f'/nutrition-plans/{template.id}/clone/')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['daily_calories'], 1800)
+        self.assertEqual(res.data['meal_schedules'][0]['total_calories'], 600)
+
+    def test_assign_template_to_clients(self):
+        self.client.force_authenticate(self.trainer)
+        ids = [c.id for c in self.clients]
+
+        res = self.client.post(f'/workout-plans/{self.template.id}/assign/', {'user_ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(sorted(p['user_id'] for p in res.data['plans']), ids)
+        self.assertEqual(WorkoutSchedule.objects.filter(workout_plan__user__in=self.clients).count(), 30)
+
+    def test_assign_rejects_other_users(self):
+        stranger = User.objects.create_user(username='stranger', password='x')
+        self.client.force_authenticate(self.trainer)
+
+        res = self.client.post(f'/workout-plans/{self.template.id}/assign/',
+                               {'user_ids': [self.clients[0].id, stranger.id]}, format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.data['user_ids'], [stranger.id])
+        self.assertFalse(WorkoutPlan.objects.filter(user=self.clients[0]).exists())
+
+        self.client.force_authenticate(self.clients[0])
+        res = self.client.post(f'/workout-plans/{self.template.id}/assign/', {'user_ids': [1]}, format='json')
+        self.assertEqual(res.status_code, 403)
+
+
+class BatchWriteTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='client', password='x')
+        self.client.force_authenticate(self.user)
+        category = ExerciseCategory.objects.create(name='Cardio')
+        self.exercises = Exercise.objects.bulk_create([
+            Exercise(name=f'ex {i}', description='', category=category, duration=10,
+                     calories_burned=50, instructions='') for i in range(20)
+        ])
+        self.plan = WorkoutPlan.objects.create(user=self.user, created_by=self.user, name='Của tôi',
+                                               goal='maintain', start_date=date(2024, 1, 1),
+                                               end_date=date(2024, 2, 1))
+
+    def test_add_exercises_in_one_request(self):
+        items = [{'exercise_id': e.id, 'weekday': i % 7, 'sets': 4} for i, e in enumerate(self.exercises)]
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post(f'/workout-plans/{self.plan.id}/add-exercises/', {'items': items}, format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertLessEqual(len(ctx), 6)
+        ids = [r['schedule_id'] for r in res.data['results']]
+        self.assertEqual(sorted(ids), sorted(self.plan.schedules.values_list('id', flat=True)))
+        self.assertEqual(WorkoutSchedule.objects.get(id=ids[3]).exercise_id, self.exercises[3].id)
+
+    def test_ids_read_back_without_returning_insert(self):
+        # Giả lập MySQL: INSERT nhiều dòng không trả id
+        WorkoutSchedule.objects.create(workout_plan=self.plan, exercise=self.exercises[0], weekday=0)
+        items = [{'exercise_id': e.id, 'weekday': 1} for e in self.exercises[:5]]
+
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            res = self.client.post(f'/workout-plans/{self.plan.id}/add-exercises/', {'items': items}, format='json')
+
+        ids = [r['schedule_id'] for r in res.data['results']]
+        self.assertEqual([WorkoutSchedule.objects.get(id=i).exercise_id for i in ids],
+                         [e.id for e in self.exercises[:5]])
+
+    def test_invalid_item_rejects_whole_batch(self):
+        items = [{'exercise_id': self.exercises[0].id, 'weekday': 0},
+                 {'exercise_id': 999999, 'weekday': 1},
+                 {'exercise_id': self.exercises[1].id, 'weekday': 9}]
+
+        res = self.client.post(f'/workout-plans/{self.plan.id}/add-exercises/', {'items': items}, format='json')
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([r['index'] for r in res.data['results']], [1, 2])
+        self.assertFalse(self.plan.schedules.exists())
+
+    def test_add_meals(self):
+        nutrition = NutritionPlan.objects.create(user=self.user, created_by=self.user, name='Ăn', goal='maintain',
+                                                 daily_calories=2000, start_date=date(2024, 1, 1),
+                                                 end_date=date(2024, 2, 1))
+        food = Food.objects.create(name='Cơm', meal_type='lunch', calories=300, protein=5, carbs=60, fat=1)
+
+        res = self.client.post(f'/nutrition-plans/{nutrition.id}/add-meals/',
+                               [{'food_id': food.id, 'weekday': d, 'portion': 1.5} for d in range(7)],
+                               format='json')
+
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(nutrition.meal_schedules.filter(portion=1.5).count(), 7)
+
+    def test_tracking_batch_upsert(self):
+        DailyTracking.objects.create(user=self.user, date=date(2024, 3, 1), steps=100, water_intake=500)
+        items = [
+            {'date': '2024-03-01', 'steps': 8000},
+            {'date': '2024-03-02', 'steps': 3000},
+            {'date': 'hôm qua', 'steps': 1},
+            {'date': '2024-03-02', 'water_intake': 1500},
+        ]
+
+        res = self.client.post('/daily-tracking/batch/', {'items': items}, format='json')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([r['status'] for r in res.data['results']], ['updated', 'created', 'invalid', 'created'])
+        first = DailyTracking.objects.get(user=self.user, date=date(2024, 3, 1))
+        self.assertEqual((first.steps, first.water_intake), (8000, 500))
+        second = DailyTracking.objects.get(user=self.user, date=date(2024, 3, 2))
+        self.assertEqual((second.steps, second.water_intake), (3000, 1500))
+        self.assertEqual(res.data['results'][1]['data']['id'], second.id)
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class SyncTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='client', password='x')
+        self.client.force_authenticate(self.user)
+        self.day = DailyTracking.objects.create(user=self.user, date=date(2024, 3, 1), steps=100)
+        self.reminder = Reminder.objects.create(user=self.user, title='Uống nước', reminder_type='water',
+                                                time='08:00')
+
+    def _sync(self, **params):
+        res = self.client.get('/sync/', params)
+        self.assertEqual(res.status_code, 200)
+        return res.data
+
+    def _cursors(self, data):
+        return {key: value['cursor'] for key, value in data.items()}
+
+    def test_initial_then_empty_delta(self):
+        first = self._sync()
+        self.assertEqual(set(first), set(sync.SYNC_MODELS))
+        self.assertEqual([r['id'] for r in first['daily_tracking']['updated']], [self.day.id])
+
+        second = self._sync(**self._cursors(first))
+        self.assertTrue(all(not v['updated'] and not v['deleted'] for v in second.values()))
+
+    def test_delta_returns_changes_and_deletions(self):
+        cursors = self._cursors(self._sync())
+        self.day.steps = 9000
+        self.day.save()
+        reminder_id = self.reminder.id
+        self.reminder.delete()
+
+        data = self._sync(**cursors)
+
+        self.assertEqual([r['steps'] for r in data['daily_tracking']['updated']], [9000])
+        self.assertEqual(data['reminders']['deleted'], [reminder_id])
+
+    def test_tombstones_read_once_per_request(self):
+        now = timezone.now()
+        day_id = self.day.id
+        self.day.delete()
+        self.reminder.delete()
+        cursors = {key: sync.format_cursor(now - timedelta(minutes=1), 0) for key in sync.SYNC_MODELS}
+        # Cursor sau lúc xóa: tombstone của model khác không lọt vào
+        cursors['reminders'] = sync.format_cursor(now + timedelta(minutes=1), 0)
+
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/sync/', cursors)
+
+        self.assertEqual(res.data['daily_tracking']['deleted'], [day_id])
+        self.assertEqual(res.data['reminders']['deleted'], [])
+        self.assertEqual(sum('health_synctombstone' in q['sql'] for q in ctx.captured_queries), 1)
+        self.assertNotIn('X-Duplicate-Queries', res)
+
+    def test_schedule_change_resyncs_plan(self):
+        category = ExerciseCategory.objects.create(name='Cardio')
+        exercise = Exercise.objects.create(name='Chạy', description='', category=category, duration=10,
+                                           calories_burned=50, instructions='')
+        plan = WorkoutPlan.objects.create(user=self.user, created_by=self.user, name='P', goal='maintain',
+                                          start_date=date(2024, 1, 1), end_date=date(2024, 2, 1))
+        cursors = self._cursors(self._sync(models='workout_plans'))
+
+        self.client.post(f'/workout-plans/{plan.id}/add-exercises/',
+                         {'items': [{'exercise_id': exercise.id, 'weekday': 0}]}, format='json')
+        data = self._sync(models='workout_plans', **cursors)
+
+        self.assertEqual(data['workout_plans']['updated'][0]['total_exercises'], 1)
+
+    @override_settings(SYNC_PAGE_SIZE=10)
+    def test_pages_rows_with_equal_timestamps(self):
+        DailyTracking.objects.bulk_create([
+            DailyTracking(user=self.user, date=date(2024, 4, 1) + timedelta(days=i)) for i in range(25)
+        ])
+        DailyTracking.objects.filter(user=self.user).update(updated_date=self.day.updated_date)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {'models': 'daily_tracking'}
+            if cursor:
+                params['daily_tracking'] = cursor
+            with self.assertNumQueries(2 if cursor else 1):
+                page = self._sync(**params)['daily_tracking']
+            seen += [r['id'] for r in page['updated']]
+            cursor, pages = page['cursor'], pages + 1
+            if not page['has_more']:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(sorted(seen), sorted(DailyTracking.objects.values_list('id', flat=True)))
+
+    def test_stale_cursor_forces_reset(self):
+        data = self._sync(models='reminders', reminders='2000-01-01T00:00:00+00:00,0')
+        self.assertTrue(data['reminders']['reset'])
+        self.assertEqual(len(data['reminders']['updated']), 1)
+
+
+class TrackingRollupTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='client', password='x')
+        self.client.force_authenticate(self.user)
+
+    def _track(self, day, **fields):
+        return DailyTracking.objects.create(user=self.user, date=day, **fields)
+
+    def test_rollups_follow_saves_and_deletes(self):
+        # 2024-01-29 (thứ 2) .. 2024-02-01: một tuần vắt qua hai tháng
+        self._track(date(2024, 1, 29), steps=6000, water_intake=1000, weight=70, heart_rate=60)
+        feb = self._track(date(2024, 2, 1), steps=2000, water_intake=2000, weight=69)
+
+        week = TrackingRollup.objects.get(user=self.user, period='week', period_start=date(2024, 1, 29))
+        self.assertEqual((week.active_days, week.workout_days, week.steps_total), (2, 1, 8000))
+        self.assertEqual((week.weight_min, week.weight_max, week.weight_last), (69, 70, 69))
+        self.assertEqual(TrackingRollup.objects.get(period='month', period_start=date(2024, 2, 1)).steps_total, 2000)
+
+        feb.date = date(2024, 3, 5)
+        feb.save()
+        self.assertFalse(TrackingRollup.objects.filter(period='month', period_start=date(2024, 2, 1)).exists())
+        self.assertEqual(TrackingRollup.objects.get(period='month', period_start=date(2024, 3, 1)).active_days, 1)
+
+        feb.delete()
+        self.assertFalse(TrackingRollup.objects.filter(period='month', period_start=date(2024, 3, 1)).exists())
+
+    def test_batch_upsert_refreshes_rollups(self):
+        self.client.post('/daily-tracking/batch/', {'items': [
+            {'date': '2024-05-06', 'steps': 7000}, {'date': '2024-05-07', 'steps': 3000},
+        ]}, format='json')
+
+        week = TrackingRollup.objects.get(user=self.user, period='week', period_start=date(2024, 5, 6))
+        self.assertEqual((week.active_days, week.steps_total), (2, 10000))
+
+    def test_summary_reads_constant_rows(self):
+        today = date.today()
+        DailyTracking.objects.bulk_create([
+            DailyTracking(user=self.user, date=today - timedelta(days=i), steps=1000, water_intake=1500)
+            for i in range(3 * 365)
+        ])
+        rollups.rebuild([self.user.id])
+
+        with self.assertNumQueries(1):
+            res = self.client.get('/daily-tracking/summary/', {'period': 'year', 'count': 3})
+        self.assertEqual(len(res.data), 3)
+        self.assertEqual(res.data[0]['start'], date(today.year, 1, 1))
+        self.assertEqual(sum(y['active_days'] for y in res.data),
+                         DailyTracking.objects.filter(date__year__gte=today.year - 2).count())
+        self.assertEqual(res.data[0]['water_avg'], 1500)
+
+        with self.assertNumQueries(1):
+            res = self.client.get('/daily-tracking/weekly-summary/')
+        self.assertEqual(res.data['water_avg'], 1.5)
+        # Cửa sổ trượt today - 7 .. today, không phụ thuộc hôm nay là thứ mấy
+        self.assertEqual(res.data['calories_total'], int(1000 * 8 * 0.04))
+
+    def test_weekly_summary_is_rolling_window(self):
+        today = date.today()
+        for i, steps in [(0, 6000), (3, 2000), (7, 5000), (8, 9000)]:
+            self._track(today - timedelta(days=i), steps=steps, water_intake=1000 + 100 * i)
+
+        res = self.client.get('/daily-tracking/weekly-summary/')
+        self.assertEqual(res.data, {'water_avg': 1.3, 'workout_count': 2,
+                                    'calories_total': int(13000 * 0.04)})
+
+
+class ChartDataTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='client', password='x')
+        self.client.force_authenticate(self.user)
+        today = date.today()
+        Progress.objects.bulk_create([
+            Progress(user=self.user, date=today - timedelta(days=i), weight=80 - i / 100)
+            for i in range(0, 1000, 2)
+        ])
+        DailyTracking.objects.bulk_create([
+            DailyTracking(user=self.user, date=today - timedelta(days=i), steps=1000 + i, weight=90)
+            for i in range(1000)
+        ])
+
+    def test_chart_data_downsampled(self):
+        res = self.client.get('/progress/chart-data/', {'days': 1000, 'max_points': 100})
+
+        self.assertLessEqual(len(res.data), 100)
+        self.assertGreater(res.data[0]['date'], res.data[-1]['date'])
+        self.assertEqual(len(self.client.get('/progress/chart-data/', {'days': 30}).data), 16)
+
+    def test_lttb_keeps_extremes(self):
+        points = [{'date': date(2024, 1, 1) + timedelta(days=i), 'weight': 70.0} for i in range(500)]
+        points[123]['weight'] = 95.0
+        points[321]['weight'] = 50.0
+
+        sampled = charts.lttb(points, 20, 'weight')
+
+        self.assertEqual(len(sampled), 20)
+        self.assertIn(points[123], sampled)
+        self.assertIn(points[321], sampled)
+        self.assertEqual((sampled[0], sampled[-1]), (points[0], points[-1]))
+
+    def test_lttb_short_range_unchanged(self):
+        # Ít hơn max_points thì giữ mọi ngày, kể cả ngày không cân
+        points = [{'date': date(2024, 1, 1) + timedelta(days=i), 'weight': 70.0 if i % 10 == 0 else None,
+                   'steps': 1000 + i} for i in range(20)]
+        self.assertEqual(charts.downsample(points, 120, 'lttb', ('weight', 'steps')), points)
+
+    def test_merged_timeseries(self):
+        with self.assertNumQueries(2):
+            res = self.client.get('/progress/timeseries/', {'days': 10, 'max_points': 500})
+
+        self.assertEqual(len(res.data), 11)
+        today = res.data[-1]
+        self.assertEqual((today['weight'], today['steps']), (80, 1000))
+        # Ngày không có Progress thì lấy cân nặng từ DailyTracking
+        self.assertEqual(res.data[-2]['weight'], 90)
+
+        res = self.client.get('/progress/timeseries/', {'days': 1000, 'max_points': 50, 'method': 'lttb'})
+        self.assertLessEqual(len(res.data), 50)
+        # Mỗi chuỗi lấy mẫu riêng, steps không bị bỏ theo weight
+        self.assertTrue(all(row['steps'] is not None for row in res.data))
+        self.assertEqual(self.client.get('/progress/timeseries/', {'method': 'x'}).status_code, 400)
+
+
+class ExpertDashboardTest(TestCase):
+    def setUp(self):
+        dashboard.cache.clear()
+        self.client = APIClient()
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.client.force_authenticate(self.expert)
+        today = date.today()
+        self.users = []
+        for i in range(20):
+            user = User.objects.create_user(username=f'client{i}', password='x', role='user')
+            HealthProfile.objects.create(user=user, expert=self.expert, height=170, weight=80, age=30)
+            self.users.append(user)
+        first = self.users[0]
+        DailyTracking.objects.bulk_create([
+            DailyTracking(user=first, date=today - timedelta(days=i), weight=78 if i else None)
+            for i in range(0, 40, 2)
+        ])
+        Progress.objects.bulk_create([
+            Progress(user=first, date=today - timedelta(days=i), weight=w)
+            for i, w in [(0, 76.5), (6, 77.0), (25, 79.0)]
+        ])
+        HealthJournal.objects.create(user=first, date=today - timedelta(days=3), title='a', content='a', mood='tired')
+        HealthJournal.objects.create(user=first, date=today - timedelta(days=1), title='b', content='b', mood='great')
+        ChatRoom.objects.create(user=first, expert=self.expert, expert_unread_count=4)
+
+    def test_dashboard_aggregates_in_constant_queries(self):
+        with self.assertNumQueries(3):
+            res = self.client.get('/health-profiles/dashboard/')
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(len(res.data['clients']), 20)
+        row = res.data['clients'][0]
+        self.assertEqual(row['id'], self.users[0].id)
+        self.assertEqual(row['latest_weight'], 76.5)
+        self.assertEqual(row['weight_change_7d'], -0.5)
+        self.assertEqual(row['weight_change_30d'], -1.5)
+        # Ngày 0, 2, 4, 6 trong 7 ngày; 15 ngày trong 30 ngày
+        self.assertEqual((row['adherence_7d'], row['adherence_30d']), (57, 50))
+        self.assertEqual((row['last_mood'], row['unread_count']), ('great', 4))
+
+        self.assertEqual(row['latest_weight_source'], 'measured')
+
+        empty = res.data['clients'][1]
+        self.assertEqual((empty['latest_weight'], empty['weight_change_7d']), (80, None))
+        self.assertEqual((empty['latest_weight_date'], empty['latest_weight_source']), (None, 'profile'))
+        self.assertEqual((empty['adherence_30d'], empty['last_mood'], empty['unread_count']), (0, None, 0))
+
+    def test_weight_change_window_is_seven_days(self):
+        # Lần đo đúng 7 ngày trước nằm ngoài cửa sổ 7 ngày (ngày 0..6)
+        today = date.today()
+        Progress.objects.bulk_create([
+            Progress(user=self.users[1], date=today - timedelta(days=i), weight=w)
+            for i, w in [(0, 79.0), (7, 80.0), (29, 81.0), (30, 82.0)]
+        ])
+        row = dashboard.client_summaries(self.expert, today)[1]
+        self.assertIsNone(row['weight_change_7d'])
+        self.assertEqual(row['weight_change_30d'], -2.0)
+
+    def test_dashboard_is_cached(self):
+        self.client.get('/health-profiles/dashboard/')
+        with self.assertNumQueries(0):
+            self.client.get('/health-profiles/dashboard/')
+        with self.assertNumQueries(3):
+            self.client.get('/health-profiles/dashboard/', {'refresh': 1})
+
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get('/health-profiles/dashboard/').status_code, 403)
+
+
+class QueryPlanTest(TestCase):
+    """
+    Chạy EXPLAIN cho mọi truy vấn SELECT của các endpoint đọc trên dữ liệu mẫu,
+    lỗi nếu có bảng bị quét toàn bộ (SQLite: "SCAN <bảng>", MySQL: type=ALL).
+    """
+    # Endpoint đọc cả danh mục theo thiết kế (danh sách không lọc, dựng bộ gợi ý)
+    ALLOWED_SCANS = {
+        '/exercise-categories/': {'health_exercisecategory'},
+        '/exercises/': {'health_exercise'},
+        '/exercises/recommended/': {'health_exercise'},
+        '/foods/': {'health_food'},
+        '/foods/recommended/': {'health_food'},
+    }
+
+    def setUp(self):
+        dashboard.cache.clear()
+        catalog.get_cache().clear()
+        today = date.today()
+        self.trainer = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.nutritionist = User.objects.create_user(username='chef', password='x', role='nutritionist')
+        self.user = User.objects.create_user(username='client', password='x', role='user')
+        HealthProfile.objects.create(user=self.user, expert=self.trainer, height=170, weight=80, age=30)
+        category = ExerciseCategory.objects.create(name='Cardio')
+        exercises = [Exercise.objects.create(name=f'Run {i}', description='', category=category, duration=10,
+                                             calories_burned=100, instructions='') for i in range(5)]
+        foods = [Food.objects.create(name=f'Rice {i}', meal_type='lunch', calories=300 + i, protein=5,
+                                     carbs=60, fat=1) for i in range(5)]
+        for owner in (self.user, self.trainer):
+            plan = WorkoutPlan.objects.create(user=owner, created_by=self.trainer, name='P', goal='maintain',
+                                              start_date=today, end_date=today)
+            WorkoutSchedule.objects.create(workout_plan=plan, exercise=exercises[0], weekday=0, sets=3, reps=10)
+        for owner in (self.user, self.nutritionist):
+            plan = NutritionPlan.objects.create(user=owner, created_by=self.nutritionist, name='N',
+                                                goal='maintain', daily_calories=2000,
+                                                start_date=today, end_date=today)
+            MealSchedule.objects.create(nutrition_plan=plan, food=foods[0], weekday=0, portion=1)
+        for i in range(10):
+            day = today - timedelta(days=i)
+            DailyTracking.objects.create(user=self.user, date=day, weight=80, steps=6000)
+            Progress.objects.create(user=self.user, date=day, weight=80)
+            HealthJournal.objects.create(user=self.user, date=day, title='t', content='c')
+        Consultation.objects.create(user=self.user, expert=self.trainer,
+                                    appointment_date=timezone.now() + timedelta(days=1))
+        Reminder.objects.create(user=self.user, reminder_type='water', title='Uống nước',
+                                time='08:00', days_of_week=list(range(7)))
+        self.room = ChatRoom.objects.create(user=self.user, expert=self.trainer)
+        Message.objects.create(chat_room=self.room, sender=self.trainer, content='hi')
+        self.client = APIClient()
+
+    def _queries(self, url):
+        queries = []
+
+        def capture(execute, sql, params, many, context):
+            if sql.lstrip().upper().startswith('SELECT'):
+                queries.append((sql, params))
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(capture):
+            self.assertEqual(self.client.get(url).status_code, 200, url)
+        return queries
+
+    def _scanned_tables(self, sql, params):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'mysql':
+                cursor.execute('EXPLAIN ' + sql, params)
+                columns = [c[0] for c in cursor.description]
+                rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+                return {row['table'] for row in rows if row['type'] == 'ALL'}
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            # "SCAN t USING [COVERING] INDEX i" là duyệt theo index, chỉ "SCAN t" là quét bảng
+            details = [row[-1].split() for row in cursor.fetchall()]
+            return {words[1] for words in details if words[0] == 'SCAN' and len(words) == 2}
+
+    def _full_scans(self, user, urls):
+        self.client.force_authenticate(user)
+        scans = []
+        for url in urls:
+            for sql, params in self._queries(url):
+                for table in self._scanned_tables(sql, params) - self.ALLOWED_SCANS.get(url, set()):
+                    scans.append((url, table, sql))
+        return scans
+
+    def test_read_endpoints_use_indexes(self):
+        today = date.today()
+        workout = WorkoutPlan.objects.filter(user=self.user).first()
+        nutrition = NutritionPlan.objects.filter(user=self.user).first()
+        user_urls = [
+            '/users/current-user/', '/experts/', '/experts/?role=trainer', '/health-profiles/my-profile/',
+            '/daily-tracking/', f'/daily-tracking/?start_date={today - timedelta(days=5)}', '/daily-tracking/today/',
+            '/daily-tracking/weekly-summary/', '/daily-tracking/summary/?period=month',
+            '/exercise-categories/', '/exercises/', '/exercises/?category_id=1&difficulty=medium',
+            '/exercises/?search=run', '/exercises/recommended/',
+            '/foods/', '/foods/?meal_type=lunch&max_calories=302', '/foods/?search=rice', '/foods/recommended/',
+            '/workout-plans/', '/workout-plans/templates/', f'/workout-plans/{workout.id}/schedules/',
+            '/nutrition-plans/', '/nutrition-plans/templates/', f'/nutrition-plans/{nutrition.id}/meals/',
+            '/progress/', '/progress/chart-data/', '/progress/timeseries/',
+            '/consultations/', '/consultations/upcoming/', '/reminders/', '/reminders/today/',
+            '/journals/', '/journals/today/', f'/journals/month/{today.year}/{today.month}/',
+            '/chat-rooms/', f'/chat-rooms/{self.room.id}/messages/', '/sync/',
+        ]
+        expert_urls = [
+            '/health-profiles/', '/health-profiles/my-clients/', '/health-profiles/dashboard/',
+            f'/progress/client/{self.user.id}/', f'/progress/timeseries/?client_id={self.user.id}',
+            '/workout-plans/', '/consultations/', '/consultations/upcoming/', '/chat-rooms/',
+        ]
+
+        scans = self._full_scans(self.user, user_urls) + self._full_scans(self.trainer, expert_urls)
+        self.assertEqual(scans, [])
+
+    def test_due_reminders_use_index(self):
+        sql, params = reminders.due(2, time(8, 0), time(8, 5)).query.sql_with_params()
+        self.assertNotIn('health_reminder', self._scanned_tables(sql, params))
+
+
+@override_settings(METRICS_HEADERS=True, METRICS_N_PLUS_ONE_THRESHOLD=5)
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        metrics.registry.reset()
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        for i in range(6):
+            user = User.objects.create_user(username=f'client{i}', password='x')
+            Consultation.objects.create(user=user, expert=self.expert,
+                                        appointment_date=timezone.now() + timedelta(days=i))
+        self.client = APIClient()
+
+    def test_headers_and_aggregated_metrics(self):
+        self.client.force_authenticate(self.expert)
+        for _ in range(3):
+            res = self.client.get('/consultations/')
+
+        self.assertEqual(res['X-DB-Queries'], '1')
+        self.assertEqual(res['X-Response-Size'], str(len(res.content)))
+        self.assertIn('serializer;dur=', res['Server-Timing'])
+        self.assertNotIn('X-Duplicate-Queries', res)
+
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        self.client.force_authenticate(User.objects.create_user(username='admin', password='x', is_staff=True))
+        stats = self.client.get('/metrics/').data['GET consultation-list']
+        self.assertEqual((stats['count'], stats['errors'], stats['queries']['p95']), (3, 0, 1))
+        self.assertLessEqual(stats['duration_ms']['p50'], stats['duration_ms']['max'])
+        self.assertEqual(stats['n_plus_one'], {})
+
+    def test_daily_tracking_list_without_n_plus_one(self):
+        user = User.objects.get(username='client0')
+        DailyTracking.objects.bulk_create([DailyTracking(user=user, date=date.today() - timedelta(days=i), steps=i)
+                                           for i in range(6)])
+        self.client.force_authenticate(user)
+        res = self.client.get('/daily-tracking/')
+
+        self.assertEqual(len(res.data['results']), 6)
+        self.assertNotIn('X-Duplicate-Queries', res)
+
+    def test_n_plus_one_points_at_serializer_field(self):
+        def view(request):
+            # Thiếu select_related('user'): mỗi dòng một truy vấn user
+            data = serializers.ConsultationSerializer(Consultation.objects.all(), many=True).data
+            return HttpResponse(str(len(data)))
+
+        with self.assertLogs('health.metrics', 'WARNING'):
+            res = metrics.MetricsMiddleware(view)(RequestFactory().get('/'))
+
+        self.assertEqual(res['X-DB-Queries'], '7')
+        self.assertEqual(res['X-Duplicate-Queries'], 'ConsultationSerializer.user x6')
+
+    def test_histogram_percentiles(self):
+        histogram = metrics.Histogram()
+        for value in range(1, 1001):
+            histogram.add(value)
+
+        summary = histogram.summary()
+        self.assertEqual((summary['mean'], summary['max']), (500.5, 1000))
+        for q in metrics.PERCENTILES:
+            self.assertAlmostEqual(summary[f'p{q}'], q * 10, delta=q * 10 * 0.2)
+
+
+class GenerateDataTest(TestCase):
+    def _generate(self, prefix):
+        call_command('generate_data', users=30, days=40, clients_per_expert=10, messages=3,
+                     chunk_size=100, group_size=7, prefix=prefix, stdout=StringIO())
+
+    def _tracking(self, prefix):
+        return list(DailyTracking.objects.filter(user__username__startswith=f'{prefix}_').order_by(
+            'user__username', 'date').values_list('date', 'weight', 'steps', 'water_intake'))
+
+    def test_deterministic_and_consistent(self):
+        self._generate('a')
+        self._generate('b')
+
+        self.assertGreater(len(self._tracking('a')), 30 * 40 * 0.3)
+        self.assertEqual(self._tracking('a'), self._tracking('b'))
+        self.assertEqual(WorkoutPlan.objects.filter(user__username__startswith='a_').count(), 30)
+
+        # Bảng tổng hợp sinh trực tiếp khớp với rollups.rebuild
+        fields = ('user_id', 'period', 'period_start', 'active_days', 'steps_total', 'weight_last')
+        generated = set(TrackingRollup.objects.values_list(*fields))
+        rollups.rebuild()
+        self.assertEqual(generated, set(TrackingRollup.objects.values_list(*fields)))
+
+        for room in ChatRoom.objects.filter(user__username__startswith='a_'):
+            self.assertEqual(room.messages.filter(is_read=False).count(),
+                             room.user_unread_count + room.expert_unread_count)
+        slots = list(Consultation.objects.values_list('expert_id', 'appointment_date'))
+        self.assertEqual(len(slots), len(set(slots)))
+
+        with self.assertRaises(CommandError):
+            self._generate('a')
+
+
+class BenchmarkApiTest(TestCase):
+    def tearDown(self):
+        # Cache và bảng gợi ý trong bộ nhớ vẫn giữ danh mục do generate_data tạo (đã rollback)
+        dashboard.cache.clear()
+        for recommender in recommend.RECOMMENDERS.values():
+            recommender.features = None
+
+    def _benchmark(self, directory, **options):
+        output = os.path.join(directory, 'report.json')
+        # Hai mẫu mỗi endpoint thì độ trễ chỉ là nhiễu, ở đây chỉ kiểm tra số truy vấn/lỗi
+        call_command('benchmark_api', prefix='bench', clients=3, iterations=2, warmup=0, mix=20, threshold=100,
+                     output=output, baseline=os.path.join(directory, 'baseline.json'), stdout=StringIO(),
+                     **options)
+        with open(output) as f:
+            return json.load(f)
+
+    def test_report_and_regression(self):
+        call_command('generate_data', users=20, days=14, clients_per_expert=5, messages=3, prefix='bench',
+                     stdout=StringIO())
+        rows = DailyTracking.objects.count()
+
+        with tempfile.TemporaryDirectory() as directory:
+            report = self._benchmark(directory, save_baseline=True)
+            # Mọi endpoint chạy được trên dữ liệu sinh ra, không để lại dữ liệu hay token
+            self.assertEqual(set(report['endpoints']), {e.name for e in benchmark.endpoints()})
+            self.assertEqual([n for n, row in report['endpoints'].items() if row['errors']], [])
+            self.assertEqual(report['mix']['requests'], 20)
+            self.assertEqual(report['meta']['clients'], 3)
+            self.assertEqual(DailyTracking.objects.count(), rows)
+            self.assertFalse(AccessToken.objects.exists())
+
+            self.assertEqual(self._benchmark(directory)['regressions'], [])
+
+            # Baseline ít truy vấn hơn -> báo chậm đi
+            path = os.path.join(directory, 'baseline.json')
+            with open(path) as f:
+                baseline = json.load(f)
+            baseline['endpoints']['chat.send']['queries']['mean'] -= 2
+            with open(path, 'w') as f:
+                json.dump(baseline, f)
+            with self.assertRaises(CommandError):
+                self._benchmark(directory)
+
+            with self.assertRaises(CommandError):
+                self._benchmark(directory, seed=2)
+
+        # Bật cache token: mỗi request bớt một truy vấn xác thực
+        out = StringIO()
+        call_command('benchmark_auth', prefix='bench', clients=3, requests=20, stdout=out)
+        queries = [float(line.split()[-2]) for line in out.getvalue().splitlines() if 'cache' in line]
+        self.assertEqual(queries[0] - queries[1], 1)
+        self.assertFalse(AccessToken.objects.exists())
+
+        # Poll tin nhắn: số truy vấn (kể cả UPDATE is_read) không đổi theo độ dài lịch sử
+        messages = Message.objects.count()
+        out = StringIO()
+        call_command('chat_poll_benchmark', prefix='bench', sizes=[10, 300], polls=3, warmup=1,
+                     chunk_size=100, stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines() if line.split()[0] in ('10', '300')]
+        self.assertEqual([row[4] for row in rows], ['4.00', '4.00'])
+        self.assertEqual((Message.objects.count(), AccessToken.objects.count()), (messages, 0))
+
+        # previous_weight: một truy vấn mỗi trang dù lịch sử dài hay ngắn
+        progress = Progress.objects.count()
+        out = StringIO()
+        call_command('progress_benchmark', prefix='bench', sizes=[5, 80], requests=2, repeat=1, warmup=1,
+                     stdout=out)
+        rows = [line.split() for line in out.getvalue().splitlines() if line.split()[0] in ('5', '80')]
+        self.assertEqual([row[3] for row in rows], ['1.00', '1.00'])
+        self.assertEqual((Progress.objects.count(), AccessToken.objects.count()), (progress, 0))
+
+
+class ReminderWeekdaysTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='remind', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _reminder(self, user, days, at=time(8, 0), enabled=True):
+        return Reminder.objects.create(user=user, title='Uống nước', reminder_type='water', time=at,
+                                       days_of_week=days, is_enabled=enabled)
+
+    def test_bitmask_follows_days_of_week(self):
+        res = self.client.post('/reminders/', {'title': 'Tập', 'reminder_type': 'exercise', 'time': '07:00',
+                                               'days_of_week': [4, 0, 0]}, format='json')
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.data['days_of_week'], [0, 4])
+        self.assertNotIn('weekdays', res.data)
+        self.assertEqual(Reminder.objects.get(id=res.data['id']).weekdays, 0b10001)
+
+        res = self.client.patch(f"/reminders/{res.data['id']}/", {'days_of_week': [6]}, format='json')
+        self.assertEqual(Reminder.objects.get(id=res.data['id']).weekdays, 0b1000000)
+
+        res = self.client.post('/reminders/', {'title': 'Tập', 'reminder_type': 'exercise', 'time': '07:00',
+                                               'days_of_week': [7]}, format='json')
+        self.assertEqual(res.status_code, 400)
+
+    def test_today_and_due(self):
+        # "Hôm nay" theo múi giờ của user
+        today = timezone.now().astimezone(reminders.zone(self.user.timezone)).weekday()
+        other = User.objects.create_user(username='other', password='x')
+        due = self._reminder(self.user, [today])
+        self._reminder(self.user, [(today + 1) % 7])
+        self._reminder(self.user, [today], enabled=False)
+        other_due = self._reminder(other, list(range(7)), at=time(8, 4))
+        self._reminder(other, list(range(7)), at=time(9, 0))
+
+        res = self.client.get('/reminders/today/')
+        self.assertEqual([r['id'] for r in res.data], [due.id])
+
+        found = reminders.due(today, time(8, 0), time(8, 5)).order_by('id')
+        self.assertEqual(list(found), [due, other_due])
+
+    def test_fill_weekdays(self):
+        reminder = self._reminder(self.user, [1])
+        # update() không qua signal
+        Reminder.objects.filter(id=reminder.id).update(days_of_week=[2, 3])
+        reminders.fill_weekdays(chunk_size=1)
+        reminder.refresh_from_db()
+        self.assertEqual(reminder.weekdays, 0b1100)
+
+
+class ReminderDispatcherTest(TestCase):
+    def setUp(self):
+        self.hanoi = User.objects.create_user(username='hanoi', password='x')
+        self.paris = User.objects.create_user(username='paris', password='x', timezone='Europe/Paris')
+        self.notifier = reminders.MemoryNotifier()
+        self.dispatcher = reminders.Dispatcher(self.notifier)
+
+    def _reminder(self, user, at, days=tuple(range(7))):
+        return Reminder.objects.create(user=user, title='Uống nước', reminder_type='water', time=at,
+                                       days_of_week=list(days))
+
+    def _utc(self, *args):
+        return datetime(*args, tzinfo=dt_timezone.utc)
+
+    def _sent(self):
+        sent = [(r['id'], r['fire_at']) for r in self.notifier.sent]
+        self.notifier.sent = []
+        return sent
+
+    def test_next_fire_follows_local_time_and_dst(self):
+        tz = reminders.zone('America/New_York')
+        # 08:00 hằng ngày: 13:00 UTC trước ngày đổi giờ mùa hè (8/3/2026), 12:00 UTC sau đó
+        after = reminders.epoch_minute(self._utc(2026, 3, 7, 14, 0))
+        first = reminders.next_fire(8 * 60, 0b1111111, tz, after)
+        self.assertEqual(reminders.minute_datetime(first), self._utc(2026, 3, 8, 12, 0))
+        first = reminders.next_fire(8 * 60, 0b1111111, tz, reminders.epoch_minute(self._utc(2026, 3, 7, 12, 0)))
+        self.assertEqual(reminders.minute_datetime(first), self._utc(2026, 3, 7, 13, 0))
+        # Chỉ thứ 2 (9/3/2026)
+        monday = reminders.next_fire(8 * 60, 0b1, tz, after)
+        self.assertEqual(reminders.minute_datetime(monday), self._utc(2026, 3, 9, 12, 0))
+
+    def test_dispatch_refresh_and_lag(self):
+        # Thứ 4 21/10/2026, 01:00 UTC = 08:00 Hà Nội = 03:00 Paris
+        hanoi = self._reminder(self.hanoi, time(8, 0))
+        paris = self._reminder(self.paris, time(3, 0), days=[2])
+        later = self._reminder(self.hanoi, time(8, 1))
+        other_day = self._reminder(self.hanoi, time(8, 0), days=[3])
+        Reminder.objects.create(user=self.hanoi, title='Tắt', reminder_type='rest', time=time(8, 0),
+                                days_of_week=[2], is_enabled=False)
+
+        self.assertEqual(self.dispatcher.load(self._utc(2026, 10, 21, 0, 58)), 4)
+        self.dispatcher.advance(self._utc(2026, 10, 21, 0, 59))
+        self.assertEqual(self._sent(), [])
+        self.dispatcher.advance(self._utc(2026, 10, 21, 1, 0, 30))
+        self.assertEqual(sorted(self._sent()), [(hanoi.id, self._utc(2026, 10, 21, 1, 0)),
+                                                (paris.id, self._utc(2026, 10, 21, 1, 0))])
+
+        # Đổi giờ, xóa, tắt: áp dụng ở lần refresh, id cũ trong bánh xe bị bỏ qua
+        hanoi.time = time(8, 2)
+        hanoi.save()
+        later.delete()
+        other_day.is_enabled = False
+        other_day.save()
+        self.dispatcher.refresh()
+        self.dispatcher.advance(self._utc(2026, 10, 21, 1, 2))
+        self.assertEqual(self._sent(), [(hanoi.id, self._utc(2026, 10, 21, 1, 2))])
+
+        # Ngày hôm sau chỉ còn nhắc nhở hằng ngày; trễ quá max_lag thì không gửi dồn
+        self.dispatcher.advance(self._utc(2026, 10, 22, 1, 2), max_lag=5)
+        self.assertEqual(self._sent(), [(hanoi.id, self._utc(2026, 10, 22, 1, 2))])
+        self.dispatcher.advance(self._utc(2026, 10, 23, 2, 0), max_lag=5)
+        self.assertEqual(self._sent(), [])
+
+    @override_settings(REMINDER_NOTIFIER='health.reminders.MemoryNotifier')
+    def test_command_once(self):
+        self._reminder(self.hanoi, time(8, 0))
+        out = StringIO()
+        call_command('dispatch_reminders', once=True, stdout=out)
+        self.assertIn('Đã nạp 1 nhắc nhở', out.getvalue())
+
+    def test_user_timezone(self):
+        client = APIClient()
+        client.force_authenticate(self.hanoi)
+        reminder = self._reminder(self.hanoi, time(8, 0))
+        Reminder.objects.filter(id=reminder.id).update(updated_date=timezone.now() - timedelta(days=1))
+
+        res = client.patch('/users/current-user/', {'timezone': 'Mars/Olympus'}, format='multipart')
+        self.assertEqual(res.status_code, 400)
+        res = client.patch('/users/current-user/', {'timezone': 'Asia/Tokyo'}, format='multipart')
+        self.assertEqual(res.data['timezone'], 'Asia/Tokyo')
+        # Giờ nhắc đổi theo múi giờ mới nên bộ điều phối phải nạp lại
+        self.assertGreater(Reminder.objects.get(id=reminder.id).updated_date, timezone.now() - timedelta(minutes=1))
+
+
+class ConsultationBookingTest(TestCase):
+    def setUp(self):
+        self.expert = User.objects.create_user(username='coach', password='x', role='trainer')
+        self.other_expert = User.objects.create_user(username='chef', password='x', role='nutritionist')
+        self.user = User.objects.create_user(username='client', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        tomorrow = timezone.localtime(timezone.now() + timedelta(days=1))
+        self.at = tomorrow.replace(hour=10, minute=0, second=0, microsecond=0)
+
+    def _book(self, at, expert=None, duration=60):
+        return self.client.post('/consultations/', {'expert': (expert or self.expert).id,
+                                                    'appointment_date': at.isoformat(), 'duration': duration})
+
+    def test_overlapping_bookings_rejected(self):
+        first = self._book(self.at)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(self._book(self.at + timedelta(minutes=30)).status_code, 409)
+        self.assertEqual(self._book(self.at - timedelta(minutes=30)).status_code, 409)
+        self.assertEqual(self._book(self.at - timedelta(minutes=60)).status_code, 201)
+        self.assertEqual(self._book(self.at + timedelta(minutes=60), duration=30).status_code, 201)
+        self.assertEqual(self._book(self.at, expert=self.other_expert).status_code, 201)
+        self.assertEqual(self._book(timezone.now() - timedelta(hours=1)).status_code, 400)
+        self.assertEqual(self._book(self.at + timedelta(days=1), duration=600).status_code, 400)
+
+        # Lịch đã hủy không giữ chỗ; mở lại khi khung giờ đã có người đặt thì 409
+        self.client.patch(f"/consultations/{first.data['id']}/update-status/", {'status': 'cancelled'})
+        self.assertEqual(self._book(self.at + timedelta(minutes=30), duration=30).status_code, 201)
+        res = self.client.patch(f"/consultations/{first.data['id']}/update-status/", {'status': 'confirmed'})
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(Consultation.objects.get(id=first.data['id']).status, 'cancelled')
+
+    @override_settings(CONSULTATION_HOURS=(8, 12), CONSULTATION_SLOT_MINUTES=60)
+    def test_free_slots(self):
+        # 07:00 giờ Hà Nội: lịch 09:00-10:30 chặn khung 9h và 10h
+        tz = reminders.zone(self.expert.timezone)
+        now = datetime(2026, 10, 21, 7, 0, tzinfo=tz)
+        Consultation.objects.create(user=self.user, expert=self.expert, duration=90,
+                                    appointment_date=datetime(2026, 10, 21, 9, 0, tzinfo=tz))
+        Consultation.objects.create(user=self.user, expert=self.expert, status='cancelled',
+                                    appointment_date=datetime(2026, 10, 22, 8, 0, tzinfo=tz))
+        with self.assertNumQueries(1):
+            slots = booking.free_slots(self.expert, days=2, duration=60, now=now)
+        self.assertEqual([slot['start'].hour for slot in slots], [8, 11, 8, 9, 10, 11])
+
+        res = self.client.get('/consultations/free-slots/', {'expert_id': self.expert.id, 'days': 3})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data['timezone'], 'Asia/Ho_Chi_Minh')
+        self.assertEqual(self.client.get('/consultations/free-slots/', {'expert_id': self.user.id}).status_code, 404)
+        self.assertEqual(self.client.get('/consultations/free-slots/',
+                                         {'expert_id': self.expert.id, 'days': 365}).status_code, 400)
+
+    def test_upcoming_excludes_earlier_today(self):
+        past = Consultation.objects.create(user=self.user, expert=self.expert,
+                                           appointment_date=timezone.now() - timedelta(minutes=5))
+        future = Consultation.objects.create(user=self.user, expert=self.expert, appointment_date=self.at)
+        ids = [row['id'] for row in self.client.get('/consultations/upcoming/').data]
+        self.assertEqual(ids, [future.id])
+        self.assertNotIn(past.id, ids)
+
+
+
+class ExpertMatchingTest(TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.trainer = User.objects.create_user(username='coach', password='x', role='trainer')
+            self.nutritionist = User.objects.create_user(username='chef', password='x', role='nutritionist')
+            self.idle = User.objects.create_user(username='idle', password='x', role='trainer')
+            self.clients = [User.objects.create_user(username=f'client{i}', password='x') for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.clients[0])
+
+    def _profile(self, user, expert, goal):
+        return HealthProfile.objects.create(user=user, expert=expert, goal=goal, height=170, weight=70, age=30)
+
+    def _stats(self, expert):
+        return ExpertStats.objects.get(expert=expert)
+
+    def test_counters_follow_source_rows(self):
+        self.assertEqual(ExpertStats.objects.count(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._profile(self.clients[0], self.trainer, 'lose_weight')
+            self._profile(self.clients[1], self.trainer, 'lose_weight')
+            self._profile(self.clients[2], self.nutritionist, 'gain_muscle')
+        self.assertEqual((self._stats(self.trainer).client_count, self._stats(self.trainer).lose_weight_clients), (2, 2))
+
+        # Đổi chuyên gia: cả hai người đều được tính lại
+        with self.captureOnCommitCallbacks(execute=True):
+            first.expert = self.nutritionist
+            first.save()
+        self.assertEqual(self._stats(self.trainer).client_count, 1)
+        self.assertEqual(self._stats(self.nutritionist).client_count, 2)
+
+        at = timezone.now() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation = Consultation.objects.create(user=self.clients[0], expert=self.idle, appointment_date=at)
+        self.assertEqual((self._stats(self.idle).upcoming_consultations, self._stats(self.idle).next_consultation),
+                         (1, at))
+        # Lịch đã qua giờ được tính lại khi đọc bảng xếp hạng
+        self.assertEqual(matching.expire(at + timedelta(minutes=1)), 1)
+        self.assertEqual(self._stats(self.idle).upcoming_consultations, 0)
+        self.assertEqual(matching.expire(at + timedelta(minutes=1)), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            consultation.delete()
+            self.nutritionist.role = 'user'
+            self.nutritionist.save()
+        self.assertFalse(ExpertStats.objects.filter(expert=self.nutritionist).exists())
+
+        incremental = list(ExpertStats.objects.order_by('expert_id').values())
+        matching.rebuild()
+        rebuilt = list(ExpertStats.objects.order_by('expert_id').values())
+        for row in incremental + rebuilt:
+            row.pop('updated_date')
+        self.assertEqual(incremental, rebuilt)
+
+    def test_reply_latency(self):
+        room = ChatRoom.objects.create(user=self.clients[0], expert=self.trainer)
+        self.client.post(f'/chat-rooms/{room.id}/send/', {'content': 'Chào anh'})
+        self.client.post(f'/chat-rooms/{room.id}/send/', {'content': 'Anh ơi'})
+        ChatRoom.objects.filter(id=room.id).update(awaiting_reply_since=timezone.now() - timedelta(hours=2))
+
+        expert = APIClient()
+        expert.force_authenticate(self.trainer)
+        with self.captureOnCommitCallbacks(execute=True):
+            expert.post(f'/chat-rooms/{room.id}/send/', {'content': 'Chào em'})
+            expert.post(f'/chat-rooms/{room.id}/send/', {'content': 'Em cần gì?'})
+        stats = self._stats(self.trainer)
+        self.assertEqual(stats.reply_count, 1)
+        self.assertAlmostEqual(stats.reply_seconds, 7200, delta=5)
+        self.assertIsNone(ChatRoom.objects.get(id=room.id).awaiting_reply_since)
+
+    def test_match_ranking(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._profile(self.clients[0], None, 'gain_muscle')
+            self._profile(self.clients[1], self.trainer, 'lose_weight')
+            self._profile(self.clients[2], self.nutritionist, 'gain_muscle')
+        ExpertStats.objects.filter(expert=self.idle).update(reply_count=1, reply_seconds=48 * 3600)
+        matching.refresh(self.idle.id)
+
+        # Mặc định theo mục tiêu trong hồ sơ: chuyên về tăng cơ dù đã có một khách hàng
+        res = self.client.get('/experts/match/')
+        self.assertEqual([row['expert']['id'] for row in res.data], [self.nutritionist.id, self.trainer.id, self.idle.id])
+        self.assertEqual(res.data[0]['specialization'], 1.0)
+        self.assertEqual(res.data[2]['avg_reply_minutes'], 2880.0)
+
+        # Không theo mục tiêu: ít tải nhất trước, trả lời chậm bị trừ điểm
+        res = self.client.get('/experts/match/', {'goal': '', 'role': 'trainer', 'limit': 1})
+        self.assertEqual([row['expert']['id'] for row in res.data], [self.trainer.id])
+        self.assertEqual(self.client.get('/experts/match/', {'goal': 'fly'}).status_code, 400)
+
+        # Số truy vấn không đổi khi số chuyên gia tăng
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/experts/match/', {'limit': 5})
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(20):
+                User.objects.create(username=f'expert{i}', role='trainer')
+        with CaptureQueriesContext(connection) as many:
+            res = self.client.get('/experts/match/', {'limit': 5})
+        self.assertEqual(len(res.data), 5)
+        self.assertEqual(len(few), len(many))
+
+
+class TokenCacheTest(TestCase):
+    def setUp(self):
+        auth.get_cache().clear()
+        self.user = User.objects.create(username='cached', role='user')
+        self.token = AccessToken.objects.create(user=self.user, token='cached-token', scope='read write',
+                                                expires=timezone.now() + timedelta(hours=1))
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer cached-token')
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.get('/users/current-user/')
+        return res, len(ctx)
+
+    def test_cached_token_skips_lookup(self):
+        first, cold = self._get()
+        second, warm = self._get()
+        self.assertEqual((first.status_code, second.status_code), (200, 200))
+        self.assertEqual(warm, cold - 1)
+
+        # Đổi user qua ORM: đọc lại ngay, không chờ hết TTL
+        self.user.role = 'trainer'
+        self.user.save()
+        res, queries = self._get()
+        self.assertEqual(res.data['role'], 'trainer')
+        self.assertEqual(queries, cold)
+
+    def test_revoked_and_expired_tokens_rejected(self):
+        self.assertEqual(self._get()[0].status_code, 200)
+        with mock.patch('django.utils.timezone.now', return_value=self.token.expires + timedelta(seconds=1)):
+            self.assertEqual(self._get()[0].status_code, 401)
+        self.assertEqual(self._get()[0].status_code, 200)
+        self.token.revoke()
+        self.assertEqual(self._get()[0].status_code, 401)
+
+    def test_stale_read_not_cached(self):
+        started = time_module.time_ns()
+        self.assertEqual(self._get()[0].status_code, 200)
+        # Token/user đổi trong lúc đang đọc DB thì không lưu bản vừa đọc
+        auth.bump(self.user.id)
+        self.assertFalse(auth.remember('cached-token', self.token, started))
+        self.assertTrue(auth.remember('cached-token', self.token, time_module.time_ns()))
+
+    @override_settings(TOKEN_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        self.assertEqual(self._get()[1], self._get()[1])
+
+
+class ConcurrentBookingTest(TransactionTestCase):
+    def test_one_booking_wins_per_slot(self):
+        expert = User.objects.create(username='coach', role='trainer')
+        users = [User.objects.create(username=f'client{i}') for i in range(8)]
+        at = (timezone.now() + timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        codes = []
+
+        def book(user):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                res = client.post('/consultations/', {'expert': expert.id, 'appointment_date': at.isoformat()})
+                codes.append(res.status_code)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=book, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(codes), [201] + [409] * 7)
+        self.assertEqual(Consultation.objects.filter(expert=expert).count(), 1)
+
+    def test_locks_are_bounded(self):
+        # Chuyên gia mới không tạo thêm lock: số lock cố định theo LOCK_STRIPES
+        at = timezone.now() + timedelta(days=1)
+        for expert_id in range(1, 3 * booking.LOCK_STRIPES):
+            with booking.reserve(expert_id, at, 30):
+                pass
+        self.assertEqual(len(booking._locks), booking.LOCK_STRIPES)
+
+    def test_booking_storm_command(self):
+        out = StringIO()
+        call_command('booking_storm', workers=4, requests=40, slots=6, stdout=out)
+        self.assertIn('trùng nhau: 0', out.getvalue())
+        self.assertFalse(User.objects.filter(username__startswith='__storm_').exists())
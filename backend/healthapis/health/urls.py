@@ -19,6 +19,8 @@ router.register('consultations', views.ConsultationViewSet, basename='consultati
 router.register('reminders', views.ReminderViewSet, basename='reminder')
 router.register('journals', views.HealthJournalViewSet, basename='journal')
 router.register('chat-rooms', views.ChatRoomViewSet, basename='chatroom')
+router.register('sync', views.SyncViewSet, basename='sync')
+router.register('metrics', views.MetricsViewSet, basename='metrics')
 
 urlpatterns = [
     path('', include(router.urls)),
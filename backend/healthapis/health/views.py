@@ -1,12 +1,18 @@
 from rest_framework import viewsets, generics, permissions, status, parsers
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q, Avg, Sum
+from django.db import transaction
+from django.db.models import Q, F, Prefetch
+from django.db.models.functions import Greatest
+from django.utils import timezone
 from datetime import date, timedelta
 from .models import (User, HealthProfile, DailyTracking, Exercise, ExerciseCategory,
                      WorkoutPlan, WorkoutSchedule, Food, NutritionPlan, MealSchedule,
                      Progress, Consultation, Reminder, HealthJournal, ChatRoom, Message)
-from . import serializers
+from . import (serializers, realtime, paginators, recommend, plans, batch, sync, rollups, charts, dashboard, metrics,
+               reminders, booking, matching)
+from . import search as search_index
+from .catalog import CatalogCacheMixin
 
 
 class RegisterView(generics.CreateAPIView):
@@ -27,10 +33,18 @@ class UserViewSet(viewsets.ViewSet):
         user = request.user
 
         if request.method == 'PATCH':
+            zone_name = request.data.get('timezone')
+            if zone_name is not None and not reminders.is_valid_zone(zone_name):
+                return Response({"detail": "Múi giờ không hợp lệ"}, status=status.HTTP_400_BAD_REQUEST)
+            zone_changed = zone_name is not None and zone_name != user.timezone
+
             for k, v in request.data.items():
-                if k in ['first_name', 'last_name', 'email']:
+                if k in ['first_name', 'last_name', 'email', 'timezone']:
                     setattr(user, k, v)
             user.save()
+            if zone_changed:
+                # Giờ nhắc là giờ địa phương: bộ điều phối phải xếp lại lịch
+                Reminder.objects.filter(user=user).update(updated_date=timezone.now())
 
         return Response(
             serializers.UserSerializer(user).data,
@@ -50,6 +64,33 @@ class ExpertViewSet(viewsets.ViewSet, generics.ListAPIView):
             queryset = queryset.filter(role=role)
         return queryset
 
+    @action(methods=['get'], detail=False, url_path='match')
+    def match(self, request):
+        """
+        GET /experts/match/?goal=&role=&limit=: chuyên gia xếp theo tải hiện tại, lịch
+        sắp tới, tốc độ trả lời và mức chuyên về mục tiêu (mặc định mục tiêu trong
+        hồ sơ sức khỏe). Đọc điểm đã tính sẵn, không đếm lại theo từng request.
+        """
+        goal = request.query_params.get('goal')
+        if goal is None:
+            goal = HealthProfile.objects.filter(user=request.user).values_list('goal', flat=True).first()
+        if goal and goal not in matching.GOALS:
+            return Response({"detail": "Mục tiêu không hợp lệ"}, status=status.HTTP_400_BAD_REQUEST)
+        role = request.query_params.get('role')
+        if role and role not in matching.EXPERT_ROLES:
+            return Response({"detail": "Vai trò không hợp lệ"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+        except ValueError:
+            return Response({"detail": "limit phải là số nguyên"}, status=status.HTTP_400_BAD_REQUEST)
+
+        matching.expire()
+        return Response(
+            serializers.ExpertMatchSerializer(matching.ranked(goal, role, limit), many=True,
+                                              context={'request': request, 'goal': goal}).data,
+            status=status.HTTP_200_OK
+        )
+
 
 class HealthProfileViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
     queryset = HealthProfile.objects.all()
@@ -88,28 +129,32 @@ class HealthProfileViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
             )
 
         clients = HealthProfile.objects.filter(expert=user).select_related('user')
-        data = [{
-            'id': c.user.id,
-            'username': c.user.username,
-            'name': f"{c.user.first_name} {c.user.last_name}".strip() or c.user.username,
-            'avatar': c.user.avatar.url if c.user.avatar else None,
-            'goal': c.get_goal_display(),
-            'weight': c.weight,
-            'height': c.height,
-            'target_weight': c.target_weight,
-            'bmi': c.bmi,
-        } for c in clients]
+        data = [dashboard.client_info(c) for c in clients]
 
         return Response(data, status=status.HTTP_200_OK)
 
+    @action(methods=['get'], detail=False, url_path='dashboard')
+    def client_dashboard(self, request):
+        # Tổng hợp tất cả khách hàng trong một request thay vì gọi /progress/client/{id}/ cho từng người
+        if request.user.role not in ['nutritionist', 'trainer']:
+            return Response(
+                {"detail": "Không có quyền"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        refresh = request.query_params.get('refresh') in ('1', 'true')
+        return Response(dashboard.get_dashboard(request.user, refresh), status=status.HTTP_200_OK)
+
 
 class DailyTrackingViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
     queryset = DailyTracking.objects.all()
     serializer_class = serializers.DailyTrackingSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = paginators.DateCursorPagination
 
     def get_queryset(self):
-        queryset = DailyTracking.objects.filter(user=self.request.user)
+        # DailyTrackingSerializer trả kèm user
+        queryset = DailyTracking.objects.filter(user=self.request.user).select_related('user')
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
 
@@ -135,42 +180,90 @@ class DailyTrackingViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
             status=status.HTTP_200_OK
         )
 
+    @action(methods=['post'], detail=False, url_path='batch')
+    def batch_upsert(self, request):
+        # Đồng bộ offline: upsert nhiều ngày một lần, phần tử lỗi không chặn phần còn lại
+        items = batch.get_items(request)
+        validated, errors = batch.validate_items(items, serializers.DailyTrackingSerializer)
+
+        with transaction.atomic():
+            statuses = batch.upsert_tracking(request.user, validated)
+            # bulk_create/bulk_update không gửi signal
+            rollups.refresh(request.user.id, statuses)
+
+        trackings = {t.date: t for t in DailyTracking.objects.filter(
+            user=request.user, date__in=statuses).select_related('user')}
+        results = []
+        for i, data in enumerate(validated):
+            if data is None:
+                results.append({"index": i, "status": "invalid", "errors": errors[i]})
+            else:
+                results.append({
+                    "index": i,
+                    "status": statuses[data['date']],
+                    "data": serializers.DailyTrackingSerializer(trackings[data['date']]).data
+                })
+
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
     @action(methods=['get'], detail=False, url_path='weekly-summary')
     def weekly_summary(self, request):
-        end_date = date.today()
-        start_date = end_date - timedelta(days=7)
+        # Cửa sổ trượt 7 ngày gần nhất (today - 7 .. today), không phải tuần lịch;
+        # tuần/tháng theo lịch ở /daily-tracking/summary/
+        week = rollups.rolling(request.user)
+        water_avg = week['water_total'] / week['active_days'] if week['active_days'] else 0
 
-        trackings = DailyTracking.objects.filter(
-            user=request.user,
-            date__range=[start_date, end_date]
-        )
+        return Response({
+            'water_avg': round(water_avg / 1000, 1),
+            'workout_count': week['workout_days'],
+            'calories_total': int(week['steps_total'] * 0.04)
+        }, status=status.HTTP_200_OK)
 
-        water_avg = trackings.aggregate(avg=Avg('water_intake'))['avg'] or 0
-        water_avg_liters = round(water_avg / 1000, 1)
+    @action(methods=['get'], detail=False, url_path='summary')
+    def get_summary(self, request):
+        # ?period=week|month|year&count=N: N kỳ gần nhất, mới nhất trước
+        period = request.query_params.get('period', 'week')
+        max_count = {'week': 52, 'month': 24, 'year': 10}
+        if period not in max_count:
+            return Response(
+                {"detail": "period phải là week, month hoặc year"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            count = int(request.query_params.get('count', 1))
+        except ValueError:
+            count = 1
+        count = min(max(count, 1), max_count[period])
 
-        workout_count = trackings.filter(steps__gte=5000).count()
+        return Response(rollups.summary(request.user, period, count), status=status.HTTP_200_OK)
 
-        total_steps = trackings.aggregate(sum=Sum('steps'))['sum'] or 0
-        calories_total = int(total_steps * 0.04)
 
-        return Response({
-            'water_avg': water_avg_liters,
-            'workout_count': workout_count,
-            'calories_total': calories_total
-        }, status=status.HTTP_200_OK)
+def _recommend_limit(request):
+    try:
+        limit = int(request.query_params.get('limit', 10))
+    except ValueError:
+        limit = 10
+    return min(max(limit, 1), recommend.MAX_LIMIT)
 
 
-class ExerciseCategoryViewSet(viewsets.ViewSet, generics.ListAPIView):
+class ExerciseCategoryViewSet(CatalogCacheMixin, viewsets.ViewSet, generics.ListAPIView):
+    catalog_names = ('category',)
     queryset = ExerciseCategory.objects.all()
     serializer_class = serializers.ExerciseCategorySerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ExerciseViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
-    queryset = Exercise.objects.filter(active=True)
+class ExerciseViewSet(CatalogCacheMixin, viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
+    catalog_names = ('exercise',)
+    queryset = Exercise.objects.filter(active=True).select_related('category')
     serializer_class = serializers.ExerciseSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return serializers.ExerciseDetailSerializer
+        return self.serializer_class
+
     def get_queryset(self):
         queryset = self.queryset
         category_id = self.request.query_params.get('category_id')
@@ -182,51 +275,69 @@ class ExerciseViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveA
         if difficulty:
             queryset = queryset.filter(difficulty=difficulty)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
+            queryset = search_index.filter_queryset(queryset, search)
 
         return queryset
 
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        serializer = serializers.ExerciseDetailSerializer(
-            instance,
-            context={'request': request}
-        )
-        return Response(serializer.data, status=status.HTTP_200_OK)
-
     @action(methods=['get'], detail=False, url_path='recommended')
     def get_recommended(self, request):
-        try:
-            profile = HealthProfile.objects.get(user=request.user)
-
-            if profile.goal == 'lose_weight':
-                exercises = Exercise.objects.filter(
-                    active=True,
-                    category__name__in=['Cardio', 'HIIT']
-                )[:10]
-            elif profile.goal == 'gain_muscle':
-                exercises = Exercise.objects.filter(
-                    active=True,
-                    category__name__in=['Strength', 'Weightlifting']
-                )[:10]
-            else:
-                exercises = Exercise.objects.filter(active=True)[:10]
-
-            return Response(
-                serializers.ExerciseSerializer(exercises, many=True).data,
-                status=status.HTTP_200_OK
-            )
-        except HealthProfile.DoesNotExist:
+        exercises = recommend.recommended(Exercise, self.queryset, request.user, _recommend_limit(request))
+        if exercises is None:
             return Response(
                 {"detail": "Vui lòng tạo hồ sơ sức khỏe"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        return Response(
+            serializers.ExerciseSerializer(exercises, many=True, context={'request': request}).data,
+            status=status.HTTP_200_OK
+        )
+
+
+def _assign_template(template, request):
+    # Giao plan mẫu cho nhiều khách hàng của chuyên gia trong một transaction
+    user_ids = request.data.get('user_ids')
+    if not isinstance(user_ids, list) or not user_ids:
+        return Response(
+            {"detail": "user_ids phải là danh sách không rỗng"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if len(user_ids) > plans.MAX_ASSIGN:
+        return Response(
+            {"detail": f"Tối đa {plans.MAX_ASSIGN} khách hàng mỗi lần"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        user_ids = {int(i) for i in user_ids}
+    except (TypeError, ValueError):
+        return Response(
+            {"detail": "user_ids không hợp lệ"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    clients = list(User.objects.filter(id__in=user_ids, health_profile__expert=request.user).order_by('id'))
+    missing = user_ids - {c.id for c in clients}
+    if missing:
+        return Response(
+            {"detail": "Một số người dùng không phải khách hàng của bạn", "user_ids": sorted(missing)},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    new_plans = plans.clone_plan(template, clients, request.user)
+    return Response(
+        {
+            "detail": f"Đã giao kế hoạch cho {len(new_plans)} khách hàng",
+            "plans": [{"user_id": p.user_id, "plan_id": p.id} for p in new_plans]
+        },
+        status=status.HTTP_201_CREATED
+    )
+
 
 class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView,generics.RetrieveUpdateDestroyAPIView):
-    queryset = WorkoutPlan.objects.filter(active=True)
+    # Prefetch theo đúng cấu trúc WorkoutPlanSerializer: schedules -> exercise -> category
+    queryset = WorkoutPlan.objects.filter(active=True).select_related('user', 'created_by').prefetch_related(
+        Prefetch('schedules', queryset=WorkoutSchedule.objects.select_related('exercise__category'))
+    )
     serializer_class = serializers.WorkoutPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -234,9 +345,9 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
         user = self.request.user
 
         if user.role == 'trainer':
-            return WorkoutPlan.objects.filter(created_by=user, active=True)
+            return self.queryset.filter(created_by=user)
 
-        return WorkoutPlan.objects.filter(user=user, active=True)
+        return self.queryset.filter(user=user)
 
     def perform_create(self, serializer):
         serializer.save(
@@ -249,10 +360,9 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
     def get_templates(self, request):
         goal = request.query_params.get('goal', 'maintain')
 
-        templates = WorkoutPlan.objects.filter(
+        templates = self.queryset.filter(
             goal=goal,
-            created_by__role='trainer',
-            active=True
+            created_by__role='trainer'
         ).order_by('-created_date')[:3]
 
         return Response(
@@ -270,7 +380,7 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        schedules = WorkoutSchedule.objects.filter(workout_plan=plan)
+        schedules = WorkoutSchedule.objects.filter(workout_plan=plan).select_related('exercise__category')
         return Response(
             serializers.WorkoutScheduleSerializer(schedules, many=True).data,
             status=status.HTTP_200_OK
@@ -279,10 +389,9 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
     @action(methods=['post'], detail=True, url_path='clone')
     def clone_plan(self, request, pk):
         try:
-            template = WorkoutPlan.objects.get(
+            template = self.queryset.get(
                 id=pk,
-                created_by__role='trainer',
-                active=True
+                created_by__role='trainer'
             )
         except WorkoutPlan.DoesNotExist:
             return Response(
@@ -290,30 +399,59 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        new_plan = WorkoutPlan.objects.create(
-            user=request.user,
-            created_by=request.user,
-            name=f"{template.name} (Bản sao)",
-            goal=template.goal,
-            description=template.description,
-            start_date=date.today(),
-            end_date=date.today() + timedelta(days=28),
-            active=True
+        new_plan, = plans.clone_plan(template, [request.user], request.user,
+                                     name=f"{template.name} (Bản sao)")
+
+        return Response(
+            self.get_serializer(new_plan).data,
+            status=status.HTTP_201_CREATED
         )
 
-        schedules = WorkoutSchedule.objects.filter(workout_plan=template)
-        for s in schedules:
-            WorkoutSchedule.objects.create(
-                workout_plan=new_plan,
-                exercise=s.exercise,
-                weekday=s.weekday,
-                sets=s.sets,
-                reps=s.reps,
-                notes=s.notes
+    @action(methods=['post'], detail=True, url_path='assign')
+    def assign_template(self, request, pk):
+        if request.user.role != 'trainer':
+            return Response(
+                {"detail": "Chỉ huấn luyện viên mới được giao kế hoạch"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return _assign_template(self.get_object(), request)
+
+    @action(methods=['post'], detail=True, url_path='add-exercises')
+    def add_exercises(self, request, pk):
+        items = batch.get_items(request)
+        validated, errors = batch.validate_items(items, serializers.WorkoutScheduleItemSerializer,
+                                                 'exercise_id', Exercise.objects.all())
+        if any(errors):
+            return Response(
+                {"detail": "Dữ liệu không hợp lệ", "results": batch.error_results(errors)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            try:
+                plan = WorkoutPlan.objects.select_for_update().get(
+                    id=pk,
+                    user=request.user,
+                    active=True
+                )
+            except WorkoutPlan.DoesNotExist:
+                return Response(
+                    {"detail": "Workout plan không tồn tại hoặc không có quyền"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+            schedules = batch.bulk_insert(
+                WorkoutSchedule,
+                [WorkoutSchedule(workout_plan=plan, **data) for data in validated],
+                {'workout_plan': plan}
             )
+            sync.touch(WorkoutPlan, plan.id)
 
         return Response(
-            self.get_serializer(new_plan).data,
+            {
+                "detail": f"Đã thêm {len(schedules)} bài tập",
+                "results": [{"index": i, "schedule_id": s.id} for i, s in enumerate(schedules)]
+            },
             status=status.HTTP_201_CREATED
         )
 
@@ -393,7 +531,8 @@ class WorkoutPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Create
         )
 
 
-class FoodViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
+class FoodViewSet(CatalogCacheMixin, viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIView):
+    catalog_names = ('food',)
     queryset = Food.objects.filter(active=True)
     serializer_class = serializers.FoodSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -407,9 +546,7 @@ class FoodViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIVi
         if meal_type:
             queryset = queryset.filter(meal_type=meal_type)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
+            queryset = search_index.filter_queryset(queryset, search)
         if max_calories:
             queryset = queryset.filter(calories__lte=max_calories)
 
@@ -417,29 +554,24 @@ class FoodViewSet(viewsets.ViewSet, generics.ListAPIView, generics.RetrieveAPIVi
 
     @action(methods=['get'], detail=False, url_path='recommended')
     def get_recommended(self, request):
-        try:
-            profile = HealthProfile.objects.get(user=request.user)
-
-            if profile.goal == 'lose_weight':
-                foods = Food.objects.filter(active=True, calories__lt=300)[:10]
-            elif profile.goal == 'gain_muscle':
-                foods = Food.objects.filter(active=True, protein__gte=20)[:10]
-            else:
-                foods = Food.objects.filter(active=True)[:10]
-
-            return Response(
-                serializers.FoodSerializer(foods, many=True).data,
-                status=status.HTTP_200_OK
-            )
-        except HealthProfile.DoesNotExist:
+        foods = recommend.recommended(Food, self.queryset, request.user, _recommend_limit(request))
+        if foods is None:
             return Response(
                 {"detail": "Vui lòng tạo hồ sơ sức khỏe"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        return Response(
+            serializers.FoodSerializer(foods, many=True).data,
+            status=status.HTTP_200_OK
+        )
+
 
 class NutritionPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
-    queryset = NutritionPlan.objects.filter(active=True)
+    # Prefetch theo đúng cấu trúc NutritionPlanSerializer: meal_schedules -> food
+    queryset = NutritionPlan.objects.filter(active=True).select_related('user', 'created_by').prefetch_related(
+        Prefetch('meal_schedules', queryset=MealSchedule.objects.select_related('food'))
+    )
     serializer_class = serializers.NutritionPlanSerializer
     permission_classes = [permissions.IsAuthenticated]
 
@@ -447,8 +579,8 @@ class NutritionPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
         user = self.request.user
 
         if user.role == 'nutritionist':
-            return NutritionPlan.objects.filter(created_by=user, active=True)
-        return NutritionPlan.objects.filter(user=user, active=True)
+            return self.queryset.filter(created_by=user)
+        return self.queryset.filter(user=user)
 
     def perform_create(self, serializer):
         serializer.save(
@@ -461,10 +593,9 @@ class NutritionPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
     def get_templates(self, request):
         goal = request.query_params.get('goal', 'maintain')
 
-        templates = NutritionPlan.objects.filter(
+        templates = self.queryset.filter(
             goal=goal,
-            created_by__role='nutritionist',
-            active=True
+            created_by__role='nutritionist'
         ).order_by('-created_date')[:3]
 
         return Response(
@@ -474,35 +605,34 @@ class NutritionPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
 
     @action(methods=['post'], detail=True, url_path='clone')
     def clone_plan(self, request, pk):
-        template = self.get_object()
-
-        new_plan = NutritionPlan.objects.create(
-            user=request.user,
-            created_by=request.user,
-            name=f"{template.name} (Bản sao)",
-            goal=template.goal,
-            description=template.description,
-            daily_calories=template.daily_calories,
-            start_date=date.today(),
-            end_date=date.today() + timedelta(days=28),
-            active=True
-        )
-
-        meals = MealSchedule.objects.filter(nutrition_plan=template)
-        for m in meals:
-            MealSchedule.objects.create(
-                nutrition_plan=new_plan,
-                food=m.food,
-                weekday=m.weekday,
-                portion=m.portion,
-                notes=m.notes
+        try:
+            template = self.queryset.get(
+                id=pk,
+                created_by__role='nutritionist'
+            )
+        except NutritionPlan.DoesNotExist:
+            return Response(
+                {"detail": "Nutrition plan mẫu không tồn tại"},
+                status=status.HTTP_404_NOT_FOUND
             )
 
+        new_plan, = plans.clone_plan(template, [request.user], request.user,
+                                     name=f"{template.name} (Bản sao)")
+
         return Response(
             self.get_serializer(new_plan).data,
             status=status.HTTP_201_CREATED
         )
 
+    @action(methods=['post'], detail=True, url_path='assign')
+    def assign_template(self, request, pk):
+        if request.user.role != 'nutritionist':
+            return Response(
+                {"detail": "Chỉ chuyên gia dinh dưỡng mới được giao kế hoạch"},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return _assign_template(self.get_object(), request)
+
     @action(methods=['get'], detail=True, url_path='meals')
     def get_meals(self, request, pk):
         try:
@@ -513,12 +643,42 @@ class NutritionPlanViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        meals = plan.meal_schedules.all()
+        meals = plan.meal_schedules.select_related('food')
         return Response(
             serializers.MealScheduleSerializer(meals, many=True).data,
             status=status.HTTP_200_OK
         )
 
+    @action(methods=['post'], detail=True, url_path='add-meals')
+    def add_meals(self, request, pk):
+        plan = self.get_object()
+        items = batch.get_items(request)
+        validated, errors = batch.validate_items(items, serializers.MealScheduleItemSerializer,
+                                                 'food_id', Food.objects.all())
+        if any(errors):
+            return Response(
+                {"detail": "Dữ liệu không hợp lệ", "results": batch.error_results(errors)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        with transaction.atomic():
+            # Khóa plan để bulk_insert đọc lại id đúng các dòng vừa chèn (MySQL)
+            NutritionPlan.objects.select_for_update().filter(id=plan.id).first()
+            meals = batch.bulk_insert(
+                MealSchedule,
+                [MealSchedule(nutrition_plan=plan, **data) for data in validated],
+                {'nutrition_plan': plan}
+            )
+            sync.touch(NutritionPlan, plan.id)
+
+        return Response(
+            {
+                "detail": f"Đã thêm {len(meals)} bữa ăn",
+                "results": [{"index": i, "meal_id": m.id} for i, m in enumerate(meals)]
+            },
+            status=status.HTTP_201_CREATED
+        )
+
     @action(methods=['post'], detail=True, url_path='add-meal')
     def add_meal(self, request, pk):
         plan = self.get_object()
@@ -563,9 +723,12 @@ class ProgressViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPI
     queryset = Progress.objects.all()
     serializer_class = serializers.ProgressSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = paginators.DateCursorPagination
 
     def get_queryset(self):
-        queryset = Progress.objects.filter(user=self.request.user)
+        queryset = serializers.with_previous_weight(
+            Progress.objects.filter(user=self.request.user).select_related('user')
+        )
         start_date = self.request.query_params.get('start_date')
         end_date = self.request.query_params.get('end_date')
 
@@ -579,49 +742,75 @@ class ProgressViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPI
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
-    @action(methods=['get'], detail=False, url_path='chart-data')
-    def get_chart_data(self, request):
-        days = int(request.query_params.get('days', 30))
+    def _series(self, user_id, days):
+        # Hai chuỗi thô theo ngày tăng dần trong [hôm nay - days, hôm nay]
         end_date = date.today()
         start_date = end_date - timedelta(days=days)
 
         progress = Progress.objects.filter(
-            user=request.user,
+            user_id=user_id,
             date__range=[start_date, end_date]
-        ).values('date', 'weight', 'body_fat', 'muscle_mass')
+        ).order_by('date').values('date', *charts.PROGRESS_FIELDS)
 
-        return Response(list(progress), status=status.HTTP_200_OK)
+        tracking = DailyTracking.objects.filter(
+            user_id=user_id,
+            date__range=[start_date, end_date]
+        ).order_by('date').values('date', *charts.TRACKING_FIELDS)
 
-    @action(methods=['get'], detail=False, url_path='client/(?P<client_id>[^/.]+)')
-    def get_client_progress(self, request, client_id=None):
-        user = request.user
-        if user.role not in ['nutritionist', 'trainer']:
-            return Response(
+        return list(progress), list(tracking)
+
+    def _client_profile(self, request, client_id):
+        if request.user.role not in ['nutritionist', 'trainer']:
+            return None, Response(
                 {"detail": "Không có quyền"},
                 status=status.HTTP_403_FORBIDDEN
             )
-
         try:
-            profile = HealthProfile.objects.get(user_id=client_id, expert=user)
-        except HealthProfile.DoesNotExist:
-            return Response(
+            return HealthProfile.objects.select_related('user').get(user_id=client_id, expert=request.user), None
+        except (HealthProfile.DoesNotExist, ValueError):
+            return None, Response(
                 {"detail": "Không tìm thấy"},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        days = int(request.query_params.get('days', 30))
-        end_date = date.today()
-        start_date = end_date - timedelta(days=days)
+    @action(methods=['get'], detail=False, url_path='chart-data')
+    def get_chart_data(self, request):
+        # ?days=&max_points=&method=avg|lttb: khoảng dài được rút gọn về tối đa max_points điểm
+        days, max_points, method = charts.get_params(request)
+        progress, _ = self._series(request.user.id, days)
 
-        progress = Progress.objects.filter(
-            user_id=client_id,
-            date__range=[start_date, end_date]
-        ).values('date', 'weight', 'body_fat', 'muscle_mass')
+        # Giữ thứ tự cũ của endpoint (mới nhất trước, như Meta.ordering)
+        return Response(
+            charts.downsample(progress, max_points, method, charts.PROGRESS_FIELDS)[::-1],
+            status=status.HTTP_200_OK
+        )
 
-        tracking = DailyTracking.objects.filter(
-            user_id=client_id,
-            date__range=[start_date, end_date]
-        ).values('date', 'weight', 'water_intake', 'steps')
+    @action(methods=['get'], detail=False, url_path='timeseries')
+    def get_timeseries(self, request):
+        # Progress và DailyTracking gộp theo ngày trong một chuỗi; ?client_id= cho chuyên gia
+        days, max_points, method = charts.get_params(request)
+        user_id = request.user.id
+        client_id = request.query_params.get('client_id')
+        if client_id:
+            profile, error = self._client_profile(request, client_id)
+            if error:
+                return error
+            user_id = profile.user_id
+
+        series = charts.merge(*self._series(user_id, days))
+        return Response(
+            charts.downsample(series, max_points, method, charts.SERIES_FIELDS),
+            status=status.HTTP_200_OK
+        )
+
+    @action(methods=['get'], detail=False, url_path='client/(?P<client_id>[^/.]+)')
+    def get_client_progress(self, request, client_id=None):
+        profile, error = self._client_profile(request, client_id)
+        if error:
+            return error
+
+        days, max_points, method = charts.get_params(request)
+        progress, tracking = self._series(client_id, days)
 
         return Response({
             'client': {
@@ -632,8 +821,8 @@ class ProgressViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPI
                 'target_weight': profile.target_weight,
                 'bmi': profile.bmi,
             },
-            'progress': list(progress),
-            'tracking': list(tracking),
+            'progress': charts.downsample(progress, max_points, method, charts.PROGRESS_FIELDS)[::-1],
+            'tracking': charts.downsample(tracking, max_points, method, charts.TRACKING_FIELDS)[::-1],
         }, status=status.HTTP_200_OK)
 
 
@@ -641,15 +830,19 @@ class ConsultationViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Creat
     queryset = Consultation.objects.all()
     serializer_class = serializers.ConsultationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = paginators.AppointmentCursorPagination
 
     def get_queryset(self):
         user = self.request.user
         if user.role in ['nutritionist', 'trainer']:
-            return Consultation.objects.filter(expert=user)
-        return Consultation.objects.filter(user=user)
+            return Consultation.objects.filter(expert=user).select_related('user')
+        return Consultation.objects.filter(user=user).select_related('user')
 
     def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        data = serializer.validated_data
+        duration = data.get('duration', Consultation._meta.get_field('duration').default)
+        with booking.reserve(data['expert'].id, data['appointment_date'], duration):
+            serializer.save(user=self.request.user)
 
     @action(methods=['patch'], detail=True, url_path='update-status')
     def update_status(self, request, pk):
@@ -662,8 +855,15 @@ class ConsultationViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Creat
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        consultation.status = new_status
-        consultation.save()
+        if new_status in booking.ACTIVE and consultation.status not in booking.ACTIVE:
+            # Mở lại lịch đã hủy: khung giờ có thể đã được người khác đặt
+            with booking.reserve(consultation.expert_id, consultation.appointment_date, consultation.duration,
+                                 exclude=consultation.pk):
+                consultation.status = new_status
+                consultation.save()
+        else:
+            consultation.status = new_status
+            consultation.save()
 
         return Response(
             serializers.ConsultationSerializer(consultation).data,
@@ -673,8 +873,8 @@ class ConsultationViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Creat
     @action(methods=['get'], detail=False, url_path='upcoming')
     def get_upcoming(self, request):
         upcoming = self.get_queryset().filter(
-            appointment_date__gte=date.today(),
-            status__in=['pending', 'confirmed']
+            appointment_date__gte=timezone.now(),
+            status__in=booking.ACTIVE
         ).order_by('appointment_date')
 
         return Response(
@@ -682,6 +882,34 @@ class ConsultationViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Creat
             status=status.HTTP_200_OK
         )
 
+    @action(methods=['get'], detail=False, url_path='free-slots')
+    def free_slots(self, request):
+        try:
+            expert_id = int(request.query_params.get('expert_id', ''))
+            days = int(request.query_params.get('days', 7))
+            duration = int(request.query_params.get('duration', Consultation._meta.get_field('duration').default))
+        except ValueError:
+            return Response({"detail": "expert_id, days và duration phải là số nguyên"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= days <= booking.MAX_DAYS:
+            return Response({"detail": f"days phải từ 1 đến {booking.MAX_DAYS}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not Consultation.MIN_DURATION <= duration <= Consultation.MAX_DURATION:
+            return Response(
+                {"detail": f"duration phải từ {Consultation.MIN_DURATION} đến {Consultation.MAX_DURATION} phút"},
+                status=status.HTTP_400_BAD_REQUEST)
+
+        expert = User.objects.filter(pk=expert_id, role__in=['nutritionist', 'trainer']).first()
+        if expert is None:
+            return Response({"detail": "Không tìm thấy chuyên gia"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'expert_id': expert.id,
+            'timezone': expert.timezone,
+            'duration': duration,
+            'slots': booking.free_slots(expert, days, duration),
+        }, status=status.HTTP_200_OK)
+
 
 class ReminderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPIView, generics.RetrieveUpdateDestroyAPIView):
     queryset = Reminder.objects.all()
@@ -696,15 +924,13 @@ class ReminderViewSet(viewsets.ViewSet, generics.ListAPIView, generics.CreateAPI
 
     @action(methods=['get'], detail=False, url_path='today')
     def get_today_reminders(self, request):
-        today_weekday = date.today().weekday()
-        reminders = Reminder.objects.filter(
-            user=request.user,
-            is_enabled=True,
-            days_of_week__contains=today_weekday
-        ).order_by('time')
+        today_reminders = reminders.on_weekday(
+            Reminder.objects.filter(user=request.user, is_enabled=True),
+            timezone.now().astimezone(reminders.zone(request.user.timezone)).weekday()
+        ).select_related('user').order_by('time')
 
         return Response(
-            self.get_serializer(reminders, many=True).data,
+            self.get_serializer(today_reminders, many=True).data,
             status=status.HTTP_200_OK
         )
 
@@ -724,6 +950,7 @@ class HealthJournalViewSet(viewsets.ViewSet, generics.ListAPIView, generics.Crea
     queryset = HealthJournal.objects.all()
     serializer_class = serializers.HealthJournalSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = paginators.DateCursorPagination
 
     def get_queryset(self):
         return HealthJournal.objects.filter(user=self.request.user)
@@ -769,7 +996,7 @@ class ChatRoomViewSet(viewsets.ViewSet, generics.ListAPIView):
 
     def get_queryset(self):
         user = self.request.user
-        return ChatRoom.objects.filter(user=user) | ChatRoom.objects.filter(expert=user)
+        return ChatRoom.objects.filter(Q(user=user) | Q(expert=user)).select_related('user', 'expert')
 
     def get_serializer_context(self):
         return {'request': self.request}
@@ -811,10 +1038,27 @@ class ChatRoomViewSet(viewsets.ViewSet, generics.ListAPIView):
     @action(methods=['get'], detail=True, url_path='messages')
     def get_messages(self, request, pk):
         chat_room = self.get_object()
-        messages = chat_room.messages.all()
+        # since_id: chỉ lấy tin mới hơn tin cuối client đã có; before_id: trang cũ hơn
+        messages = paginators.MessageKeysetPagination().paginate_queryset(
+            chat_room.messages.select_related('sender'), request, self
+        )
 
-        # Đánh dấu đã đọc
-        messages.filter(is_read=False).exclude(sender=request.user).update(is_read=True)
+        # Đánh dấu đã đọc (chỉ trong khoảng id vừa trả về)
+        unread = [m for m in messages if not m.is_read and m.sender_id != request.user.id]
+        if unread:
+            unread_field = chat_room.unread_field(request.user)
+            with transaction.atomic():
+                marked = chat_room.messages.filter(
+                    id__gte=min(m.id for m in unread),
+                    id__lte=max(m.id for m in unread),
+                    is_read=False
+                ).exclude(sender=request.user).update(is_read=True)
+                if marked:
+                    ChatRoom.objects.filter(id=chat_room.id).update(
+                        **{unread_field: Greatest(F(unread_field) - marked, 0)}
+                    )
+            for m in unread:
+                m.is_read = True
 
         return Response(
             serializers.MessageSerializer(
@@ -836,17 +1080,60 @@ class ChatRoomViewSet(viewsets.ViewSet, generics.ListAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        message = Message.objects.create(
-            chat_room=chat_room,
-            sender=request.user,
-            content=content
-        )
+        # Tăng số tin chưa đọc của người nhận cùng transaction với tin nhắn
+        recipient = chat_room.expert if request.user.id == chat_room.user_id else chat_room.user
+        unread_field = chat_room.unread_field(recipient)
+        with transaction.atomic():
+            message = Message.objects.create(
+                chat_room=chat_room,
+                sender=request.user,
+                content=content
+            )
 
-        chat_room.last_message = content[:100]
-        chat_room.last_message_time = message.created_date
-        chat_room.save()
+            chat_room.last_message = content[:100]
+            chat_room.last_message_time = message.created_date
+            ChatRoom.objects.filter(id=chat_room.id).update(
+                last_message=chat_room.last_message,
+                last_message_time=chat_room.last_message_time,
+                updated_date=timezone.now(),
+                **{unread_field: F(unread_field) + 1}
+            )
+            matching.record_message(chat_room, message)
+            transaction.on_commit(lambda: realtime.notify_new_message(message, chat_room))
 
         return Response(
             serializers.MessageSerializer(message, context={'request': request}).data,
             status=status.HTTP_201_CREATED
-        )
\ No newline at end of file
+        )
+
+
+class SyncViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def list(self, request):
+        """
+        GET /sync/?daily_tracking=<cursor>&journals=<cursor>...
+        Model không có cursor thì trả toàn bộ; ?models=a,b để giới hạn model.
+        """
+        keys = request.query_params.get('models')
+        keys = keys.split(',') if keys else list(sync.SYNC_MODELS)
+        unknown = [k for k in keys if k not in sync.SYNC_MODELS]
+        if unknown:
+            return Response(
+                {"detail": f"Model không hỗ trợ: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            sync.sync_all(request.user, {key: request.query_params.get(key) for key in keys},
+                          timezone.now(), {'request': request}),
+            status=status.HTTP_200_OK
+        )
+
+
+class MetricsViewSet(viewsets.ViewSet):
+    permission_classes = [permissions.IsAdminUser]
+
+    def list(self, request):
+        # Số liệu gộp theo endpoint của tiến trình đang phục vụ request
+        return Response(metrics.registry.snapshot(), status=status.HTTP_200_OK)
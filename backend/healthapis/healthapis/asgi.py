@@ -13,4 +13,12 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'healthapis.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from health.realtime import websocket_application  # noqa: E402  (cần Django đã setup)
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        return await websocket_application(scope, receive, send)
+    return await django_application(scope, receive, send)
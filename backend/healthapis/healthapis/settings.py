@@ -36,6 +36,9 @@ cloudinary.config(
     api_secret="78QiMy8z5_eipwAsYrlozT-rHMg"
 )
 
+# Số URL Cloudinary tối đa giữ trong LRU (health/media.py)
+MEDIA_URL_CACHE_SIZE = 20000
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -55,12 +58,15 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'oauth2_provider.contrib.rest_framework.OAuth2Authentication',
-
+        # OAuth2Authentication có cache token (health/auth.py)
+        'health.auth.CachedOAuth2Authentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'health.paginators.StandardPagination',
 }
 
 MIDDLEWARE = [
+    # Đặt đầu tiên để đo toàn bộ request (health/metrics.py)
+    'health.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -89,7 +95,62 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'healthapis.wsgi.application'
+ASGI_APPLICATION = 'healthapis.asgi.application'
+
+# Fan-out cho websocket chat (/ws/chat/). Thay bằng broker khác có cùng
+# interface subscribe/unsubscribe/publish để chạy nhiều tiến trình.
+CHAT_BROKER = 'health.realtime.InProcessBroker'
 
+# Cache dùng cho danh mục bài tập/món ăn (health/catalog.py). Chạy nhiều
+# tiến trình thì đổi sang Redis để các worker dùng chung version stamp:
+#   'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+#   'LOCATION': 'redis://127.0.0.1:6379',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'healthapis',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    }
+}
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = 60 * 60
+
+# Token OAuth2 đã xác thực (kèm user) giữ trong cache (health/auth.py), giây; 0 để
+# tắt. Không quá hạn của token; xóa/sửa token hoặc user qua ORM làm mới ngay.
+TOKEN_CACHE_ALIAS = 'default'
+TOKEN_CACHE_TIMEOUT = 5 * 60
+
+# /sync/ (health/sync.py): số bản ghi mỗi model mỗi lượt, độ trễ cursor để
+# không bỏ sót giao dịch commit muộn, và số ngày giữ tombstone
+SYNC_PAGE_SIZE = 500
+SYNC_SETTLE_SECONDS = 2
+SYNC_TOMBSTONE_DAYS = 30
+
+# Bảng tổng hợp khách hàng của chuyên gia (health/dashboard.py), giây; 0 để tắt cache
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Đo chi phí từng request (health/metrics.py): số liệu gộp xem ở /metrics/ (admin),
+# header X-DB-Queries/Server-Timing chỉ bật khi DEBUG. Một câu SQL cùng dạng chạy
+# từ METRICS_N_PLUS_ONE_THRESHOLD lần trong một request bị ghi log là N+1.
+METRICS_ENABLED = True
+METRICS_HEADERS = DEBUG
+METRICS_N_PLUS_ONE_THRESHOLD = 5
+
+# Nơi bộ điều phối nhắc nhở (manage.py dispatch_reminders) gửi nhắc nhở đến giờ:
+# LogNotifier ghi log, BrokerNotifier đẩy qua kênh realtime của user (cần
+# CHAT_BROKER dùng chung giữa các tiến trình), MemoryNotifier cho test.
+REMINDER_NOTIFIER = 'health.reminders.LogNotifier'
+
+# Lịch tư vấn: giờ làm việc [bắt đầu, kết thúc) theo múi giờ của chuyên gia và
+# bước giữa các khung giờ trống trả về ở /consultations/free-slots/.
+CONSULTATION_HOURS = (8, 17)
+CONSULTATION_SLOT_MINUTES = 30
+
+# Ghép chuyên gia (/experts/match/): số khách hàng ứng với mức tải đầy và trọng số
+# các thành phần điểm. Điểm được tính sẵn, đổi các giá trị này thì chạy
+# manage.py rebuild_expert_stats.
+EXPERT_CAPACITY = 100
+EXPERT_MATCH_WEIGHTS = {'specialization': 1.0, 'caseload': 1.0, 'upcoming': 0.5, 'latency': 0.5}
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
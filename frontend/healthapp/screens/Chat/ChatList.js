@@ -3,7 +3,7 @@ import { Card, ActivityIndicator, Badge } from "react-native-paper";
 import { useState, useEffect } from "react";
 import { useNavigation } from "@react-navigation/native";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../utils/Apis";
+import { authApis, chatSocket, endpoints } from "../../utils/Apis";
 
 const ChatList = () => {
     const [chatRooms, setChatRooms] = useState([]);
@@ -12,17 +12,49 @@ const ChatList = () => {
     const nav = useNavigation();
 
     useEffect(() => {
-        loadChatRooms();
-        
-        const interval = setInterval(loadChatRooms, 10000);
-        return () => clearInterval(interval);
+        let socket = null;
+        let interval = null;
+        let closed = false;
+
+        const startPolling = () => {
+            if (!closed && !interval) interval = setInterval(loadChatRooms, 10000);
+        };
+
+        const connect = async () => {
+            loadChatRooms();
+            const token = await AsyncStorage.getItem('token');
+            if (closed) return;
+            socket = chatSocket(token);
+            socket.onmessage = (e) => {
+                const event = JSON.parse(e.data);
+                if (event.type === 'message') loadChatRooms();
+            };
+            socket.onerror = startPolling;
+            socket.onclose = startPolling;
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            if (socket) socket.close();
+            if (interval) clearInterval(interval);
+        };
     }, []);
 
     const loadChatRooms = async () => {
         try {
             const token = await AsyncStorage.getItem('token');
-            const res = await authApis(token).get(endpoints['chat_rooms']);
-            setChatRooms(res.data);
+            // Danh sách phân trang (50 phòng/trang): đọc hết các trang theo next,
+            // chuyên gia nhiều khách hàng không bị mất phòng
+            const api = authApis(token);
+            let rooms = [];
+            let url = endpoints['chat_rooms'];
+            while (url) {
+                const res = await api.get(url);
+                rooms = rooms.concat(res.data.results);
+                url = res.data.next;
+            }
+            setChatRooms(rooms);
         } catch (e) {
             console.error(e);
         } finally {
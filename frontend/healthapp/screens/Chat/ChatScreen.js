@@ -13,7 +13,7 @@ import { ActivityIndicator } from "react-native-paper";
 import { useState, useEffect, useRef } from "react";
 import { useRoute, useNavigation } from "@react-navigation/native";
 import AsyncStorage from "@react-native-async-storage/async-storage";
-import { authApis, endpoints } from "../../utils/Apis";
+import { authApis, chatSocket, endpoints } from "../../utils/Apis";
 
 const ChatScreen = () => {
     const { room } = useRoute().params;
@@ -22,21 +22,68 @@ const ChatScreen = () => {
     const [loading, setLoading] = useState(true);
     const [inputText, setInputText] = useState('');
     const [sending, setSending] = useState(false);
+    const [loadingOlder, setLoadingOlder] = useState(false);
+    const [hasOlder, setHasOlder] = useState(true);
     const flatListRef = useRef();
 
     useEffect(() => {
-        loadMessages();
-        const interval = setInterval(loadMessages, 3000);
-        return () => clearInterval(interval);
+        let socket = null;
+        let interval = null;
+        let closed = false;
+
+        // Nếu websocket không dùng được thì quay về polling 3 giây
+        const startPolling = () => {
+            if (!closed && !interval) interval = setInterval(loadMessages, 3000);
+        };
+
+        const connect = async () => {
+            await loadMessages();
+            const token = await AsyncStorage.getItem('token');
+            if (closed) return;
+            socket = chatSocket(token);
+            // Có tin mới thì lấy phần còn thiếu (since_id) để đánh dấu đã đọc
+            socket.onmessage = (e) => {
+                const event = JSON.parse(e.data);
+                if (event.type === 'message' && event.room.id === room.id) loadMessages();
+            };
+            socket.onerror = startPolling;
+            socket.onclose = startPolling;
+        };
+
+        connect();
+        return () => {
+            closed = true;
+            if (socket) socket.close();
+            if (interval) clearInterval(interval);
+        };
     }, []);
 
-    const loadMessages = async () => {
+    const lastIdRef = useRef(null);
+    const loadingRef = useRef(Promise.resolve());
+
+    // Socket, polling và gửi tin có thể gọi cùng lúc: xếp hàng để mỗi lượt đọc
+    // since_id của lượt trước, không lấy trùng tin
+    const loadMessages = () => {
+        loadingRef.current = loadingRef.current.then(fetchMessages);
+        return loadingRef.current;
+    };
+
+    const fetchMessages = async () => {
         try {
             const token = await AsyncStorage.getItem('token');
+            const params = lastIdRef.current ? { since_id: lastIdRef.current } : {};
             const res = await authApis(token).get(
-                endpoints['chat_messages'](room.id)
+                endpoints['chat_messages'](room.id),
+                { params }
             );
-            setMessages(res.data);
+            if (res.data.length > 0) {
+                lastIdRef.current = res.data[res.data.length - 1].id;
+                setMessages(prev => {
+                    if (!params.since_id) return res.data;
+                    const seen = new Set(prev.map(m => m.id));
+                    return [...prev, ...res.data.filter(m => !seen.has(m.id))];
+                });
+            }
         } catch (e) {
             console.error(e);
         } finally {
@@ -44,6 +91,25 @@ const ChatScreen = () => {
         }
     };
 
+    // Cuộn lên đầu thì tải trang cũ hơn (before_id)
+    const loadOlder = async () => {
+        if (loadingOlder || !hasOlder || messages.length === 0) return;
+        setLoadingOlder(true);
+        try {
+            const token = await AsyncStorage.getItem('token');
+            const res = await authApis(token).get(
+                endpoints['chat_messages'](room.id),
+                { params: { before_id: messages[0].id } }
+            );
+            if (res.data.length === 0) setHasOlder(false);
+            else setMessages(prev => [...res.data, ...prev]);
+        } catch (e) {
+            console.error(e);
+        } finally {
+            setLoadingOlder(false);
+        }
+    };
+
     const sendMessage = async () => {
         if (!inputText.trim() || sending) return;
         setSending(true);
@@ -193,6 +259,8 @@ const ChatScreen = () => {
                         ref={flatListRef}
                         data={[...messages].reverse()}
                         inverted
+                        onEndReached={loadOlder}
+                        onEndReachedThreshold={0.2}
                         renderItem={renderMessage}
                         keyExtractor={item => item.id.toString()}
                         contentContainerStyle={{ padding: 15, flexGrow: 1 }}
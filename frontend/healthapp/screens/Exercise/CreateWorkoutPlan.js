@@ -208,19 +208,15 @@ const CreateWorkoutPlan = () => {
                 const planId = planRes.data.id;
 
                 
-                for (let i = 0; i < selectedExercises.length; i++) {
-                    const item = selectedExercises[i];
-                    const scheduleData = {
-                        exercise_id: item.id,
-                        weekday: item.weekday ?? 0,
-                        sets: item.sets ?? 3,
-                        reps: item.reps ?? 15,
-                    };
-
-                    await authApis(token).post(
-                        endpoints['add_exercise_to_plan'](planId),
-                        scheduleData
-                    );
+                // Gửi tất cả bài tập trong một request
+                const schedules = selectedExercises.map(item => ({
+                    exercise_id: item.id,
+                    weekday: item.weekday ?? 0,
+                    sets: item.sets ?? 3,
+                    reps: item.reps ?? 15,
+                }));
+                if (schedules.length > 0) {
+                    await authApis(token).post(endpoints['add_exercises_to_plan'](planId), { items: schedules });
                 }
 
                 Alert.alert(
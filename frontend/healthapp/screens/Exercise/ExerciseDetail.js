@@ -50,7 +50,7 @@ const ExerciseDetail = () => {
             const token = await AsyncStorage.getItem('token');
             if (token) {
                 const res = await authApis(token).get(endpoints['workout_plans']);
-                setPlans(res.data);
+                setPlans(res.data.results);
             }
         } catch (error) {
             console.error('Load plans error', error);
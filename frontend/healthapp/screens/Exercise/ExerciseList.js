@@ -20,7 +20,7 @@ const ExerciseList = () => {
             if (token) {
                 // Load categories
                 const catRes = await authApis(token).get(endpoints['exercise_categories']);
-                setCategories(catRes.data);
+                setCategories(catRes.data.results);
 
                 // Load exercises
                 let params = {};
@@ -28,7 +28,7 @@ const ExerciseList = () => {
                 if (searchQuery) params.search = searchQuery;
 
                 const exRes = await authApis(token).get(endpoints['exercises'], { params });
-                setExercises(exRes.data);
+                setExercises(exRes.data.results);
             }
         } catch (error) {
             console.error(error);
@@ -17,7 +17,7 @@ const WorkoutPlan = () => {
             const token = await AsyncStorage.getItem('token');
             if (token) {
                 const res = await authApis(token).get(endpoints['workout_plans']);
-                setPlans(res.data);
+                setPlans(res.data.results);
             }
         } catch (error) {
             console.error(error);
@@ -17,8 +17,8 @@ const ClientList = () => {
     const loadClients = async () => {
         try {
             const token = await AsyncStorage.getItem('token');
-            const res = await authApis(token).get(endpoints['my_clients']);
-            setClients(res.data);
+            const res = await authApis(token).get(endpoints['expert_dashboard']);
+            setClients(res.data.clients);
         } catch (e) { console.error(e); }
         finally { setLoading(false); }
     };
@@ -60,7 +60,9 @@ const ClientList = () => {
                                 <View style={{flex:1}}>
                                     <Text style={{fontSize:16,fontWeight:'bold'}}>{item.name}</Text>
                                     <Text style={{color:'#666'}}>🎯 {item.goal}</Text>
-                                    <Text style={{color:'#666'}}>⚖️ {item.weight}kg → {item.target_weight || '?'}kg</Text>
+                                    <Text style={{color:'#666'}}>⚖️ {item.latest_weight}kg{item.latest_weight_source === 'profile' ? ' (hồ sơ)' : ''} → {item.target_weight || '?'}kg
+                                        {item.weight_change_7d !== null ? ` (${item.weight_change_7d > 0 ? '+' : ''}${item.weight_change_7d}kg/7 ngày)` : ''}</Text>
+                                    <Text style={{color:'#666'}}>📅 Theo dõi 7 ngày: {item.adherence_7d}%</Text>
                                 </View>
                                 <Chip compact>{item.bmi} BMI</Chip>
                             </TouchableOpacity>
@@ -81,7 +83,7 @@ const ClientList = () => {
                                     onPress={() => startChat(item.id)}
                                     icon="chat"
                                 >
-                                    💬 Chat
+                                    💬 Chat{item.unread_count ? ` (${item.unread_count})` : ''}
                                 </Button>
                             </View>
                         </Card.Content>
@@ -37,7 +37,7 @@ const ExpertList = () => {
                 endpoints["experts"],
                 { params }
             );
-            setExperts(res.data);
+            setExperts(res.data.results);
 
         } catch (err) {
             console.error(err);
@@ -37,7 +37,7 @@ const moodLabels = {
         try {
             const token = await AsyncStorage.getItem('token');
             const res = await authApis(token).get(endpoints['health_journals']);
-            setJournals(res.data || []);
+            setJournals(res.data.results || []);
         } catch (error) {
             console.error('Load journals error:', error);
             Alert.alert('Lỗi', 'Không thể tải danh sách nhật ký');
@@ -262,18 +262,14 @@ const CreateNutritionPlan = () => {
                 const planId = planRes.data.id;
 
               
-                for (let i = 0; i < selectedFoods.length; i++) {
-                    const item = selectedFoods[i];
-                    const mealData = {
-                        food_id: item.id,
-                        weekday: item.weekday ?? 0,
-                        portion: item.portion ?? 1.0,
-                    };
-
-                    await authApis(token).post(
-                        endpoints['add_meal_to_plan'](planId),
-                        mealData
-                    );
+                // Gửi tất cả món trong một request
+                const meals = selectedFoods.map(item => ({
+                    food_id: item.id,
+                    weekday: item.weekday ?? 0,
+                    portion: item.portion ?? 1.0,
+                }));
+                if (meals.length > 0) {
+                    await authApis(token).post(endpoints['add_meals_to_plan'](planId), { items: meals });
                 }
 
                 Alert.alert(
@@ -43,7 +43,7 @@ const FoodDetail = () => {
             const token = await AsyncStorage.getItem('token');
             if (token) {
                 const res = await authApis(token).get(endpoints['nutrition_plans']);
-                setPlans(res.data);
+                setPlans(res.data.results);
             }
         } catch (error) {
             console.error(error);
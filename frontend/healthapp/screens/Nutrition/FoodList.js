@@ -30,7 +30,7 @@ const FoodList = () => {
                 if (searchQuery) params.search = searchQuery;
 
                 const res = await authApis(token).get(endpoints['foods'], { params });
-                setFoods(res.data);
+                setFoods(res.data.results);
             }
         } catch (error) {
             console.error(error);
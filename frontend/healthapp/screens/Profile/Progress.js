@@ -25,8 +25,19 @@ const Progress = () => {
         setLoading(true);
         try {
             const token = await AsyncStorage.getItem('token');
-            const res = await authApis(token).get(`${endpoints['daily_tracking']}?days=${period}`);
-            setRawData(res.data || []);
+            // /daily-tracking/ phân trang theo cursor (mới nhất trước) và lọc theo start_date:
+            // đọc hết các trang trong khoảng period ngày
+            const start = new Date();
+            start.setDate(start.getDate() - period + 1);
+            const api = authApis(token);
+            let rows = [];
+            let url = `${endpoints['daily_tracking']}?start_date=${start.toISOString().split('T')[0]}&page_size=200`;
+            while (url) {
+                const res = await api.get(url);
+                rows = rows.concat(res.data.results || []);
+                url = res.data.next;
+            }
+            setRawData(rows);
         } catch (e) {
             console.error(e);
             setRawData([]);
@@ -16,7 +16,7 @@ const ReminderList = () => {
             const token = await AsyncStorage.getItem('token');
             if (token) {
                 const res = await authApis(token).get(endpoints['reminders']);
-                setReminders(res.data);
+                setReminders(res.data.results);
             }
         } catch (error) {
             console.error(error);
@@ -18,6 +18,8 @@ export const endpoints = {
     'daily_tracking': '/daily-tracking/',
     'today_tracking': '/daily-tracking/today/',
     'weekly_summary': '/daily-tracking/weekly-summary/',
+    'sync': '/sync/',
+    'daily_tracking_batch': '/daily-tracking/batch/',
     
   
     'exercise_categories': '/exercise-categories/',
@@ -30,6 +32,7 @@ export const endpoints = {
     'workout_detail': (id) => `/workout-plans/${id}/`,
     'workout_schedules': (id) => `/workout-plans/${id}/schedules/`,
     'add_exercise_to_plan': (id) => `/workout-plans/${id}/add-exercise/`,
+    'add_exercises_to_plan': (id) => `/workout-plans/${id}/add-exercises/`,
     'workout_templates': '/workout-plans/templates/',
     'clone_workout_plan': (id) => `/workout-plans/${id}/clone/`,
 
@@ -43,16 +46,20 @@ export const endpoints = {
     
     'meal_schedules': (id) => `/nutrition-plans/${id}/meals/`,
     'add_meal_to_plan': (id) => `/nutrition-plans/${id}/add-meal/`,
+    'add_meals_to_plan': (id) => `/nutrition-plans/${id}/add-meals/`,
     'nutrition_templates': '/nutrition-plans/templates/',
     'clone_nutrition_plan': (id) => `/nutrition-plans/${id}/clone/`,
     
     
     'progress': '/progress/',
     'chart_data': '/progress/chart-data/',
+    'timeseries': '/progress/timeseries/',
     
     'experts': '/experts/',
+    'expert_match': '/experts/match/',
     'consultations': '/consultations/',
     'upcoming_consultations': '/consultations/upcoming/',
+    'consultation_free_slots': '/consultations/free-slots/',
 
     
     'reminders': '/reminders/',
@@ -61,6 +68,7 @@ export const endpoints = {
     'toggle_reminder': (id) => `/reminders/${id}/toggle/`,
 
     'my_clients': '/health-profiles/my-clients/',
+    'expert_dashboard': '/health-profiles/dashboard/',
     'client_progress': (id) => `/progress/client/${id}/`,
     'health_journals': '/journals/',
 
@@ -81,6 +89,10 @@ export const authApis = (token) => {
     });
 };
 
+export const chatSocket = (token) => {
+    return new WebSocket(`${BASE_URL.replace(/^http/, 'ws')}/ws/chat/?token=${token}`);
+};
+
 export default axios.create({
     baseURL: BASE_URL
 });
\ No newline at end of file